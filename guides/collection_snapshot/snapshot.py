@@ -0,0 +1,387 @@
+"""
+Snapshot a collection to local zstd-compressed JSONL shards, and restore it into another collection.
+
+The guides only ever fill a collection from its source files (`setup_yc_data`,
+`add_documents`). With a snapshot, a collection can be cloned into another
+environment, or re-indexed blue/green (restore into a new collection, switch
+queries over, drop the old one) without re-parsing or re-OCRing anything.
+
+Archive layout:
+
+    snapshot_dir/
+        manifest.json            collection name and the shards written so far
+        shard-00000.jsonl.zst    one JSON document per line
+        shard-00001.jsonl.zst
+        restore-<collection>.json   shards already restored into <collection>
+
+Each document line holds its path, metadata and content: the text of plain
+text documents, or the text of every page for paged documents (PDFs,
+`text-pages`), which are restored as `text-pages`.
+
+`export_collection` walks the collection in path order, one `get_info_list`
+page per shard, fetching content with bounded concurrency. A shard is
+written to a temporary file and renamed, then recorded in the manifest, so
+an interrupted export resumes after the last complete shard. Documents still
+being parsed have no content yet: their paths are kept as `pending` in the
+manifest and retried at the end of every run, and the snapshot is only marked
+complete once none are left. Documents whose parsing or indexing failed will
+never have content; they are listed as `failed` in the manifest (with their
+`index_status`) and do not hold the snapshot back.
+`restore_collection` adds the documents of several shards concurrently,
+records finished shards, and treats documents that already exist as done,
+so it can be re-run too.
+
+Usage:
+
+    python snapshot.py export <collection> <snapshot_dir>
+    python snapshot.py restore <snapshot_dir> <new_collection>
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+import zstandard as zstd
+from zeroentropy import AsyncZeroEntropy, ConflictError, NotFoundError
+
+MANIFEST = "manifest.json"
+ZSTD_LEVEL = 3
+PAGE_LIMIT = 1024  # most documents one get_info_list call returns
+# index_status values of documents that have no content yet, and of those that never will
+PENDING_STATUSES = ("not_parsed", "parsing")
+FAILED_STATUSES = ("parsing_failed", "indexing_failed")
+
+
+@dataclass
+class SnapshotReport:
+    shards: int = 0
+    documents: int = 0
+    pages: int = 0
+    skipped: int = 0  # restore: documents that already existed
+    pending: list = field(default_factory=list)  # export: documents with no content yet
+    failed: list = field(default_factory=list)  # export: parsing/indexing failed; restore: add failed
+    bytes: int = 0
+    elapsed_s: float = 0.0
+
+    def __str__(self) -> str:
+        rate = self.documents / max(self.elapsed_s, 1e-9)
+        return (f"{self.documents} documents ({self.pages} pages) in {self.shards} shards, "
+                f"{self.elapsed_s:.2f}s ({rate:.1f} documents/s), {self.bytes / 1e6:.2f} MB compressed, "
+                f"{self.skipped} skipped, {len(self.pending)} pending, {len(self.failed)} failed")
+
+
+def shard_name(shard_index: int) -> str:
+    return f"shard-{shard_index:05d}.jsonl.zst"
+
+
+def write_json(path: str, data: dict):
+    """Write JSON atomically, so an interrupted run never leaves a half-written file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str, default: dict) -> dict:
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_shard(path: str, records: list[dict], level: int = ZSTD_LEVEL) -> int:
+    """Compress records to a JSONL shard (atomically) and return its size in bytes."""
+    data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(zstd.ZstdCompressor(level=level).compress(data))
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def read_shard(path: str) -> list[dict]:
+    with open(path, "rb") as f:
+        with zstd.ZstdDecompressor().stream_reader(f) as reader:
+            data = reader.read()
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line]
+
+
+async def iter_document_pages(zclient: AsyncZeroEntropy, collection_name: str, path_gt: str | None = None, limit: int = PAGE_LIMIT):
+    """
+    Yield lists of documents, one per `get_info_list` page, in path order.
+
+    The next page is requested as soon as the current one arrives, so listing
+    overlaps with exporting the current page.
+    """
+    async def fetch(cursor: str | None):
+        response = await zclient.documents.get_info_list(collection_name=collection_name, limit=limit, path_gt=cursor)
+        return response.documents
+
+    next_page = asyncio.create_task(fetch(path_gt))
+    try:
+        while documents := await next_page:
+            next_page = asyncio.create_task(fetch(documents[-1].path))
+            yield documents
+    finally:
+        next_page.cancel()
+
+
+async def fetch_document(zclient: AsyncZeroEntropy, collection_name: str, document, sem: asyncio.Semaphore) -> dict | None:
+    """
+    Snapshot record for one listed document, or None if it has no content yet.
+
+    Paged documents are fetched page by page with `get_page_info`; each page
+    request takes its own semaphore slot, so one long PDF can't starve the rest.
+    """
+    record = {"path": document.path, "metadata": document.metadata}
+
+    if document.num_pages:
+        async def page_content(page_index: int) -> str | None:
+            async with sem:
+                response = await zclient.documents.get_page_info(
+                    collection_name=collection_name, path=document.path, page_index=page_index, include_content=True,
+                )
+            return response.page.content
+
+        pages = await asyncio.gather(*[page_content(i) for i in range(document.num_pages)])
+        if any(page is None for page in pages):
+            return None
+        record["content"] = {"type": "text-pages", "pages": pages}
+    else:
+        async with sem:
+            response = await zclient.documents.get_info(
+                collection_name=collection_name, path=document.path, include_content=True,
+            )
+        if response.document.content is None:
+            return None
+        record["content"] = {"type": "text", "text": response.document.content}
+    return record
+
+
+async def export_collection(
+    zclient: AsyncZeroEntropy,
+    collection_name: str,
+    snapshot_dir: str,
+    shard_size: int = PAGE_LIMIT,
+    concurrency: int = 16,
+    retries: int = 3,
+) -> SnapshotReport:
+    """
+    Export every document of a collection into `snapshot_dir`, resuming a previous export there.
+
+    Args:
+        zclient: An AsyncZeroEntropy client.
+        collection_name: The collection to export.
+        snapshot_dir: Directory for the manifest and shards (created if missing).
+        shard_size: Documents per shard, at most 1024 (one `get_info_list` page).
+        concurrency: Content requests in flight.
+        retries: Attempts per document before the export stops (re-run to resume).
+
+    Returns:
+        A SnapshotReport for the shards written by this run; `pending` lists the
+        documents that still had no content (re-run to pick them up), `failed`
+        those whose parsing or indexing failed (they are not exported).
+    """
+    if not 1 <= shard_size <= PAGE_LIMIT:
+        raise ValueError(f"shard_size must be between 1 and {PAGE_LIMIT} (one get_info_list page), got {shard_size}")
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest_path = os.path.join(snapshot_dir, MANIFEST)
+    manifest = read_json(manifest_path, {"collection_name": collection_name, "complete": False, "shards": []})
+    manifest.setdefault("pending", [])
+    manifest.setdefault("failed", [])
+    if manifest["collection_name"] != collection_name:
+        raise ValueError(f"'{snapshot_dir}' holds a snapshot of '{manifest['collection_name']}', not '{collection_name}'")
+    if manifest["complete"]:
+        print(f"Snapshot of '{collection_name}' in '{snapshot_dir}' is already complete")
+        return SnapshotReport()
+
+    # Resume after the last path of the last complete shard
+    resume_after = manifest["shards"][-1]["last_path"] if manifest["shards"] else None
+    if resume_after is not None:
+        print(f"Resuming export of '{collection_name}' after '{resume_after}' ({len(manifest['shards'])} shards done)")
+
+    report = SnapshotReport()
+    start = time.perf_counter()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def fetch_with_retries(document) -> dict | None:
+        for retry in range(retries):
+            try:
+                return await fetch_document(zclient, collection_name, document, sem)
+            except Exception as e:
+                if retry == retries - 1:
+                    # Stop rather than write a shard with holes; the next run resumes at this shard
+                    raise RuntimeError(f"Failed to export '{document.path}': {e}") from e
+                await asyncio.sleep(0.5 * 2 ** retry)
+
+    async def write_records(documents: list, last_path: str | None, keep_empty: bool = True):
+        """Fetch and write one shard; documents without content are recorded as pending or failed."""
+        failed, waiting, ready = [], [], []
+        for document in documents:
+            status = getattr(document, "index_status", None)
+            (failed if status in FAILED_STATUSES else waiting if status in PENDING_STATUSES else ready).append(document)
+        results = await asyncio.gather(*[fetch_with_retries(document) for document in ready])
+        records = [record for record in results if record is not None]
+        pending = [document.path for document in waiting] + [
+            document.path for document, record in zip(ready, results) if record is None
+        ]
+        manifest["pending"] += pending
+        manifest["failed"] += [{"path": document.path, "index_status": document.index_status} for document in failed]
+        report.failed += [document.path for document in failed]
+        if not records and not keep_empty:
+            write_json(manifest_path, manifest)
+            return
+
+        shard_index = len(manifest["shards"])
+        n_bytes = await asyncio.to_thread(write_shard, os.path.join(snapshot_dir, shard_name(shard_index)), records)
+        manifest["shards"].append({"file": shard_name(shard_index), "documents": len(records), "last_path": last_path})
+        write_json(manifest_path, manifest)
+
+        report.shards += 1
+        report.documents += len(records)
+        report.pages += sum(len(r["content"].get("pages", [])) for r in records)
+        report.bytes += n_bytes
+        print(f"Wrote {shard_name(shard_index)}: {len(records)} documents, {n_bytes / 1e3:.1f} kB"
+              + (f", {len(pending)} pending" if pending else "") + (f", {len(failed)} failed" if failed else ""))
+
+    # The next listing page is already being fetched while this page's content is exported
+    async for documents in iter_document_pages(zclient, collection_name, path_gt=resume_after, limit=shard_size):
+        await write_records(documents, documents[-1].path)
+
+    # Retry the documents that had no content, into extra shards; the listing cursor stays where it is.
+    # Paths stay pending in the manifest until their batch is written, so an interruption loses none.
+    retry_paths = list(manifest["pending"])
+    last_path = manifest["shards"][-1]["last_path"] if manifest["shards"] else None
+    for i in range(0, len(retry_paths), shard_size):
+        batch = retry_paths[i:i + shard_size]
+        documents = []
+        for path in batch:
+            try:
+                response = await zclient.documents.get_info(collection_name=collection_name, path=path, include_content=False)
+            except NotFoundError:
+                continue  # deleted since it was listed
+            documents.append(response.document)
+        retried = set(batch)
+        manifest["pending"] = [path for path in manifest["pending"] if path not in retried]
+        await write_records(documents, last_path, keep_empty=False)
+
+    report.pending = list(manifest["pending"])
+    manifest["complete"] = not manifest["pending"]
+    manifest["documents"] = sum(shard["documents"] for shard in manifest["shards"])
+    write_json(manifest_path, manifest)
+    if report.pending:
+        print(f"{len(report.pending)} documents are still being parsed; re-run the export to pick them up")
+    if report.failed:
+        print(f"{len(report.failed)} documents failed to parse or index and were not exported "
+              f"(listed under 'failed' in {MANIFEST}); re-add them from their source files")
+    report.elapsed_s = time.perf_counter() - start
+    return report
+
+
+async def restore_collection(
+    zclient: AsyncZeroEntropy,
+    snapshot_dir: str,
+    collection_name: str,
+    concurrency: int = 16,
+    shard_concurrency: int = 2,
+    retries: int = 3,
+) -> SnapshotReport:
+    """
+    Add every document of a snapshot to a collection, creating it if needed.
+
+    Args:
+        zclient: An AsyncZeroEntropy client.
+        snapshot_dir: Directory written by `export_collection`.
+        collection_name: The collection to restore into.
+        concurrency: `documents.add` requests in flight.
+        shard_concurrency: Shards decompressed and held in memory at once.
+        retries: Attempts per document before it is reported failed.
+
+    Returns:
+        A SnapshotReport; documents already in the collection count as skipped.
+    """
+    manifest = read_json(os.path.join(snapshot_dir, MANIFEST), None)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST} in '{snapshot_dir}'")
+    if not manifest["complete"]:
+        print(f"Warning: the snapshot of '{manifest['collection_name']}' is incomplete "
+              f"({len(manifest.get('pending', []))} documents pending), restoring the shards written so far")
+
+    try:
+        await zclient.collections.add(collection_name=collection_name)
+        print(f"Created collection '{collection_name}'")
+    except ConflictError:
+        print(f"Collection '{collection_name}' already exists, restoring into it")
+
+    progress_path = os.path.join(snapshot_dir, f"restore-{collection_name}.json")
+    progress = read_json(progress_path, {"restored_shards": []})
+    restored = set(progress["restored_shards"])
+    todo = [shard for shard in manifest["shards"] if shard["file"] not in restored]
+    if restored:
+        print(f"Resuming restore into '{collection_name}': {len(restored)} shards done, {len(todo)} to go")
+
+    report = SnapshotReport()
+    start = time.perf_counter()
+    add_slots = asyncio.Semaphore(concurrency)
+    shard_slots = asyncio.Semaphore(shard_concurrency)
+
+    async def add_document(record: dict) -> bool:
+        async with add_slots:
+            for retry in range(retries):
+                try:
+                    await zclient.documents.add(
+                        collection_name=collection_name,
+                        path=record["path"],
+                        content=record["content"],
+                        metadata=record["metadata"],
+                    )
+                    report.documents += 1
+                    report.pages += len(record["content"].get("pages", []))
+                    return True
+                except ConflictError:
+                    report.skipped += 1
+                    return True
+                except Exception as e:
+                    if retry == retries - 1:
+                        print(f"Failed to restore '{record['path']}': {e}")
+                        report.failed.append(record["path"])
+                        return False
+                    await asyncio.sleep(0.5 * 2 ** retry)
+
+    async def restore_shard(shard: dict):
+        async with shard_slots:
+            shard_path = os.path.join(snapshot_dir, shard["file"])
+            records = await asyncio.to_thread(read_shard, shard_path)
+            ok = await asyncio.gather(*[add_document(record) for record in records])
+        report.shards += 1
+        report.bytes += os.path.getsize(shard_path)
+        # Only fully restored shards are skipped next time
+        if all(ok):
+            restored.add(shard["file"])
+            write_json(progress_path, {"restored_shards": sorted(restored)})
+        print(f"Restored {shard['file']}: {sum(ok)}/{len(records)} documents")
+
+    await asyncio.gather(*[restore_shard(shard) for shard in todo])
+    report.elapsed_s = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    import dotenv
+
+    dotenv.load_dotenv()
+    if len(sys.argv) != 4 or sys.argv[1] not in ("export", "restore"):
+        sys.exit(__doc__)
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.getenv("ZEROENTROPY_API_KEY"))
+        if sys.argv[1] == "export":
+            report = await export_collection(zclient, sys.argv[2], sys.argv[3])
+        else:
+            report = await restore_collection(zclient, sys.argv[2], sys.argv[3])
+        print(report)
+
+    asyncio.run(main())
@@ -1,15 +1,27 @@
 from zeroentropy import AsyncZeroEntropy, ConflictError
 import asyncio
 from dotenv import load_dotenv
-from tqdm.asyncio import tqdm
+import functools
 import os
 import base64
+from concurrent.futures import ProcessPoolExecutor
+
+from pdf_text import extract_text_pages, local_extraction_available
 
 load_dotenv()
 
-zclient = AsyncZeroEntropy()
 sem = asyncio.Semaphore(16)
 
+# The client is created on first use, so importing this module stays cheap
+@functools.cache
+def get_zclient() -> AsyncZeroEntropy:
+    return AsyncZeroEntropy()
+
+# Extract text from digital PDFs locally instead of uploading them for OCR (needs pypdf).
+# Set LOCAL_PDF_EXTRACTION=0 to always upload PDFs as base64.
+LOCAL_PDF_EXTRACTION = os.getenv("LOCAL_PDF_EXTRACTION", "1") != "0" and local_extraction_available()
+pdf_pool = None  # ProcessPoolExecutor for PDF text extraction, created in main()
+
 async def index_document(document_path: str, collection_name: str) -> None:
     response = None
     if not os.path.exists(document_path):
@@ -24,7 +36,7 @@ async def index_document(document_path: str, collection_name: str) -> None:
                 for _retry in range(3):
                         try:
                             content = { "type": "text", "text": document }
-                            response = await zclient.documents.add(
+                            response = await get_zclient().documents.add(
                                 collection_name=collection_name,
                                 path=f"{document_path}_{i}",
                                 content=content,
@@ -33,24 +45,28 @@ async def index_document(document_path: str, collection_name: str) -> None:
                             break
                         except ConflictError as e:
                             print(f"Document '{document_path}' already exists in collection '{collection_name}'")
-    # for pdf we need to specifify the type so we can use OCR
+    # for pdf we upload the text of each page when it has a text layer, otherwise we specify the type so we can use OCR
     elif os.path.splitext(document_path)[1] == ".pdf":
-        with open(document_path, "rb") as f:
-            pdf_bytes = f.read()
-            pdf_base64 = base64.b64encode(pdf_bytes).decode("utf-8")
-            async with sem:
-                for _retry in range(3):
-                    try:
-                        content = { "type": "auto", "base64_data": pdf_base64 } #this will automatically OCR the PDF
-                        response = await zclient.documents.add(
-                        collection_name=collection_name,
-                        path=document_path,
-                        content=content,
-                        metadata={"type": "pdf"},
-                            )
-                        break
-                    except ConflictError as e:
-                        print(f"Document '{document_path}' already exists in collection '{collection_name}'")
+        pages = None
+        if pdf_pool is not None:
+            pages = await asyncio.get_running_loop().run_in_executor(pdf_pool, extract_text_pages, document_path)
+        if pages is not None:
+            content = { "type": "text-pages", "pages": pages }
+        else:
+            with open(document_path, "rb") as f:
+                content = { "type": "auto", "base64_data": base64.b64encode(f.read()).decode("utf-8") } #this will automatically OCR the PDF
+        async with sem:
+            for _retry in range(3):
+                try:
+                    response = await get_zclient().documents.add(
+                    collection_name=collection_name,
+                    path=document_path,
+                    content=content,
+                    metadata={"type": "pdf"},
+                        )
+                    break
+                except ConflictError as e:
+                    print(f"Document '{document_path}' already exists in collection '{collection_name}'")
     #for txt no need to use OCR
     elif os.path.splitext(document_path)[1] == ".txt":   
         with open(document_path, "r", encoding="utf-8") as f:
@@ -59,7 +75,7 @@ async def index_document(document_path: str, collection_name: str) -> None:
                 for _retry in range(3):
                     try:
                         content = { "type": "text", "text": text }
-                        response = await zclient.documents.add(
+                        response = await get_zclient().documents.add(
                                     collection_name=collection_name,
                                     path=document_path,
                                     content=content,
@@ -73,20 +89,25 @@ async def index_document(document_path: str, collection_name: str) -> None:
         return None
     return response
 
-async def main():
-    #list all files in the data folder
-    
-    DATA_DIR = "./data"
-    COLLECTION_NAME = "default"
+async def main(data_dir: str = "./data", collection_name: str = "default"):
+    from tqdm.asyncio import tqdm
 
-    documents_path = [os.path.join(DATA_DIR, file) for file in os.listdir(DATA_DIR)]
+    #list all files in the data folder
+    documents_path = [os.path.join(data_dir, file) for file in os.listdir(data_dir)]
     try:
-        await zclient.collections.add(collection_name=COLLECTION_NAME)
+        await get_zclient().collections.add(collection_name=collection_name)
     except ConflictError:
-        print(f"Collection '{COLLECTION_NAME}' already exists")
-    print(f"Indexing {len(documents_path)} documents in collection '{COLLECTION_NAME}'")
-    await tqdm.gather(*[index_document(document_path, COLLECTION_NAME) for document_path in documents_path], desc="Indexing Documents")
-    print(f"Indexing completed for collection '{COLLECTION_NAME}'")
+        print(f"Collection '{collection_name}' already exists")
+    print(f"Indexing {len(documents_path)} documents in collection '{collection_name}'")
+    global pdf_pool
+    if LOCAL_PDF_EXTRACTION:
+        pdf_pool = ProcessPoolExecutor()
+    try:
+        await tqdm.gather(*[index_document(document_path, collection_name) for document_path in documents_path], desc="Indexing Documents")
+    finally:
+        if pdf_pool is not None:
+            pdf_pool.shutdown()
+    print(f"Indexing completed for collection '{collection_name}'")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Local text extraction for born-digital PDFs.
+
+Uploading a PDF as `{"type": "auto", "base64_data": ...}` sends the whole file,
+33% larger once base64-encoded, and OCRs it remotely. Most PDFs that are not
+scans already have a text layer; for those we extract the text of each page
+locally and upload `{"type": "text-pages", "pages": [...]}` instead.
+
+`extract_text_pages` returns None when any page has no text layer (a scan, or
+a digital PDF with scanned pages, whose text would otherwise be lost), when the
+PDF can't be read, or when pypdf isn't installed, and the caller falls back to
+`auto`. It takes a path, so it can run in a process pool without
+sending the file bytes between processes.
+"""
+
+import importlib.util
+
+# A page counts as having a text layer when it has at least this many non-space characters
+MIN_CHARS_PER_PAGE = 25
+# Share of pages that must have text. Any page without it would be uploaded as an
+# empty string and its content lost, so by default every page must have text
+MIN_TEXT_PAGE_RATIO = 1.0
+
+
+def local_extraction_available() -> bool:
+    # pypdf is optional (pip install pypdf), and only imported when a PDF is extracted
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def pages_without_text(pages: list[str], min_chars: int = MIN_CHARS_PER_PAGE) -> list[int]:
+    """Indices of the pages with fewer than `min_chars` non-space characters."""
+    return [i for i, page in enumerate(pages) if len("".join(page.split())) < min_chars]
+
+
+def has_text_layer(pages: list[str], min_chars: int = MIN_CHARS_PER_PAGE, min_ratio: float = MIN_TEXT_PAGE_RATIO) -> bool:
+    if not pages:
+        return False
+    text_pages = len(pages) - len(pages_without_text(pages, min_chars))
+    return text_pages / len(pages) >= min_ratio
+
+
+def extract_text_pages(pdf_path: str) -> list[str] | None:
+    """
+    Text of each page of a PDF, or None if it should be OCRed instead.
+
+    Args:
+        pdf_path: Path to the PDF file.
+
+    Returns:
+        One string per page, or None for (partly) scanned, unreadable or encrypted PDFs.
+    """
+    if not local_extraction_available():
+        return None
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(pdf_path)
+        if reader.is_encrypted:
+            return None
+        pages = [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        print(f"Could not extract text from '{pdf_path}', falling back to OCR: {e}")
+        return None
+    if has_text_layer(pages):
+        return pages
+    missing = pages_without_text(pages)
+    if 0 < len(missing) < len(pages):
+        print(f"'{pdf_path}': {len(missing)} of {len(pages)} pages have no text layer "
+              f"(page {', '.join(str(i + 1) for i in missing[:10])}{' ...' if len(missing) > 10 else ''}), "
+              f"uploading the PDF for OCR")
+    return None
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+
+    # Compare upload sizes for every PDF in a folder (default: ./data)
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "./data"
+    pdf_paths = [os.path.join(data_dir, f) for f in sorted(os.listdir(data_dir)) if f.lower().endswith(".pdf")]
+    if not local_extraction_available():
+        sys.exit("pypdf is not installed: pip install pypdf")
+
+    base64_bytes = text_bytes = 0
+    start = time.perf_counter()
+    for path in pdf_paths:
+        pages = extract_text_pages(path)
+        size = (os.path.getsize(path) + 2) // 3 * 4
+        if pages is None:
+            print(f"{path}: scanned, upload as auto ({size / 1e6:.2f} MB)")
+            text_bytes += size
+        else:
+            n_bytes = sum(len(page.encode("utf-8")) for page in pages)
+            print(f"{path}: {len(pages)} text pages ({n_bytes / 1e6:.2f} MB instead of {size / 1e6:.2f} MB)")
+            text_bytes += n_bytes
+        base64_bytes += size
+    print(f"\n{len(pdf_paths)} PDFs in {time.perf_counter() - start:.1f}s: "
+          f"{text_bytes / 1e6:.2f} MB to upload instead of {base64_bytes / 1e6:.2f} MB")
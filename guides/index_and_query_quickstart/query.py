@@ -1,14 +1,18 @@
 from zeroentropy import AsyncZeroEntropy
 import asyncio
+import functools
 from dotenv import load_dotenv
 
 load_dotenv()
 
-zclient = AsyncZeroEntropy()
+# The client is created on first use, so importing this module stays cheap
+@functools.cache
+def get_zclient() -> AsyncZeroEntropy:
+    return AsyncZeroEntropy()
 
 async def query_collection(collection_name: str, query: str, top_k_csv: int = 5, top_k_txt: int = 10) -> None:
     # get the top 5 rows of the csv
-    response_csv = await zclient.queries.top_documents(collection_name=collection_name, 
+    response_csv = await get_zclient().queries.top_documents(collection_name=collection_name, 
                                                        k=top_k_csv, 
                                                        query=query, 
                                                        filter={
@@ -16,7 +20,7 @@ async def query_collection(collection_name: str, query: str, top_k_csv: int = 5,
                                                                 {"$eq":"csv"}
                                                             }
                                                        )
-    response_txt = await zclient.queries.top_snippets(collection_name=collection_name, 
+    response_txt = await get_zclient().queries.top_snippets(collection_name=collection_name, 
                                                       k=top_k_txt, 
                                                       query=query, 
                                                       precise_responses = True, # this controls the length of the snippets (around 200 chars or 2000 chars more or less)
@@ -28,7 +32,7 @@ async def query_collection(collection_name: str, query: str, top_k_csv: int = 5,
     # get the content of the documents csv (not included in the response for top documents)
     final_response = []
     for result in response_csv.results:
-        document_content = await zclient.documents.get_info(collection_name=collection_name, path=result.path, include_content=True)
+        document_content = await get_zclient().documents.get_info(collection_name=collection_name, path=result.path, include_content=True)
         response = {
             "path": result.path,
             "content": document_content.document.content,
@@ -0,0 +1,272 @@
+"""
+Fan one query out over several collections and metadata filters, and merge the results.
+
+`query.py` queries one collection with two filters, one after the other. When
+the same query runs over many collections (or many `batch` / `stage` /
+`list:industries` partitions of one), `QueryPlanner`:
+
+- runs one request per partition concurrently, with a bound,
+- merges the results into a global top-k with a heap, as partitions respond,
+  dropping duplicates when filters overlap,
+- caches each partition's result set (LRU with a TTL), so repeated queries only
+  hit the partitions that changed or were never queried,
+- reports, per partition, how many results it returned and how many made the
+  global top-k, and keeps counts across queries so partitions that never
+  contribute can be pruned from the fan-out.
+
+Scores are merged as returned, so they should come from the same kind of query
+(`top_documents`, `top_snippets` or `top_pages`) on comparable collections.
+
+Usage:
+
+    planner = QueryPlanner(zclient)
+    partitions = partitions_for(["default"], [{"type": {"$eq": "csv"}}, {"type": {"$ne": "csv"}}])
+    plan = await planner.search("revenue growth", partitions, k=10)
+    print(plan.report())
+"""
+
+import asyncio
+import heapq
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from zeroentropy import AsyncZeroEntropy
+
+QUERY_KINDS = ("documents", "snippets", "pages")
+
+
+@dataclass(frozen=True)
+class Partition:
+    collection_name: str
+    filter: str | None = None  # canonical JSON of the metadata filter, see `partition`
+
+    @property
+    def filter_dict(self) -> dict | None:
+        return json.loads(self.filter) if self.filter is not None else None
+
+    def __str__(self) -> str:
+        return f"{self.collection_name}{' ' + self.filter if self.filter else ''}"
+
+
+def partition(collection_name: str, filter: dict | None = None) -> Partition:
+    """A partition: a collection, optionally narrowed by a metadata filter."""
+    return Partition(collection_name, json.dumps(filter, sort_keys=True) if filter else None)
+
+
+def partitions_for(collection_names: list[str], filters: list[dict | None] | None = None) -> list[Partition]:
+    """Every combination of a collection and a filter (no filter if `filters` is None)."""
+    return [partition(name, f) for name in collection_names for f in (filters or [None])]
+
+
+@dataclass
+class PartitionStats:
+    partition: Partition
+    returned: int = 0
+    contributed: int = 0  # results in the global top-k
+    latency_s: float = 0.0
+    cached: bool = False
+    error: str | None = None
+
+
+@dataclass
+class PlanResult:
+    results: list = field(default_factory=list)  # (score, partition, result) in descending score order
+    partitions: list[PartitionStats] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    @property
+    def contributing(self) -> list[Partition]:
+        return [stats.partition for stats in self.partitions if stats.contributed]
+
+    def report(self) -> str:
+        lines = [f"{len(self.results)} results from {len(self.contributing)}/{len(self.partitions)} partitions "
+                 f"in {self.elapsed_s * 1000:.0f}ms"]
+        for stats in sorted(self.partitions, key=lambda s: -s.contributed):
+            status = stats.error or ("cached" if stats.cached else f"{stats.latency_s * 1000:.0f}ms")
+            lines.append(f"  {stats.contributed:>3}/{stats.returned:<3} {stats.partition} ({status})")
+        return "\n".join(lines)
+
+
+def result_key(kind: str, partition: Partition, result) -> tuple:
+    """Identity of a result, so the same hit from overlapping filters is counted once."""
+    if kind == "pages":
+        return partition.collection_name, result.path, result.page_index
+    if kind == "snippets":
+        return partition.collection_name, result.path, result.start_index
+    return partition.collection_name, result.path
+
+
+class QueryPlanner:
+    def __init__(
+        self,
+        zclient: AsyncZeroEntropy,
+        concurrency: int = 8,
+        cache_size: int = 1024,
+        cache_ttl_s: float = 300.0,
+    ):
+        """
+        Args:
+            zclient: An AsyncZeroEntropy client.
+            concurrency: Partition requests in flight.
+            cache_size: Partition result sets kept in the LRU cache (0 disables it).
+            cache_ttl_s: Seconds a cached result set stays valid.
+        """
+        self.zclient = zclient
+        self.sem = asyncio.Semaphore(concurrency)
+        self.cache_size = cache_size
+        self.cache_ttl_s = cache_ttl_s
+        self.cache = OrderedDict()  # key -> (timestamp, results)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # partition -> [queries, queries where it contributed, results contributed]
+        self.history = {}
+
+    async def _query_partition(self, kind: str, query: str, part: Partition, k: int, query_kwargs: dict):
+        key = (kind, part, query, k, json.dumps(query_kwargs, sort_keys=True))
+        entry = self.cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.cache_ttl_s:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return entry[1], True
+        self.cache_misses += 1
+
+        filter_kwargs = {"filter": part.filter_dict} if part.filter is not None else {}
+        async with self.sem:
+            if kind == "documents":
+                response = await self.zclient.queries.top_documents(
+                    collection_name=part.collection_name, query=query, k=k, **filter_kwargs, **query_kwargs)
+            elif kind == "snippets":
+                response = await self.zclient.queries.top_snippets(
+                    collection_name=part.collection_name, query=query, k=k, **filter_kwargs, **query_kwargs)
+            else:
+                response = await self.zclient.queries.top_pages(
+                    collection_name=part.collection_name, query=query, k=k, **filter_kwargs, **query_kwargs)
+
+        results = list(response.results)
+        if self.cache_size:
+            self.cache[key] = (time.monotonic(), results)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return results, False
+
+    async def search(
+        self,
+        query: str,
+        partitions: list[Partition],
+        k: int = 10,
+        kind: str = "documents",
+        partition_k: int | None = None,
+        **query_kwargs,
+    ) -> PlanResult:
+        """
+        Query every partition concurrently and merge the results into a global top-k.
+
+        Args:
+            query: The query string.
+            partitions: Collections and filters to query (see `partitions_for`).
+            k: Number of merged results.
+            kind: "documents", "snippets" or "pages".
+            partition_k: Results requested per partition. Defaults to k, which
+                guarantees an exact global top-k; smaller is cheaper but approximate.
+            **query_kwargs: Passed to every request (e.g. include_metadata=True, precise_responses=True).
+
+        Returns:
+            A PlanResult with the merged results and per-partition statistics.
+        """
+        if kind not in QUERY_KINDS:
+            raise ValueError(f"kind must be one of {QUERY_KINDS}, got '{kind}'")
+        start = time.perf_counter()
+        partitions = list(dict.fromkeys(partitions))
+        stats = {part: PartitionStats(part) for part in partitions}
+
+        # Min-heap of the best k so far: (score, tiebreak, partition, result)
+        heap = []
+        seen = set()
+        counter = 0
+
+        async def run(part: Partition):
+            t0 = time.perf_counter()
+            try:
+                results, cached = await self._query_partition(kind, query, part, partition_k or k, query_kwargs)
+            except Exception as e:
+                stats[part].error = f"error: {e!r}"
+                print(f"Partition {part} failed: {e}")
+                results, cached = [], False
+            stats[part].latency_s = time.perf_counter() - t0
+            stats[part].cached = cached
+            stats[part].returned = len(results)
+            return part, results
+
+        for next_done in asyncio.as_completed([run(part) for part in partitions]):
+            part, results = await next_done
+            # Results arrive sorted by score, so stop at the first one that can't enter the heap
+            for result in results:
+                if len(heap) == k and result.score <= heap[0][0]:
+                    break
+                key = result_key(kind, part, result)
+                if key in seen:
+                    continue
+                seen.add(key)
+                counter += 1
+                item = (result.score, -counter, part, result)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heapreplace(heap, item)
+
+        merged = sorted(heap, reverse=True)
+        for _, _, part, _ in merged:
+            stats[part].contributed += 1
+        for part, part_stats in stats.items():
+            history = self.history.setdefault(part, [0, 0, 0])
+            history[0] += 1
+            history[1] += part_stats.contributed > 0
+            history[2] += part_stats.contributed
+
+        return PlanResult(
+            results=[(score, part, result) for score, _, part, result in merged],
+            partitions=list(stats.values()),
+            elapsed_s=time.perf_counter() - start,
+        )
+
+    def unproductive_partitions(self, min_queries: int = 10, max_hit_rate: float = 0.0) -> list[Partition]:
+        """
+        Partitions that rarely reach the global top-k, candidates to drop from the fan-out.
+
+        Args:
+            min_queries: Only judge partitions queried at least this many times.
+            max_hit_rate: Share of queries a partition contributed to, at or below which it is returned.
+        """
+        return [
+            part for part, (queries, hits, _) in self.history.items()
+            if queries >= min_queries and hits / queries <= max_hit_rate
+        ]
+
+    def invalidate(self, collection_name: str | None = None):
+        """Drop cached result sets, for one collection (e.g. after indexing into it) or all of them."""
+        if collection_name is None:
+            self.cache.clear()
+            return
+        for key in [key for key in self.cache if key[1].collection_name == collection_name]:
+            del self.cache[key]
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    async def main():
+        planner = QueryPlanner(AsyncZeroEntropy())
+        partitions = partitions_for(["default"], [{"type": {"$eq": "csv"}}, {"type": {"$ne": "csv"}}])
+        for query in ["This is a test query", "This is a test query", "Another test query"]:
+            plan = await planner.search(query, partitions, k=10, include_metadata=True)
+            print(f"Query: {query}\n{plan.report()}")
+            for score, part, result in plan.results[:3]:
+                print(f"  {score:.4f} {result.path} [{part}]")
+        print(f"Cache: {planner.cache_hits} hits, {planner.cache_misses} misses")
+        print(f"Never contributed: {[str(p) for p in planner.unproductive_partitions(min_queries=3)]}")
+
+    asyncio.run(main())
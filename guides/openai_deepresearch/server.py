@@ -7,22 +7,24 @@ capabilities designed to work with ChatGPT's deep research feature.
 This will require installing the dependencies in requirements.txt. Hosting can be done on a cloud provider, but the easiest is replit!
 """
 
+import functools
 import logging
-import uvicorn
 import os
 from typing import Set, Dict, List, Any
 from zeroentropy import AsyncZeroEntropy
 
-from fastmcp import FastMCP
-from fastmcp.server.dependencies import get_http_headers
-from starlette.requests import Request
-from starlette.exceptions import HTTPException
+# fastmcp, starlette and uvicorn are imported in create_server() and main(), so
+# importing this module (e.g. from the ze_cli.py entry point) stays fast
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-zclient = AsyncZeroEntropy(api_key="")
+
+@functools.cache
+def get_zclient() -> AsyncZeroEntropy:
+    # Requests are authenticated with the caller's Authorization header, not a server key
+    return AsyncZeroEntropy(api_key="")
 
 server_instructions = """
 This MCP server provides search and document retrieval capabilities
@@ -34,6 +36,9 @@ document content with citations.
 
 def create_server():
     """Create and configure the MCP server with search and fetch tools."""
+    from fastmcp import FastMCP
+    from fastmcp.server.dependencies import get_http_headers
+    from starlette.exceptions import HTTPException
 
     # Initialize the FastMCP server
     mcp = FastMCP(name="Sample Deep Research MCP Server",
@@ -60,7 +65,7 @@ def create_server():
         if collection_name is None:
             raise HTTPException(status_code=400, detail="The header X-Collection-Name must be provided.")
 
-        response = await zclient.queries.top_snippets(
+        response = await get_zclient().queries.top_snippets(
             collection_name=collection_name,
             k=15,
             query=query,
@@ -119,7 +124,7 @@ def create_server():
         if collection_name is None:
             raise HTTPException(status_code=400, detail="The header X-Collection-Name must be provided.")
 
-        response = await zclient.documents.get_info(
+        response = await get_zclient().documents.get_info(
             collection_name=collection_name,
             path=id,
             include_content=True,
@@ -145,19 +150,21 @@ def create_server():
     return mcp
 
 
-def main():
+def main(host: str = "localhost", port: int = 8000):
     """Main function to start the MCP server."""
+    import uvicorn
+
     # Create the MCP server
     deepresearch_fastmcp = create_server()
     sse_app = deepresearch_fastmcp.sse_app(path="/sse")
 
     # Configure and start the server
-    logger.info("Starting MCP server on 0.0.0.0:8000")
+    logger.info(f"Starting MCP server on {host}:{port}")
     logger.info("Server will be accessible via SSE transport")
 
     try:
         # Use FastMCP's built-in run method with SSE transport
-        uvicorn.run(sse_app, host="localhost", port=8000)
+        uvicorn.run(sse_app, host=host, port=port)
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
@@ -0,0 +1,268 @@
+"""
+Async ingestion of PDFs from a list of URLs (e.g. arXiv links) into a collection.
+
+`process_pdf` in search_over_many_pdfs.ipynb opens a new connection per PDF,
+buffers each download whole, and uploads from a thread pool with the sync
+client, returning only error strings. `ingest_urls`:
+
+- downloads through one pooled `httpx.AsyncClient` (already installed with
+  `zeroentropy`), streaming each body and aborting past `max_bytes`,
+- runs `download_concurrency` downloads and `upload_concurrency` uploads, with
+  a bounded queue between them: when uploads fall behind, downloads wait,
+  so at most a fixed number of PDFs is held in memory,
+- skips duplicate URLs,
+- returns an `IngestReport` with a status, size, timings and error per URL.
+
+Usage:
+
+    from pdf_url_ingest import ingest_urls
+
+    report = await ingest_urls(AsyncZeroEntropy(), "arxiv_zero_entropy_papers", pdf_list)
+    print(report)
+
+Run `python pdf_url_ingest.py` to benchmark against a local HTTP server, with
+a stub uploader, compared to the notebook's thread-pool approach.
+"""
+
+import asyncio
+import base64
+import time
+from dataclasses import dataclass, field
+
+import httpx
+from zeroentropy import AsyncZeroEntropy, ConflictError
+
+MAX_PDF_BYTES = 50_000_000
+
+
+@dataclass
+class UrlResult:
+    url: str
+    status: str  # "uploaded", "exists", "duplicate" or "failed"
+    bytes: int = 0
+    download_s: float = 0.0
+    upload_s: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class IngestReport:
+    results: list[UrlResult] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def by_status(self, status: str) -> list[UrlResult]:
+        return [r for r in self.results if r.status == status]
+
+    @property
+    def failed(self) -> list[UrlResult]:
+        return self.by_status("failed")
+
+    def __str__(self) -> str:
+        counts = {status: len(self.by_status(status)) for status in ("uploaded", "exists", "duplicate", "failed")}
+        total_bytes = sum(r.bytes for r in self.results if r.status in ("uploaded", "exists"))
+        lines = [
+            f"{len(self.results)} URLs in {self.elapsed_s:.2f}s: " + ", ".join(f"{n} {s}" for s, n in counts.items()),
+            f"{total_bytes / 1e6:.1f} MB downloaded, {total_bytes / 1e6 / max(self.elapsed_s, 1e-9):.1f} MB/s, "
+            f"{(counts['uploaded'] + counts['exists']) / max(self.elapsed_s, 1e-9):.1f} documents/s",
+        ]
+        lines += [f"  failed {r.url}: {r.error}" for r in self.failed]
+        return "\n".join(lines)
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+async def download_pdf(http: httpx.AsyncClient, url: str, max_bytes: int = MAX_PDF_BYTES) -> bytes:
+    """Stream `url` into memory, failing as soon as it exceeds `max_bytes`."""
+    async with http.stream("GET", url) as response:
+        response.raise_for_status()
+        declared = response.headers.get("content-length")
+        if declared is not None and int(declared) > max_bytes:
+            raise DownloadTooLarge(f"{declared} bytes > {max_bytes}")
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > max_bytes:
+                raise DownloadTooLarge(f"more than {max_bytes} bytes")
+    return bytes(body)
+
+
+def auto_content(pdf_bytes: bytes) -> dict:
+    """Document content that lets ZeroEntropy OCR the PDF."""
+    return {"type": "auto", "base64_data": base64.b64encode(pdf_bytes).decode("utf-8")}
+
+
+async def ingest_urls(
+    zclient: AsyncZeroEntropy,
+    collection_name: str,
+    urls: list[str],
+    download_concurrency: int = 8,
+    upload_concurrency: int = 4,
+    queue_size: int | None = None,
+    max_bytes: int = MAX_PDF_BYTES,
+    timeout: float = 30.0,
+    retries: int = 3,
+    http: httpx.AsyncClient | None = None,
+    make_content=auto_content,
+) -> IngestReport:
+    """
+    Download every URL and add it to a collection, with the URL as the document path.
+
+    Args:
+        zclient: An AsyncZeroEntropy client.
+        collection_name: The collection to add documents to.
+        urls: PDF URLs; repeated URLs are ingested once.
+        download_concurrency: Downloads in flight.
+        upload_concurrency: Uploads in flight.
+        queue_size: Downloaded PDFs waiting for an upload slot; defaults to upload_concurrency.
+        max_bytes: Maximum size of one PDF.
+        timeout: Per-request HTTP timeout in seconds.
+        retries: Upload attempts per document.
+        http: Optional shared httpx.AsyncClient; one is created (and closed) otherwise.
+        make_content: Builds the document content from the PDF bytes (default: base64 "auto").
+
+    Returns:
+        An IngestReport with one UrlResult per input URL, in input order.
+    """
+    start = time.perf_counter()
+    results = []
+    unique = {}
+    for url in urls:
+        key = url.strip()
+        if key in unique:
+            results.append(UrlResult(url, "duplicate"))
+        else:
+            unique[key] = UrlResult(key, "failed")
+            results.append(unique[key])
+
+    todo = asyncio.Queue()
+    for result in unique.values():
+        todo.put_nowait(result)
+    downloaded = asyncio.Queue(maxsize=queue_size or upload_concurrency)
+    own_http = http is None
+    if own_http:
+        limits = httpx.Limits(max_connections=download_concurrency, max_keepalive_connections=download_concurrency)
+        http = httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True)
+
+    async def downloader():
+        while not todo.empty():
+            result = todo.get_nowait()
+            t0 = time.perf_counter()
+            try:
+                pdf_bytes = await download_pdf(http, result.url, max_bytes)
+            except Exception as e:
+                result.error = f"download: {e!r}"
+                continue
+            finally:
+                result.download_s = time.perf_counter() - t0
+            result.bytes = len(pdf_bytes)
+            # Blocks while the upload queue is full; then drop our reference, so the
+            # bytes are freed by the uploader rather than kept until the next download
+            await downloaded.put((result, pdf_bytes))
+            pdf_bytes = None
+
+    async def uploader():
+        while True:
+            item = await downloaded.get()
+            if item is None:
+                return
+            result, pdf_bytes = item
+            # The queue item holds the bytes too; release it so only pdf_bytes refers to them
+            item = None
+            t0 = time.perf_counter()
+            try:
+                content = await asyncio.to_thread(make_content, pdf_bytes)
+                # Free the raw bytes before uploading, so they don't coexist with the base64 copy
+                pdf_bytes = None
+                for retry in range(retries):
+                    try:
+                        await zclient.documents.add(collection_name=collection_name, path=result.url, content=content)
+                        result.status = "uploaded"
+                        break
+                    except ConflictError:
+                        result.status = "exists"
+                        break
+                    except Exception as e:
+                        if retry == retries - 1:
+                            result.error = f"upload: {e!r}"
+                        else:
+                            await asyncio.sleep(0.5 * 2 ** retry)
+            except Exception as e:
+                result.error = f"upload: {e!r}"
+            finally:
+                result.upload_s = time.perf_counter() - t0
+
+    try:
+        uploaders = [asyncio.create_task(uploader()) for _ in range(upload_concurrency)]
+        await asyncio.gather(*[downloader() for _ in range(download_concurrency)])
+        for _ in uploaders:
+            await downloaded.put(None)
+        await asyncio.gather(*uploaders)
+    finally:
+        if own_http:
+            await http.aclose()
+
+    return IngestReport(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import os
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from types import SimpleNamespace
+
+    import requests
+
+    N_PDFS, PDF_BYTES, SERVER_LATENCY, UPLOAD_LATENCY = 60, 2_000_000, 0.1, 0.1
+    payload = os.urandom(PDF_BYTES)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(SERVER_LATENCY)
+            if self.path.startswith("/huge"):
+                self.send_response(200)
+                self.send_header("Content-Length", str(10 * PDF_BYTES))
+                self.end_headers()
+                return
+            self.send_response(200 if self.path.startswith("/pdf") else 404)
+            body = payload if self.path.startswith("/pdf") else b""
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/pdf/{i}" for i in range(N_PDFS)]
+
+    # The notebook's approach: a thread pool, one requests.get per PDF, then the upload
+    def process_pdf(url):
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        auto_content(response.content)
+        time.sleep(UPLOAD_LATENCY)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(process_pdf, urls))
+    baseline = time.perf_counter() - start
+    print(f"thread pool (10 workers): {N_PDFS} PDFs in {baseline:.2f}s, {N_PDFS * PDF_BYTES / 1e6 / baseline:.1f} MB/s")
+
+    async def stub_add(collection_name, path, content):
+        await asyncio.sleep(UPLOAD_LATENCY)
+
+    stub_client = SimpleNamespace(documents=SimpleNamespace(add=stub_add))
+    report = asyncio.run(ingest_urls(
+        stub_client, "benchmark", urls + urls[:5] + [f"{base}/missing", f"{base}/huge"],
+        download_concurrency=10, upload_concurrency=10, max_bytes=3 * PDF_BYTES,
+    ))
+    print(f"ingest_urls:\n{report}")
+    server.shutdown()
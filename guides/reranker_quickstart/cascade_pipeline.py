@@ -0,0 +1,376 @@
+"""
+Declarative retrieve -> hydrate -> truncate -> rerank cascade.
+
+stackoverflow_example.py fetches 50 documents one by one and reranks them
+once all are in; the llamaparse notebooks do the same with pages. Here each
+step is a stage with its own k, timeout and concurrency, and stages are
+chained as async generators, so a candidate moves on as soon as it is ready:
+rerank batches go out while other documents are still being fetched. A stage
+that stops reading early (its k was reached) closes the generators upstream of
+it, which cancels their in-flight requests.
+
+Stages:
+
+- `Retrieve`: `top_documents`, `top_pages` or `top_snippets` from a collection.
+- `Hydrate`: fetches missing content, from the API (`get_info` / `get_page_info`)
+  or from each document's `file_url`, with bounded concurrency.
+- `Truncate`: caps content length, which caps rerank payload size.
+- `Rerank`: scores batches with `models.rerank` (optionally through a
+  `RerankCache`) and keeps the top k.
+
+Every run returns per-stage timing, call and candidate counts.
+
+Usage:
+
+    pipeline = CascadePipeline(zclient, "cosqa", [
+        Retrieve("documents", k=50),
+        Hydrate(source="file_url", concurrency=16),
+        Truncate(max_chars=2000),
+        Rerank(k=10),
+    ])
+    result = await pipeline.run("Find absolute path in the file system")
+    print(result.report())
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from zeroentropy import AsyncZeroEntropy
+
+from rerank_cache import RerankCache
+from rerank_scheduler import RERANK_MODEL
+
+
+@dataclass
+class StageStats:
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    failed: int = 0
+    calls: int = 0
+    first_output_ms: float | None = None
+    done_ms: float | None = None
+
+
+@dataclass
+class _Context:
+    zclient: AsyncZeroEntropy
+    collection_name: str
+    query: str
+    started: float = field(default_factory=time.perf_counter)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+@dataclass
+class Retrieve:
+    """Candidate generation. Candidates are dicts with path, score and (when available) content."""
+    source: str = "documents"  # "documents", "pages" or "snippets"
+    k: int = 50
+    timeout: float = 5.0
+    include_content: bool = True  # pages only
+    precise_responses: bool = False  # snippets only
+    filter: dict | None = None
+    name: str = "retrieve"
+
+    async def process(self, ctx: _Context, items, stats: StageStats):
+        extra = {"filter": self.filter} if self.filter else {}
+        queries = ctx.zclient.queries
+        if self.source == "documents":
+            call = queries.top_documents(collection_name=ctx.collection_name, query=ctx.query, k=self.k, include_metadata=True, **extra)
+        elif self.source == "pages":
+            call = queries.top_pages(collection_name=ctx.collection_name, query=ctx.query, k=self.k, include_content=self.include_content, **extra)
+        elif self.source == "snippets":
+            call = queries.top_snippets(collection_name=ctx.collection_name, query=ctx.query, k=self.k, precise_responses=self.precise_responses, **extra)
+        else:
+            raise ValueError(f"Unknown source '{self.source}'")
+
+        stats.calls += 1
+        try:
+            response = await asyncio.wait_for(call, self.timeout)
+        except Exception as e:
+            print(f"⚠️ {self.name} failed: {e!r}")
+            stats.failed += 1
+            return
+        for result in response.results:
+            yield {
+                "path": result.path,
+                "score": result.score,
+                "page_index": getattr(result, "page_index", None),
+                "file_url": getattr(result, "file_url", None),
+                "metadata": getattr(result, "metadata", None),
+                "content": getattr(result, "content", None),
+            }
+
+
+@dataclass
+class Hydrate:
+    """Fetch content for candidates that arrived without it. Candidates whose fetch fails are dropped."""
+    k: int | None = None
+    concurrency: int = 8
+    timeout: float = 5.0
+    source: str = "api"  # "api" or "file_url"
+    name: str = "hydrate"
+
+    async def _fetch(self, ctx: _Context, candidate: dict, session) -> str | None:
+        if self.source == "file_url":
+            async with session.get(candidate["file_url"]) as response:
+                response.raise_for_status()
+                return await response.text()
+        if candidate.get("page_index") is not None:
+            info = await ctx.zclient.documents.get_page_info(
+                collection_name=ctx.collection_name, path=candidate["path"], page_index=candidate["page_index"], include_content=True,
+            )
+            return info.page.content
+        info = await ctx.zclient.documents.get_info(collection_name=ctx.collection_name, path=candidate["path"], include_content=True)
+        return info.document.content
+
+    async def process(self, ctx: _Context, items, stats: StageStats):
+        sem = asyncio.Semaphore(self.concurrency)
+        done = asyncio.Queue()
+        session = None
+        if self.source == "file_url":
+            # Only file_url hydration needs aiohttp, so API-only pipelines run without it
+            import aiohttp
+
+            session = aiohttp.ClientSession()
+
+        async def fetch(candidate):
+            async with sem:
+                stats.calls += 1
+                try:
+                    content = await asyncio.wait_for(self._fetch(ctx, candidate, session), self.timeout)
+                except Exception:
+                    content = None
+            await done.put((candidate, content))
+
+        def finished(candidate, content):
+            if content and content.strip():
+                return {**candidate, "content": content.strip()}
+            stats.failed += 1
+            return None
+
+        tasks = []
+        pending = received = 0
+        try:
+            async for candidate in items:
+                received += 1
+                if candidate.get("content"):
+                    yield candidate
+                else:
+                    tasks.append(asyncio.create_task(fetch(candidate)))
+                    pending += 1
+                while not done.empty():
+                    pending -= 1
+                    if (hydrated := finished(*done.get_nowait())) is not None:
+                        yield hydrated
+                if self.k is not None and received >= self.k:
+                    break
+            # Upstream stages may be suspended mid-stream (after the break): close them
+            # now, cancelling their in-flight requests, rather than after our own fetches
+            await items.aclose()
+            while pending:
+                pending -= 1
+                if (hydrated := finished(*await done.get())) is not None:
+                    yield hydrated
+        finally:
+            for task in tasks:
+                task.cancel()
+            if session is not None:
+                await session.close()
+            await items.aclose()
+
+
+@dataclass
+class Truncate:
+    """Cap each candidate's content at `max_chars`, cutting at a word boundary."""
+    max_chars: int = 4000
+    name: str = "truncate"
+
+    async def process(self, ctx: _Context, items, stats: StageStats):
+        try:
+            async for candidate in items:
+                content = candidate.get("content") or ""
+                if len(content) > self.max_chars:
+                    cut = content[:self.max_chars]
+                    content = cut[:cut.rfind(" ")] if " " in cut else cut
+                yield {**candidate, "content": content}
+        finally:
+            await items.aclose()
+
+
+@dataclass
+class Rerank:
+    """
+    Rerank candidates in batches as they arrive and yield the top k.
+
+    Batches that fail or time out leave their candidates unscored; those are
+    placed after the scored ones, in upstream order.
+    """
+    k: int = 10
+    model: str = RERANK_MODEL
+    batch_size: int = 25
+    concurrency: int = 4
+    timeout: float = 10.0
+    cache: RerankCache | None = None
+    name: str = "rerank"
+
+    async def process(self, ctx: _Context, items, stats: StageStats):
+        sem = asyncio.Semaphore(self.concurrency)
+        candidates = []
+        scores = {}
+
+        async def score_batch(start: int, batch: list[dict]):
+            documents = [c.get("content") or "" for c in batch]
+            async with sem:
+                stats.calls += 1
+                try:
+                    if self.cache is not None:
+                        results = await asyncio.wait_for(self.cache.rerank(ctx.zclient, ctx.query, documents, model=self.model), self.timeout)
+                    else:
+                        response = await asyncio.wait_for(
+                            ctx.zclient.models.rerank(model=self.model, query=ctx.query, documents=documents), self.timeout,
+                        )
+                        results = response.results
+                except Exception as e:
+                    print(f"⚠️ {self.name} batch failed: {e!r}")
+                    stats.failed += len(batch)
+                    return
+            for r in results:
+                scores[start + r.index] = r.relevance_score
+
+        tasks = []
+        batch = []
+        try:
+            async for candidate in items:
+                candidates.append(candidate)
+                batch.append(candidate)
+                if len(batch) == self.batch_size:
+                    tasks.append(asyncio.create_task(score_batch(len(candidates) - len(batch), batch)))
+                    batch = []
+            if batch:
+                tasks.append(asyncio.create_task(score_batch(len(candidates) - len(batch), batch)))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await items.aclose()
+
+        scored = sorted(scores, key=scores.get, reverse=True)
+        unscored = [i for i in range(len(candidates)) if i not in scores]
+        for i in (scored + unscored)[:self.k]:
+            yield {**candidates[i], "rerank_score": scores.get(i)}
+
+
+@dataclass
+class CascadeResult:
+    results: list[dict]
+    stats: list[StageStats]
+    total_ms: float
+
+    def report(self) -> str:
+        """
+        Per-stage table: candidates in/out, failures, calls, time to first output and to done.
+
+        A done time of "-" means a downstream stage stopped reading early (its k was reached).
+        """
+        lines = [f"{'stage':<10} {'in':>5} {'out':>5} {'failed':>7} {'calls':>6} {'first ms':>9} {'done ms':>9}"]
+        for s in self.stats:
+            first = f"{s.first_output_ms:.0f}" if s.first_output_ms is not None else "-"
+            done = f"{s.done_ms:.0f}" if s.done_ms is not None else "-"
+            lines.append(f"{s.name:<10} {s.items_in:>5} {s.items_out:>5} {s.failed:>7} {s.calls:>6} {first:>9} {done:>9}")
+        lines.append(f"total {self.total_ms:.0f} ms, {len(self.results)} results")
+        return "\n".join(lines)
+
+
+class CascadePipeline:
+    """A chain of stages run for each query."""
+
+    def __init__(self, zclient: AsyncZeroEntropy, collection_name: str, stages: list):
+        self.zclient = zclient
+        self.collection_name = collection_name
+        self.stages = stages
+
+    async def run(self, query: str) -> CascadeResult:
+        ctx = _Context(self.zclient, self.collection_name, query)
+        all_stats = []
+
+        # Leaving an `async for` early doesn't close the generator it reads from,
+        # so every link closes its upstream explicitly, down to the first stage
+        async def count_in(items, stats):
+            try:
+                async for item in items:
+                    stats.items_in += 1
+                    yield item
+            finally:
+                await items.aclose()
+
+        async def count_out(items, stats):
+            try:
+                async for item in items:
+                    stats.items_out += 1
+                    if stats.first_output_ms is None:
+                        stats.first_output_ms = ctx.elapsed_ms()
+                    yield item
+                stats.done_ms = ctx.elapsed_ms()
+            finally:
+                await items.aclose()
+
+        async def nothing():
+            return
+            yield
+
+        stream = nothing()
+        for stage in self.stages:
+            stats = StageStats(stage.name)
+            all_stats.append(stats)
+            stream = count_out(stage.process(ctx, count_in(stream, stats), stats), stats)
+
+        results = [item async for item in stream]
+        return CascadeResult(results, all_stats, ctx.elapsed_ms())
+
+
+def documents_cascade(k: int = 50, top_n: int = 10) -> list:
+    """stackoverflow_example.py as a cascade: top documents, fetch each file_url, rerank."""
+    return [
+        Retrieve("documents", k=k),
+        Hydrate(source="file_url", concurrency=16),
+        Truncate(max_chars=4000),
+        Rerank(k=top_n),
+    ]
+
+
+def pages_cascade(k: int = 20, top_n: int = 5) -> list:
+    """The llamaparse notebooks as a cascade: top pages with inline content, fetch the rest, rerank."""
+    return [
+        Retrieve("pages", k=k, include_content=True),
+        Hydrate(concurrency=8),
+        Rerank(k=top_n),
+    ]
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    collection_name = sys.argv[1] if len(sys.argv) > 1 else "cosqa"
+    query = sys.argv[2] if len(sys.argv) > 2 else "Find absolute path in the file system"
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        pipeline = CascadePipeline(zclient, collection_name, documents_cascade())
+        result = await pipeline.run(query)
+        print(result.report())
+        print()
+        for i, item in enumerate(result.results, 1):
+            score = f"{item['rerank_score']:.4f}" if item["rerank_score"] is not None else "N/A"
+            preview = item["content"][:67].replace("\n", " ")
+            print(f"{i:<4} {score:<8} {preview}")
+
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+"""
+Pipelined zip -> LlamaParse -> ZeroEntropy ingestion.
+
+The llamaparse notebooks read the whole zip into a `BytesIO`, extract every
+PDF into memory, parse them all with one `asyncio.gather`, and only then
+upload. Here:
+
+1. the zip is streamed to a temporary file instead of memory,
+2. PDF entries are read from it one at a time, only when a parse slot is free,
+   so at most `parse_concurrency` PDFs are held in memory,
+3. each document is uploaded as soon as its pages are parsed, while other
+   files are still being parsed.
+
+The parser and uploader are plain async callables, so the pipeline can be run
+against a local zip with stubs (see `__main__`).
+
+Usage:
+
+    parse = llamaparse_parser(llamaParser)
+    upload = zeroentropy_uploader(zclient, collection_name)
+    report = await ingest_url(dropbox_url, parse, upload)
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+import requests
+from zeroentropy import AsyncZeroEntropy, ConflictError
+
+
+@dataclass
+class IngestReport:
+    documents: int = 0
+    pages: int = 0
+    uploaded: int = 0
+    existing: int = 0
+    failed: list = field(default_factory=list)
+    first_upload_s: float | None = None
+    total_s: float = 0.0
+    peak_buffered_bytes: int = 0
+
+    def __str__(self) -> str:
+        first = f"{self.first_upload_s:.2f}s" if self.first_upload_s is not None else "-"
+        return (f"{self.uploaded}/{self.documents} documents ({self.pages} pages) uploaded in {self.total_s:.2f}s, "
+                f"first upload done after {first}, peak {self.peak_buffered_bytes / 1e6:.1f} MB of PDFs in memory, "
+                f"{self.existing} already in the collection, {len(self.failed)} failed")
+
+
+def download_to_tempfile(url: str, chunk_size: int = 1 << 20) -> str:
+    """Stream `url` to a temporary .zip file and return its path. The caller deletes it."""
+    print(f"Downloading zip file from: {url}")
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+    return f.name
+
+
+def pdf_entries(zip_file: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """The PDF members of an open zip (metadata only; nothing is decompressed)."""
+    return [info for info in zip_file.infolist() if not info.is_dir() and info.filename.lower().endswith(".pdf")]
+
+
+def llamaparse_parser(llama_parser):
+    """Parse callable for `ingest_zip` backed by a LlamaParse client."""
+
+    async def parse(filename: str, content: bytes) -> list[str]:
+        file_obj = io.BytesIO(content)
+        file_obj.name = filename  # LlamaParse reads the name from the file object
+        result = await llama_parser.aparse(file_obj, extra_info={"file_name": filename})
+        return [page.text for page in result.pages]
+
+    return parse
+
+
+def zeroentropy_uploader(zclient: AsyncZeroEntropy, collection_name: str, retries: int = 3):
+    """
+    Upload callable for `ingest_zip` that adds each document as text pages.
+
+    A document that is already in the collection raises ConflictError, which
+    `ingest_zip` counts as existing rather than uploaded.
+    """
+
+    async def upload(filename: str, pages: list[str]):
+        for retry in range(retries):
+            try:
+                return await zclient.documents.add(
+                    collection_name=collection_name,
+                    path=filename,
+                    content={"type": "text-pages", "pages": pages},
+                )
+            except ConflictError:
+                raise
+            except Exception:
+                if retry == retries - 1:
+                    raise
+                await asyncio.sleep(0.1 * (retry + 1))
+
+    return upload
+
+
+async def ingest_zip(zip_path: str, parse, upload, parse_concurrency: int = 4, upload_concurrency: int = 16) -> IngestReport:
+    """
+    Parse and upload every PDF in a zip file, pipelined.
+
+    Args:
+        zip_path: Path to a local zip file.
+        parse: async (filename, pdf_bytes) -> list of page texts.
+        upload: async (filename, pages) -> anything; ConflictError marks the document as
+            already present, other exceptions mark it failed.
+        parse_concurrency: PDFs read and parsed at once (bounds memory).
+        upload_concurrency: Uploads in flight at once.
+
+    Returns:
+        An IngestReport.
+    """
+    report = IngestReport()
+    start = time.perf_counter()
+    parse_slots = asyncio.Semaphore(parse_concurrency)
+    upload_slots = asyncio.Semaphore(upload_concurrency)
+    buffered = 0
+    tasks = []
+
+    async def upload_document(filename: str, pages: list[str]):
+        async with upload_slots:
+            try:
+                await upload(filename, pages)
+            except ConflictError:
+                print(f"Document '{filename}' already exists, skipped")
+                report.existing += 1
+                return
+            except Exception as e:
+                print(f"Failed to add document '{filename}': {e}")
+                report.failed.append(filename)
+                return
+        report.uploaded += 1
+        if report.first_upload_s is None:
+            report.first_upload_s = time.perf_counter() - start
+        print(f"Uploaded {filename} ({len(pages)} pages)")
+
+    async def parse_document(filename: str, content: bytes):
+        nonlocal buffered
+        try:
+            pages = await parse(filename, content)
+        except Exception as e:
+            print(f"Failed to parse '{filename}': {e}")
+            report.failed.append(filename)
+            return
+        finally:
+            buffered -= len(content)
+            parse_slots.release()
+        report.pages += len(pages)
+        tasks.append(asyncio.create_task(upload_document(filename, pages)))
+
+    with zipfile.ZipFile(zip_path) as zip_file:
+        for info in pdf_entries(zip_file):
+            # Only decompress the next PDF once a parse slot is free
+            await parse_slots.acquire()
+            content = await asyncio.to_thread(zip_file.read, info)
+            buffered += len(content)
+            report.peak_buffered_bytes = max(report.peak_buffered_bytes, buffered)
+            report.documents += 1
+            tasks.append(asyncio.create_task(parse_document(info.filename, content)))
+            del content
+
+        # Uploads are appended to `tasks` as parses finish
+        while not all(task.done() for task in tasks):
+            await asyncio.gather(*tasks)
+
+    report.total_s = time.perf_counter() - start
+    return report
+
+
+async def ingest_url(url: str, parse, upload, **ingest_kwargs) -> IngestReport:
+    """Download a zip to a temporary file, ingest it with `ingest_zip`, then delete it."""
+    zip_path = await asyncio.to_thread(download_to_tempfile, url)
+    try:
+        return await ingest_zip(zip_path, parse, upload, **ingest_kwargs)
+    finally:
+        os.remove(zip_path)
+
+
+if __name__ == "__main__":
+    import random
+
+    import httpx
+
+    # Local zip with stand-in PDFs, a slow stub parser and a stub uploader
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = os.path.join(tmp, "example_docs.zip")
+        with zipfile.ZipFile(zip_path, "w") as zip_file:
+            for i in range(12):
+                zip_file.writestr(f"example_docs/report_{i}.pdf", os.urandom(random.randint(1, 4) * 500_000))
+            zip_file.writestr("example_docs/readme.txt", "not a pdf")
+
+        async def stub_parse(filename: str, content: bytes) -> list[str]:
+            await asyncio.sleep(len(content) / 4_000_000)
+            return [f"{filename} page {p}" for p in range(len(content) // 250_000)]
+
+        async def stub_upload(filename: str, pages: list[str]):
+            await asyncio.sleep(0.05)
+            if filename.endswith("_0.pdf"):
+                # Stand-in for a document left over from an earlier run
+                raise ConflictError("already exists", response=httpx.Response(409, request=httpx.Request("POST", "/")), body=None)
+
+        report = asyncio.run(ingest_zip(zip_path, stub_parse, stub_upload, parse_concurrency=3))
+        print(report)
@@ -0,0 +1,211 @@
+"""
+Cache of rerank scores per (model, query, document).
+
+zerank scores each (query, document) pair on its own, so a score can be reused
+whenever the same pair comes back: agent loops asking the same question again,
+or notebooks reranking the same pages on every run. `RerankCache.rerank` sends
+only the documents without a cached score and merges cached and fresh scores
+into one ordering.
+
+Entries are evicted least-recently-used beyond `max_entries`. With a `path`,
+scores are also appended to a binary file (16-byte key hash + float64 score per
+entry) and reloaded on the next start. Once the file holds more than twice as
+many records as there are live entries (overwritten or evicted scores), it is
+rewritten with just the live ones, so a long-running process doesn't grow it
+without bound.
+
+Usage:
+
+    cache = RerankCache(path="rerank_cache.bin")
+    results = await cache.rerank(zclient, query, documents, top_n=10)
+    print(cache.stats())
+"""
+
+import hashlib
+import os
+import struct
+from collections import OrderedDict
+
+from zeroentropy import AsyncZeroEntropy
+
+from rerank_scheduler import RERANK_MODEL, RerankResult, RerankScheduler
+
+KEY_BYTES = 16
+RECORD = struct.Struct(f"<{KEY_BYTES}sd")
+
+
+def pair_key(model: str, query: str, document: str) -> bytes:
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    for part in (model, query, document):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.digest()
+
+
+class RerankCache:
+    """LRU cache of rerank scores with optional on-disk persistence."""
+
+    def __init__(self, max_entries: int = 100_000, path: str | None = None):
+        """
+        Args:
+            max_entries: Scores kept in memory before least-recently-used ones are dropped.
+            path: Optional file to persist scores to; loaded if it exists.
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self._scores = OrderedDict()
+        self._file_records = 0  # records in the file, live or stale
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as f:
+            data = f.read()
+        count = len(data) // RECORD.size
+        # Later records win; file order is the recency order
+        for key, score in RECORD.iter_unpack(data[:count * RECORD.size]):
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+        while len(self._scores) > self.max_entries:
+            self._scores.popitem(last=False)
+        self._file_records = count
+        if self._needs_compaction() or len(data) % RECORD.size:
+            self._compact()
+
+    def _needs_compaction(self) -> bool:
+        # The file holds mostly stale or evicted records
+        return self._file_records > 2 * max(len(self._scores), 1)
+
+    def _compact(self) -> None:
+        """Rewrite the file with only the live entries, in recency order."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(RECORD.pack(key, score) for key, score in self._scores.items()))
+        os.replace(tmp_path, self.path)
+        self._file_records = len(self._scores)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def get(self, model: str, query: str, document: str) -> float | None:
+        key = pair_key(model, query, document)
+        score = self._scores.get(key)
+        if score is not None:
+            self._scores.move_to_end(key)
+        return score
+
+    def put_many(self, model: str, query: str, documents: list[str], scores: list[float]) -> None:
+        records = []
+        for document, score in zip(documents, scores):
+            key = pair_key(model, query, document)
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            records.append(RECORD.pack(key, score))
+        while len(self._scores) > self.max_entries:
+            self._scores.popitem(last=False)
+        if self.path and records:
+            with open(self.path, "ab") as f:
+                f.write(b"".join(records))
+            self._file_records += len(records)
+            if self._needs_compaction():
+                self._compact()
+
+    def put(self, model: str, query: str, document: str, score: float) -> None:
+        self.put_many(model, query, [document], [score])
+
+    async def rerank(
+        self,
+        client: AsyncZeroEntropy | RerankScheduler,
+        query: str,
+        documents: list[str],
+        model: str = RERANK_MODEL,
+        top_n: int | None = None,
+        latency: str | None = None,
+    ) -> list[RerankResult]:
+        """
+        Rerank `documents`, calling the API only for pairs that are not cached.
+
+        Args:
+            client: An AsyncZeroEntropy client, or a RerankScheduler to queue the
+                uncached documents on (its own model is used then).
+            query: The query.
+            documents: The candidate documents.
+            model: The reranker model.
+            top_n: Number of results to return; all are scored so they can be cached.
+            latency: "fast", "slow", or None, for direct client calls.
+
+        Returns:
+            RerankResult list, best first, with indices into `documents`.
+        """
+        if isinstance(client, RerankScheduler):
+            model = client.model
+        scores = [self.get(model, query, doc) for doc in documents]
+        # Duplicate documents are only sent once
+        missing = list(dict.fromkeys(doc for doc, score in zip(documents, scores) if score is None))
+        self.hits += len(documents) - sum(score is None for score in scores)
+        self.misses += len(missing)
+        self.bytes_saved += sum(len(doc.encode("utf-8")) for doc, score in zip(documents, scores) if score is not None)
+
+        if missing:
+            if isinstance(client, RerankScheduler):
+                results = await client.rerank(query, missing)
+            else:
+                response = await client.models.rerank(
+                    model=model,
+                    query=query,
+                    documents=missing,
+                    **({"latency": latency} if latency is not None else {}),
+                )
+                results = response.results
+            fresh = [0.0] * len(missing)
+            for r in results:
+                fresh[r.index] = r.relevance_score
+            self.put_many(model, query, missing, fresh)
+            fresh_scores = dict(zip(missing, fresh))
+            scores = [score if score is not None else fresh_scores[doc] for doc, score in zip(documents, scores)]
+
+        ranked = sorted((RerankResult(i, score) for i, score in enumerate(scores)), key=lambda r: r.relevance_score, reverse=True)
+        return ranked[:top_n] if top_n is not None else ranked
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+if __name__ == "__main__":
+    import asyncio
+    import time
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    query = "Find absolute path in the file system"
+    documents = [
+        "def get_absolute_path(*args):\n    return os.path.abspath(os.path.join(*args))",
+        "def normalize_path(path):\n    return os.path.normpath(path)",
+        "def data_directory():\n    return os.path.join(os.path.dirname(__file__), 'data')",
+        "def parse_date(s):\n    return datetime.strptime(s, '%Y-%m-%d')",
+    ]
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        cache = RerankCache(path="rerank_cache.bin")
+        for attempt in ("first", "second"):
+            start = time.perf_counter()
+            results = await cache.rerank(zclient, query, documents, top_n=2)
+            print(f"{attempt} call: {(time.perf_counter() - start) * 1000:.1f} ms, top index {results[0].index}, {cache.stats()}")
+        # A new document is the only one sent
+        results = await cache.rerank(zclient, query, documents + ["def resolve(p):\n    return pathlib.Path(p).resolve()"])
+        print(f"with one new document: {cache.stats()}")
+
+    asyncio.run(main())
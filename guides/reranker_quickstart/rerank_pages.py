@@ -0,0 +1,129 @@
+"""
+Rerank the results of a `top_pages` query.
+
+The llamaparse notebooks used to fetch every page with `get_page_info` one at a
+time before reranking, so latency grew linearly with k. Here page content is
+taken from the `top_pages` response when it was requested with
+`include_content=True`, only the pages still missing content are fetched,
+concurrently with a bound, and then everything is reranked in one call.
+
+Usage:
+
+    from rerank_pages import rerank_top_pages_with_metadata
+
+    response = await zclient.queries.top_pages(collection_name=collection_name, query=query, k=20, include_content=True)
+    reranked = await rerank_top_pages_with_metadata(zclient, query, response, collection_name)
+"""
+
+import asyncio
+
+from zeroentropy import AsyncZeroEntropy
+
+from rerank_cache import RerankCache
+from rerank_scheduler import RERANK_MODEL
+
+EMPTY_PAGE = "No content available"
+
+
+async def fetch_page_contents(zclient: AsyncZeroEntropy, collection_name: str, results, concurrency: int = 8) -> list[str]:
+    """
+    Content of each `top_pages` result, fetching only the ones returned without it.
+
+    Empty or unavailable pages get EMPTY_PAGE, so positions line up with `results`.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def page_content(result) -> str:
+        content = getattr(result, "content", None)
+        if content is None:
+            async with sem:
+                try:
+                    page_info = await zclient.documents.get_page_info(
+                        collection_name=collection_name,
+                        path=result.path,
+                        page_index=result.page_index,
+                        include_content=True,
+                    )
+                    content = page_info.page.content
+                except Exception as e:
+                    print(f"Error fetching page {result.page_index} of '{result.path}': {e}")
+        if content and content.strip():
+            return content.strip()
+        return EMPTY_PAGE
+
+    return await asyncio.gather(*[page_content(result) for result in results])
+
+
+async def rerank_top_pages_with_metadata(
+    zclient: AsyncZeroEntropy,
+    query: str,
+    top_pages_response,
+    collection_name: str,
+    model: str = RERANK_MODEL,
+    top_n: int | None = None,
+    concurrency: int = 8,
+    cache: RerankCache | None = None,
+) -> list[dict]:
+    """
+    Rerank the results from a top_pages query and return a re-ordered list with metadata.
+
+    Args:
+        zclient: An AsyncZeroEntropy client.
+        query: The query string to use for reranking.
+        top_pages_response: The response object from zclient.queries.top_pages().
+        collection_name: Name of the collection to fetch missing page content from.
+        model: The reranker model.
+        top_n: Number of results to return; all pages by default.
+        concurrency: Maximum page fetches in flight.
+        cache: Optional RerankCache, so pages reranked before are not sent again.
+
+    Returns:
+        List of dicts with 'path', 'page_index', 'original_score' and 'rerank_score' in reranked order.
+    """
+    results = top_pages_response.results
+    if not results:
+        raise ValueError("No documents found to rerank")
+    documents = await fetch_page_contents(zclient, collection_name, results, concurrency)
+
+    if cache is not None:
+        reranked = await cache.rerank(zclient, query, documents, model=model, top_n=top_n)
+    else:
+        rerank_response = await zclient.models.rerank(
+            model=model,
+            query=query,
+            documents=documents,
+            **({"top_n": top_n} if top_n is not None else {}),
+        )
+        reranked = rerank_response.results
+
+    return [
+        {
+            "path": results[r.index].path,
+            "page_index": results[r.index].page_index,
+            "original_score": results[r.index].score,
+            "rerank_score": r.relevance_score,
+        }
+        for r in reranked
+    ]
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    collection_name = sys.argv[1] if len(sys.argv) > 1 else "pdf_docs_demo_memory"
+    query = sys.argv[2] if len(sys.argv) > 2 else "What are the top 100 stocks in the S&P 500?"
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        response = await zclient.queries.top_pages(collection_name=collection_name, query=query, k=20, include_content=True)
+        reranked_results = await rerank_top_pages_with_metadata(zclient, query, response, collection_name, top_n=5)
+        print("Reranked Results with Metadata:")
+        for i, result in enumerate(reranked_results, 1):
+            print(f"Rank {i}: {result['path']} (Page {result['page_index']}) - Score: {result['rerank_score']:.4f}")
+
+    asyncio.run(main())
@@ -0,0 +1,314 @@
+"""
+Async scheduler for many independent `models.rerank` jobs.
+
+`rerank_documents` in stackoverflow_example.py sends one query per blocking
+call. When thousands of (query, candidates) jobs arrive per minute, the
+`RerankScheduler`:
+
+- queues jobs and runs `concurrency` requests at once on an AsyncZeroEntropy client,
+- keeps under a requests-per-minute and bytes-per-minute budget (the API's
+  default limits are 1000 QPM and 2,500,000 bytes per minute),
+- splits candidate lists that are too large for one request into chunks and
+  merges the scores back into one ordering (scores are per pair, so chunks are
+  directly comparable),
+- passes `top_n` so responses only carry the results that are kept,
+- exposes queue depth, throughput and latency percentiles through `metrics()`.
+
+Usage:
+
+    async with RerankScheduler(zclient) as scheduler:
+        results = await asyncio.gather(*[
+            scheduler.rerank(query, candidates, top_n=10) for query, candidates in jobs
+        ])
+        print(scheduler.metrics())
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from zeroentropy import AsyncZeroEntropy, RateLimitError
+
+RERANK_MODEL = "zerank-1"
+REQUESTS_PER_MINUTE = 1000
+BYTES_PER_MINUTE = 2_500_000
+MAX_CHUNK_DOCUMENTS = 100
+MAX_CHUNK_BYTES = 250_000
+
+
+@dataclass
+class RerankResult:
+    """Same fields as the API's rerank result; `index` refers to the job's full document list."""
+    index: int
+    relevance_score: float
+
+
+@dataclass
+class _Job:
+    query: str
+    top_n: int | None
+    future: asyncio.Future
+    submitted: float
+    remaining: int
+    results: list = field(default_factory=list)
+
+
+class RateBudget:
+    """
+    Token buckets for requests and bytes per minute.
+
+    Buckets hold `burst_seconds` worth of budget and refill continuously, so
+    short bursts are allowed but the per-minute rate is respected.
+    """
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE, bytes_per_minute: int = BYTES_PER_MINUTE, burst_seconds: float = 15.0):
+        self.rates = (requests_per_minute / 60, bytes_per_minute / 60)
+        self.capacities = (self.rates[0] * burst_seconds, self.rates[1] * burst_seconds)
+        self.tokens = list(self.capacities)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        for i in range(2):
+            self.tokens[i] = min(self.capacities[i], self.tokens[i] + (now - self.updated) * self.rates[i])
+        self.updated = now
+
+    async def acquire(self, n_bytes: int) -> float:
+        """Wait until one request of `n_bytes` fits in the budget. Returns the seconds waited."""
+        start = time.monotonic()
+        # The lock makes callers wait in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                # A request larger than the whole bucket goes through once the bucket is full
+                needed = (1, min(n_bytes, self.capacities[1]))
+                if all(self.tokens[i] >= needed[i] for i in range(2)):
+                    self.tokens[0] -= 1
+                    self.tokens[1] -= n_bytes
+                    return time.monotonic() - start
+                await asyncio.sleep(max((needed[i] - self.tokens[i]) / self.rates[i] for i in range(2)))
+
+
+def split_documents(query: str, documents: list[str], max_documents: int = MAX_CHUNK_DOCUMENTS, max_bytes: int = MAX_CHUNK_BYTES) -> list[tuple[int, int]]:
+    """
+    Split documents into contiguous chunks under the per-request limits.
+
+    Returns:
+        A list of (start, end) ranges into `documents`.
+    """
+    query_bytes = len(query.encode("utf-8"))
+    chunks = []
+    start, size = 0, query_bytes
+    for i, doc in enumerate(documents):
+        n_bytes = len(doc.encode("utf-8"))
+        if i > start and (i - start >= max_documents or size + n_bytes > max_bytes):
+            chunks.append((start, i))
+            start, size = i, query_bytes
+        size += n_bytes
+    if start < len(documents):
+        chunks.append((start, len(documents)))
+    return chunks
+
+
+class RerankScheduler:
+    """Queue of rerank jobs dispatched concurrently within a rate budget."""
+
+    def __init__(
+        self,
+        zclient: AsyncZeroEntropy,
+        model: str = RERANK_MODEL,
+        concurrency: int = 16,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        bytes_per_minute: int = BYTES_PER_MINUTE,
+        max_chunk_documents: int = MAX_CHUNK_DOCUMENTS,
+        max_chunk_bytes: int = MAX_CHUNK_BYTES,
+        latency: str | None = None,
+        max_retries: int = 5,
+    ):
+        """
+        Args:
+            zclient: An AsyncZeroEntropy client.
+            model: The reranker model.
+            concurrency: Maximum number of rerank requests in flight.
+            requests_per_minute: Request budget.
+            bytes_per_minute: Payload budget (query plus documents, UTF-8).
+            max_chunk_documents: Maximum documents per request; larger jobs are split.
+            max_chunk_bytes: Maximum payload bytes per request.
+            latency: "fast", "slow", or None to let the API pick.
+            max_retries: Attempts per request on 429 before the job fails.
+        """
+        self.zclient = zclient
+        self.model = model
+        self.concurrency = concurrency
+        self.budget = RateBudget(requests_per_minute, bytes_per_minute)
+        self.max_chunk_documents = max_chunk_documents
+        self.max_chunk_bytes = max_chunk_bytes
+        self.latency = latency
+        self.max_retries = max_retries
+
+        self._queue = asyncio.Queue()
+        self._workers = []
+        self._started = time.monotonic()
+        self.in_flight = 0
+        self.counters = {
+            "jobs_submitted": 0,
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "requests": 0,
+            "bytes": 0,
+            "retries": 0,
+            "budget_wait_s": 0.0,
+        }
+        self._job_latencies = deque(maxlen=1000)
+        self._queue_waits = deque(maxlen=1000)
+
+    async def __aenter__(self) -> "RerankScheduler":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """Start the worker tasks. Must be called from a running event loop."""
+        if not self._workers:
+            self._started = time.monotonic()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self) -> None:
+        """Wait for queued jobs to finish, then stop the workers."""
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, query: str, documents: list[str], top_n: int | None = None) -> asyncio.Future:
+        """
+        Queue a job without waiting for it.
+
+        Returns:
+            A future resolving to a list of RerankResult, best first, at most `top_n` long.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.counters["jobs_submitted"] += 1
+        if not documents:
+            self.counters["jobs_completed"] += 1
+            future.set_result([])
+            return future
+        chunks = split_documents(query, documents, self.max_chunk_documents, self.max_chunk_bytes)
+        job = _Job(query, top_n, future, time.monotonic(), remaining=len(chunks))
+        for start, end in chunks:
+            self._queue.put_nowait((job, start, documents[start:end], time.monotonic()))
+        return future
+
+    async def rerank(self, query: str, documents: list[str], top_n: int | None = None) -> list[RerankResult]:
+        """Queue a job and wait for its results."""
+        return await self.submit(query, documents, top_n)
+
+    async def _send(self, query: str, documents: list[str], top_n: int | None):
+        n_bytes = len(query.encode("utf-8")) + sum(len(doc.encode("utf-8")) for doc in documents)
+        for retry in range(self.max_retries):
+            self.counters["budget_wait_s"] += await self.budget.acquire(n_bytes)
+            self.counters["requests"] += 1
+            self.counters["bytes"] += n_bytes
+            try:
+                return await self.zclient.models.rerank(
+                    model=self.model,
+                    query=query,
+                    documents=documents,
+                    **({"top_n": min(top_n, len(documents))} if top_n is not None else {}),
+                    **({"latency": self.latency} if self.latency is not None else {}),
+                )
+            except RateLimitError:
+                if retry == self.max_retries - 1:
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(2 ** retry)
+
+    async def _worker(self) -> None:
+        while True:
+            job, offset, documents, queued = await self._queue.get()
+            try:
+                if job.future.done():
+                    continue  # another chunk of this job already failed
+                self._queue_waits.append(time.monotonic() - queued)
+                self.in_flight += 1
+                try:
+                    response = await self._send(job.query, documents, job.top_n)
+                finally:
+                    self.in_flight -= 1
+                job.results.extend(RerankResult(offset + r.index, r.relevance_score) for r in response.results)
+                job.remaining -= 1
+                if job.remaining == 0:
+                    job.results.sort(key=lambda r: r.relevance_score, reverse=True)
+                    job.future.set_result(job.results[:job.top_n] if job.top_n is not None else job.results)
+                    self.counters["jobs_completed"] += 1
+                    self._job_latencies.append(time.monotonic() - job.submitted)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                    self.counters["jobs_failed"] += 1
+            finally:
+                self._queue.task_done()
+
+    def metrics(self) -> dict:
+        """Queue depth, counters, throughput and latency percentiles (over the last 1000 jobs)."""
+
+        def percentile(values, q):
+            if len(values) < 2:
+                return values[0] * 1000 if values else None
+            return statistics.quantiles(values, n=100)[q - 1] * 1000
+
+        elapsed = time.monotonic() - self._started
+        latencies, waits = list(self._job_latencies), list(self._queue_waits)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "in_flight": self.in_flight,
+            **self.counters,
+            "jobs_per_s": self.counters["jobs_completed"] / elapsed if elapsed > 0 else 0.0,
+            "latency_p50_ms": percentile(latencies, 50),
+            "latency_p95_ms": percentile(latencies, 95),
+            "queue_wait_p50_ms": percentile(waits, 50),
+            "queue_wait_p95_ms": percentile(waits, 95),
+        }
+
+
+if __name__ == "__main__":
+    import os
+    import random
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    topics = ["absolute paths", "file permissions", "json parsing", "http retries", "date formatting", "sorting lists"]
+    random.seed(0)
+
+    def make_job():
+        topic = random.choice(topics)
+        candidates = [f"def helper_{i}(): # {random.choice(topics)} utility number {i}" for i in range(random.randint(20, 250))]
+        return f"How do I handle {topic} in Python?", candidates
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        jobs = [make_job() for _ in range(300)]
+        async with RerankScheduler(zclient, concurrency=16) as scheduler:
+            futures = [scheduler.submit(query, candidates, top_n=10) for query, candidates in jobs]
+            while not all(f.done() for f in futures):
+                m = scheduler.metrics()
+                print(f"queue={m['queue_depth']:<4} in_flight={m['in_flight']:<3} done={m['jobs_completed']}/{m['jobs_submitted']}", end="\r")
+                await asyncio.sleep(0.5)
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            print()
+            for key, value in scheduler.metrics().items():
+                print(f"{key:>18}: {value:.2f}" if isinstance(value, float) else f"{key:>18}: {value}")
+            query, _ = jobs[0]
+            if not isinstance(results[0], Exception):
+                print(f"\nTop result for '{query}': index {results[0][0].index}, score {results[0][0].relevance_score:.3f}")
+
+    asyncio.run(main())
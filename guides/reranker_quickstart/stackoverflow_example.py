@@ -1,16 +1,21 @@
 import asyncio
+import functools
 import os
-import pandas as pd
-import aiohttp
-from datasets import load_dataset
 from dotenv import load_dotenv
 from zeroentropy import ZeroEntropy
 
 load_dotenv()
 
-zclient = ZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+# datasets and aiohttp are imported where they are used, and the client is
+# created on first use, so importing this module stays cheap
+
+@functools.cache
+def get_zclient() -> ZeroEntropy:
+    return ZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
 
 def load_dataset_from_hf(dataset_name: str, split: str):
+    from datasets import load_dataset
+
     ds = load_dataset(dataset_name, split=split)
     df = ds.to_pandas()
     
@@ -23,6 +28,8 @@ async def fetch_document_content(file_url: str) -> str:
     """
     Fetch document content from the file_url
     """
+    import aiohttp
+
     try:
         async with aiohttp.ClientSession() as client, client.get(file_url) as response:
             if response.status == 200:
@@ -40,7 +47,7 @@ async def create_collection(collection_name: str):
     Create a collection in ZeroEntropy API
     """
     try:
-        collection = zclient.collections.add(collection_name=collection_name)
+        collection = get_zclient().collections.add(collection_name=collection_name)
         print(collection.message)
     except Exception as e:
         print(f"Error creating collection: {e}")
@@ -52,7 +59,7 @@ async def add_documents(collection_name: str, documents: list):
     for i, doc in enumerate(documents, start=1000):
         try:
             print(f"Adding document {i}")
-            zclient.documents.add(
+            get_zclient().documents.add(
                 collection_name=collection_name, 
                 path=f"v0/doc_{i}.json", 
                 content= {
@@ -67,7 +74,7 @@ async def top_documents(query: str, collection_name: str = "default", k: int = 5
     """
     Retrieve top documents from ZeroEntropy API
     """
-    response = zclient.queries.top_documents(
+    response = get_zclient().queries.top_documents(
         collection_name=collection_name,
         query=query,
         k=k
@@ -80,7 +87,7 @@ async def rerank_documents(query: str, documents: list) -> dict:
     """
     documents_as_strings = [doc["content"] for doc in documents]
 
-    response = zclient.models.rerank(
+    response = get_zclient().models.rerank(
         query=query,
         documents=documents_as_strings,
     )
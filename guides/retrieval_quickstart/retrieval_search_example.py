@@ -1,15 +1,21 @@
+import functools
 import os
 import time
-from datasets import load_dataset
 from dotenv import load_dotenv
 from zeroentropy import ZeroEntropy
 
 load_dotenv()
 
-zclient = ZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+
+# Created on first use, so importing this module doesn't need an API key or network setup
+@functools.cache
+def get_zclient() -> ZeroEntropy:
+    return ZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
 
 
 def load_dataset_from_hf(dataset_name: str, subset: str = "corpus", split: str = "train"):
+    from datasets import load_dataset  # heavy (pulls in pandas and pyarrow); only needed to load data
+
     ds = load_dataset(dataset_name, subset, split=split)
     df = ds.to_pandas()
     text_entries = df.to_dict("records")
@@ -18,7 +24,7 @@ def load_dataset_from_hf(dataset_name: str, subset: str = "corpus", split: str =
 
 def create_collection(collection_name: str):
     try:
-        collection = zclient.collections.add(collection_name=collection_name)
+        collection = get_zclient().collections.add(collection_name=collection_name)
         print(collection.message)
     except Exception as e:
         print(f"Collection already exists or error: {e}")
@@ -32,7 +38,7 @@ def add_documents(collection_name: str, documents: list):
             content_str = f"{title}\n\n{text}" if title else text
 
             print(f"Adding document {i + 1}/{len(documents)}", end="\r")
-            zclient.documents.add(
+            get_zclient().documents.add(
                 collection_name=collection_name,
                 path=f"doc_{i}.txt",
                 content={"type": "text", "text": content_str},
@@ -46,7 +52,7 @@ def add_documents(collection_name: str, documents: list):
 def wait_for_indexing(collection_name: str):
     print("Waiting for documents to be indexed", end="")
     while True:
-        status = zclient.status.get_status(collection_name=collection_name)
+        status = get_zclient().status.get_status(collection_name=collection_name)
         indexed = status.num_indexed_documents
         total = status.num_documents
         if indexed == total and total > 0:
@@ -57,7 +63,7 @@ def wait_for_indexing(collection_name: str):
 
 
 def search_top_documents(query: str, collection_name: str, k: int = 10):
-    response = zclient.queries.top_documents(
+    response = get_zclient().queries.top_documents(
         collection_name=collection_name,
         query=query,
         k=k,
@@ -66,7 +72,7 @@ def search_top_documents(query: str, collection_name: str, k: int = 10):
 
 
 def search_top_snippets(query: str, collection_name: str, k: int = 10, precise: bool = False):
-    response = zclient.queries.top_snippets(
+    response = get_zclient().queries.top_snippets(
         collection_name=collection_name,
         query=query,
         k=k,
@@ -140,7 +146,7 @@ def main():
         display_snippet_results(precise_results, query, precise=True)
 
     # Step 5: Cleanup
-    zclient.collections.delete(collection_name=collection_name)
+    get_zclient().collections.delete(collection_name=collection_name)
     print(f"\nCollection '{collection_name}' deleted.")
 
 
@@ -0,0 +1,219 @@
+"""
+Build sharded batch-transform input for a zerank-1 model, and merge the output back in order.
+
+The notebook's batch-transform section uploads its whole working directory as
+input. Here a JSONL file of rerank jobs, one per line:
+
+    {"id": "optional job id", "query": "...", "documents": ["...", ...], "top_n": 3}
+
+is turned into `n_shards` input files in the endpoint's JSON format, one
+request per line, for a transform job with `split_type="Line"`. Jobs are
+streamed and each one goes to the shard with the fewest bytes so far, so
+shards are balanced in size and every transform instance gets a similar
+share of the work. Only the shard files are uploaded; the line numbers and ids
+are kept locally in index files.
+
+After the job, `merge_outputs` streams the `.out` files SageMaker writes
+(one output line per input line, with `assemble_with="Line"`) and merges
+them back into one file in the original job order. Both steps hold one line
+per shard in memory, whatever the input size.
+
+Layout of `work_dir`:
+
+    shards/shard-00000.jsonl       upload this folder as the transform input
+    index/shard-00000.jsonl        [line number, job id] for each line of the shard
+    skipped.jsonl                  jobs that could not be sent, with the reason
+    manifest.json
+
+Usage:
+
+    build_shards("jobs.jsonl", "transform_work", n_shards=4)
+    # ... run the transform job on transform_work/shards, download its output to transform_output/
+    merge_outputs("transform_work", "transform_output", "results.jsonl")
+"""
+
+import heapq
+import json
+import os
+import shutil
+from contextlib import ExitStack
+
+# SageMaker's default MaxPayloadInMB for batch transform
+MAX_PAYLOAD_BYTES = 6 * 1024 * 1024
+OUTPUT_SUFFIX = ".out"
+
+
+def shard_name(shard_index: int) -> str:
+    return f"shard-{shard_index:05d}.jsonl"
+
+
+def build_shards(input_path: str, work_dir: str, n_shards: int, max_payload_bytes: int = MAX_PAYLOAD_BYTES) -> dict:
+    """
+    Split a JSONL file of rerank jobs into size-balanced transform input shards.
+
+    Args:
+        input_path: JSONL file with one {"query", "documents", optional "top_n" and "id"} job per line.
+        work_dir: Output directory (see the module docstring for its layout). Its
+            `shards/` and `index/` folders are emptied first, so shards left by an
+            earlier run with more shards are not uploaded again.
+        n_shards: Number of shards; a multiple of the transform instance count.
+        max_payload_bytes: Jobs larger than this once serialized are skipped.
+
+    Returns:
+        The manifest: shard names with their line and byte counts, and the number of skipped jobs.
+    """
+    for subdir in ("shards", "index"):
+        # The whole shards/ folder is the transform input, so stale files would be transformed again
+        shutil.rmtree(os.path.join(work_dir, subdir), ignore_errors=True)
+        os.makedirs(os.path.join(work_dir, subdir))
+    shards = [{"file": shard_name(i), "lines": 0, "bytes": 0} for i in range(n_shards)]
+    # Min-heap of (bytes written, shard index): the next job goes to the smallest shard
+    sizes = [(0, i) for i in range(n_shards)]
+    skipped = 0
+
+    with ExitStack() as stack:
+        source = stack.enter_context(open(input_path, encoding="utf-8"))
+        outputs = [stack.enter_context(open(os.path.join(work_dir, "shards", s["file"]), "w", encoding="utf-8")) for s in shards]
+        indexes = [stack.enter_context(open(os.path.join(work_dir, "index", s["file"]), "w", encoding="utf-8")) for s in shards]
+        skipped_file = stack.enter_context(open(os.path.join(work_dir, "skipped.jsonl"), "w", encoding="utf-8"))
+
+        def skip(line_number: int, job_id, reason: str):
+            nonlocal skipped
+            skipped += 1
+            skipped_file.write(json.dumps([line_number, job_id, reason]) + "\n")
+
+        for line_number, line in enumerate(source):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+                payload = {"query": job["query"], "documents": job["documents"]}
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                skip(line_number, None, f"invalid job: {e!r}")
+                continue
+            if job.get("top_n") is not None:
+                payload["top_n"] = job["top_n"]
+            data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n"
+            n_bytes = len(data.encode("utf-8"))
+            if n_bytes > max_payload_bytes:
+                skip(line_number, job.get("id"), f"payload of {n_bytes} bytes > {max_payload_bytes}")
+                continue
+
+            size, i = heapq.heappop(sizes)
+            outputs[i].write(data)
+            indexes[i].write(json.dumps([line_number, job.get("id")]) + "\n")
+            shards[i]["lines"] += 1
+            shards[i]["bytes"] += n_bytes
+            heapq.heappush(sizes, (size + n_bytes, i))
+
+    manifest = {"input": os.path.abspath(input_path), "shards": shards, "skipped": skipped}
+    with open(os.path.join(work_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _shard_results(index_path: str, output_path: str):
+    """Yield (line number, merged record) for one shard, pairing index and output lines."""
+    with open(index_path, encoding="utf-8") as index, open(output_path, encoding="utf-8") as output:
+        for index_line in index:
+            line_number, job_id = json.loads(index_line)
+            output_line = output.readline()
+            if not output_line:
+                raise ValueError(f"'{output_path}' has fewer lines than its input shard")
+            record = {"line": line_number, "id": job_id}
+            record.update(json.loads(output_line))
+            yield line_number, record
+        # Lines are matched by position, so any extra output line means they are misaligned
+        if output.readline().strip():
+            raise ValueError(f"'{output_path}' has more lines than its input shard")
+
+
+def _skipped_results(skipped_path: str):
+    with open(skipped_path, encoding="utf-8") as f:
+        for line in f:
+            line_number, job_id, reason = json.loads(line)
+            yield line_number, {"line": line_number, "id": job_id, "error": reason}
+
+
+def merge_outputs(work_dir: str, output_dir: str, merged_path: str) -> int:
+    """
+    Merge batch-transform output shards into one JSONL file in the original job order.
+
+    Each merged line is the endpoint's output for a job, plus its input "line"
+    number and "id"; skipped jobs get an "error" instead.
+
+    Args:
+        work_dir: Directory written by `build_shards`.
+        output_dir: Local copy of the transform job's output (`shard-00000.jsonl.out`, ...).
+        merged_path: File to write.
+
+    Returns:
+        The number of lines written.
+    """
+    with open(os.path.join(work_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    streams = []
+    for shard in manifest["shards"]:
+        if shard["lines"] == 0:
+            continue
+        output_path = os.path.join(output_dir, shard["file"] + OUTPUT_SUFFIX)
+        if not os.path.exists(output_path):
+            raise FileNotFoundError(f"Missing transform output '{output_path}'")
+        streams.append(_shard_results(os.path.join(work_dir, "index", shard["file"]), output_path))
+    streams.append(_skipped_results(os.path.join(work_dir, "skipped.jsonl")))
+
+    written = 0
+    with open(merged_path, "w", encoding="utf-8") as merged:
+        # Line numbers increase within every stream, so a k-way merge restores the input order
+        for _, record in heapq.merge(*streams, key=lambda item: item[0]):
+            merged.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    from local_endpoint import serve_local_endpoint
+    from sagemaker_client import http_invoker
+
+    # Build shards from a synthetic job file, "transform" them against the local
+    # stand-in (one instance per shard, like SageMaker), then merge
+    N_JOBS, N_SHARDS = 2000, 4
+    random.seed(0)
+    words = "apple jam preserve boil freeze sugar jar heat stir cool fruit stock market music".split()
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs_path = os.path.join(tmp, "jobs.jsonl")
+        with open(jobs_path, "w") as f:
+            for i in range(N_JOBS):
+                documents = [" ".join(random.choices(words, k=random.randint(3, 60))) for _ in range(random.randint(1, 40))]
+                f.write(json.dumps({"id": f"job-{i}", "query": " ".join(random.choices(words, k=4)), "documents": documents, "top_n": 3}) + "\n")
+            f.write("not json\n")
+
+        start = time.perf_counter()
+        manifest = build_shards(jobs_path, os.path.join(tmp, "work"), N_SHARDS)
+        print(f"Built {N_SHARDS} shards in {time.perf_counter() - start:.2f}s, {manifest['skipped']} skipped:")
+        for shard in manifest["shards"]:
+            print(f"  {shard['file']}: {shard['lines']} jobs, {shard['bytes'] / 1e3:.0f} kB")
+
+        server = serve_local_endpoint(base_latency_s=0.0, per_document_s=0.0, gpus=N_SHARDS)
+        invoke = http_invoker(f"http://127.0.0.1:{server.server_port}/invocations")
+        os.makedirs(os.path.join(tmp, "output"))
+        for shard in manifest["shards"]:
+            with open(os.path.join(tmp, "work", "shards", shard["file"])) as f_in, \
+                    open(os.path.join(tmp, "output", shard["file"] + OUTPUT_SUFFIX), "w") as f_out:
+                for line in f_in:
+                    f_out.write(invoke(line.encode("utf-8")).decode("utf-8") + "\n")
+        server.shutdown()
+
+        start = time.perf_counter()
+        merged_path = os.path.join(tmp, "results.jsonl")
+        written = merge_outputs(os.path.join(tmp, "work"), os.path.join(tmp, "output"), merged_path)
+        with open(merged_path) as f:
+            records = [json.loads(line) for line in f]
+        in_order = all(r["line"] == i for i, r in enumerate(records))
+        print(f"Merged {written} results in {time.perf_counter() - start:.2f}s, in input order: {in_order}")
+        print(f"First: {records[0]}\nLast: {records[-1]}")
@@ -0,0 +1,327 @@
+"""
+Load test a zerank-1 endpoint and find how much traffic one instance can take.
+
+`real_time_inference_instance_type` in the notebook is picked by guesswork.
+This harness sends a synthetic (or recorded) rerank workload to an endpoint,
+sweeping the number of concurrent callers, and reports for each step the
+achieved throughput, latency percentiles, error rate and throttle rate. From the
+sweep it finds where throughput saturates and, for a latency SLO, how many
+instances of the tested type serve a target QPS.
+
+- `Workload` draws the number of documents per request and the length of the
+  query and documents from configurable distributions, or replays requests
+  from a JSONL file of {"query": ..., "documents": [...]} lines.
+- Each step runs for `duration_s`, closed-loop (each caller sends its next
+  request when the previous one returns) or open-loop at a fixed `qps`. In
+  open-loop mode latency is measured from the scheduled send time, so a
+  backed-up endpoint can't hide its queueing delay. A throttled closed-loop
+  caller backs off before its next request, as a real client would, so
+  callers spinning on 429s don't dominate the counts. Throttles are reported
+  per attempted request, separately from errors.
+- Requests go straight to the endpoint through the same invokers as
+  `sagemaker_client.py`, without client-side batching, so the numbers
+  describe the instance itself.
+
+Run it on one instance type, then another, and compare the reports:
+
+    python load_test.py                      # against the local stand-in
+    python load_test.py zerank-1-endpoint    # against a SageMaker endpoint
+    python load_test.py http://host:8080/invocations
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from sagemaker_client import ThrottledError, boto_invoker, http_invoker
+
+CONCURRENCY_SWEEP = [1, 2, 4, 8, 16, 32]
+STEP_DURATION_S = 10.0
+WARMUP_S = 1.0
+# A step saturates when doubling callers adds less than this share of throughput
+SATURATION_GAIN = 0.1
+# First backoff of a throttled closed-loop caller; doubles per consecutive throttle up to the max
+THROTTLE_BACKOFF_S = 0.05
+MAX_THROTTLE_BACKOFF_S = 1.0
+
+WORDS = ("apple jam preserve boil freeze sugar pectin jar lid heat stir cool fruit recipe season "
+         "stock market share price basket rotten harvest orchard tree music tune band").split()
+
+
+@dataclass
+class Distribution:
+    """
+    A positive integer distribution: "fixed" (mean), "uniform" (low..high) or "lognormal" (mean, sigma).
+
+    Samples are clamped to `low` and `high` only when they are set, and are always at least 1.
+    """
+
+    kind: str = "fixed"
+    mean: float = 10
+    sigma: float = 0.5
+    low: int | None = None
+    high: int | None = None
+
+    def sample(self, rng: random.Random) -> int:
+        if self.kind == "fixed":
+            value = self.mean
+        elif self.kind == "uniform":
+            if self.low is None or self.high is None:
+                raise ValueError("A uniform distribution needs both low and high")
+            value = rng.randint(self.low, self.high)
+        elif self.kind == "lognormal":
+            # Parameterized by its mean rather than the underlying normal's
+            value = rng.lognormvariate(math.log(self.mean) - self.sigma ** 2 / 2, self.sigma)
+        else:
+            raise ValueError(f"Unknown distribution '{self.kind}'")
+        value = round(value)
+        if self.high is not None:
+            value = min(self.high, value)
+        if self.low is not None:
+            value = max(self.low, value)
+        return max(1, value)
+
+
+@dataclass
+class Workload:
+    documents_per_request: Distribution = field(default_factory=lambda: Distribution("lognormal", mean=20, sigma=0.6, high=100))
+    query_words: Distribution = field(default_factory=lambda: Distribution("uniform", low=4, high=16))
+    document_words: Distribution = field(default_factory=lambda: Distribution("lognormal", mean=150, sigma=0.8, high=2000))
+    top_n: int | None = None
+    replay: list[dict] | None = None  # recorded requests, used in turn instead of synthetic ones
+    seed: int = 0
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.replay_index = 0
+        self.lock = threading.Lock()
+
+    def text(self, n_words: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n_words))
+
+    def next_request(self) -> dict:
+        with self.lock:
+            if self.replay:
+                request = self.replay[self.replay_index % len(self.replay)]
+                self.replay_index += 1
+                return request
+            request = {
+                "query": self.text(self.query_words.sample(self.rng)),
+                "documents": [self.text(self.document_words.sample(self.rng))
+                              for _ in range(self.documents_per_request.sample(self.rng))],
+            }
+        if self.top_n is not None:
+            request["top_n"] = self.top_n
+        return request
+
+
+def load_workload(path: str, **workload_kwargs) -> Workload:
+    """A Workload replaying the requests in a JSONL file, one {"query", "documents"} object per line."""
+    with open(path) as f:
+        replay = [json.loads(line) for line in f if line.strip()]
+    return Workload(replay=replay, **workload_kwargs)
+
+
+@dataclass
+class StepResult:
+    concurrency: int
+    qps: float | None
+    duration_s: float
+    latencies_s: list[float] = field(default_factory=list)
+    documents: int = 0
+    errors: int = 0
+    throttled: int = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_s)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration_s
+
+    @property
+    def attempts(self) -> int:
+        return self.requests + self.errors + self.throttled
+
+    @property
+    def error_rate(self) -> float:
+        """Failed requests other than throttles, per attempted request."""
+        return self.errors / self.attempts if self.attempts else 0.0
+
+    @property
+    def throttle_rate(self) -> float:
+        """Throttled requests per attempted request."""
+        return self.throttled / self.attempts if self.attempts else 0.0
+
+    def percentile_ms(self, p: float) -> float:
+        if not self.latencies_s:
+            return float("nan")
+        ordered = sorted(self.latencies_s)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    def row(self) -> str:
+        offered = f"{self.qps:>6.1f}" if self.qps else "closed"
+        return (f"{self.concurrency:>5} {offered:>7} {self.throughput:>8.1f} {self.documents / self.duration_s:>8.0f} "
+                f"{self.percentile_ms(50):>8.0f} {self.percentile_ms(90):>8.0f} {self.percentile_ms(99):>8.0f} "
+                f"{self.error_rate * 100:>6.1f}% {self.throttle_rate * 100:>8.1f}%")
+
+
+HEADER = (f"{'conc':>5} {'qps':>7} {'req/s':>8} {'docs/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'throttled':>9}")
+
+
+def run_step(invoke, workload: Workload, concurrency: int, duration_s: float = STEP_DURATION_S,
+             qps: float | None = None, warmup_s: float = WARMUP_S,
+             throttle_backoff_s: float = THROTTLE_BACKOFF_S) -> StepResult:
+    """
+    Send requests with `concurrency` callers for `warmup_s + duration_s` and measure the last `duration_s`.
+
+    Args:
+        invoke: Callable sending a JSON payload to the endpoint (see `sagemaker_client.py`).
+        workload: Where requests come from.
+        concurrency: Requests in flight at most.
+        duration_s: Measured time.
+        qps: Open-loop arrival rate; None sends closed-loop, as fast as the endpoint answers.
+        warmup_s: Time before measuring starts, excluded from the results.
+        throttle_backoff_s: Closed-loop pause after a throttle, doubled per consecutive
+            throttle up to MAX_THROTTLE_BACKOFF_S. Open-loop callers keep their schedule.
+    """
+    result = StepResult(concurrency, qps, duration_s)
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from, stop_at = start + warmup_s, start + warmup_s + duration_s
+    next_arrival = [0]
+
+    def caller():
+        backoff = throttle_backoff_s
+        while True:
+            if qps:
+                with lock:
+                    scheduled = start + next_arrival[0] / qps
+                    next_arrival[0] += 1
+                if scheduled >= stop_at:
+                    return
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= stop_at:
+                    return
+            request = workload.next_request()
+            payload = json.dumps(request).encode("utf-8")
+            try:
+                invoke(payload)
+                outcome = "ok"
+            except ThrottledError:
+                outcome = "throttled"
+            except Exception:
+                outcome = "error"
+            if not qps:
+                if outcome == "throttled":
+                    time.sleep(random.uniform(0.5, 1.0) * backoff)
+                    backoff = min(MAX_THROTTLE_BACKOFF_S, 2 * backoff)
+                else:
+                    backoff = throttle_backoff_s
+            if scheduled < measure_from:
+                continue
+            with lock:
+                if outcome == "ok":
+                    result.latencies_s.append(time.perf_counter() - scheduled)
+                    result.documents += len(request["documents"])
+                elif outcome == "throttled":
+                    result.throttled += 1
+                else:
+                    result.errors += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(caller) for _ in range(concurrency)]:
+            future.result()
+    return result
+
+
+def sweep(invoke, workload: Workload, concurrency_levels: list[int] = CONCURRENCY_SWEEP, **step_kwargs) -> list[StepResult]:
+    """Run one step per concurrency level, printing each row as it completes."""
+    print(HEADER)
+    steps = []
+    for concurrency in concurrency_levels:
+        steps.append(run_step(invoke, workload, concurrency, **step_kwargs))
+        print(steps[-1].row())
+    return steps
+
+
+def saturation_point(steps: list[StepResult], min_gain: float = SATURATION_GAIN) -> StepResult | None:
+    """The first step after which more callers add less than `min_gain` throughput (or add errors or throttles)."""
+    for previous, step in zip(steps, steps[1:]):
+        if (step.throughput < previous.throughput * (1 + min_gain) or step.error_rate > previous.error_rate + 0.01
+                or step.throttle_rate > previous.throttle_rate + 0.01):
+            return previous
+    return None
+
+
+def capacity_plan(steps: list[StepResult], slo_p99_ms: float, target_qps: float, max_error_rate: float = 0.001) -> str:
+    """
+    How many instances of the tested type serve `target_qps` within the SLO.
+
+    Uses the highest-throughput step whose p99 latency meets the SLO and whose
+    errors and throttles together stay under `max_error_rate`, assuming load is
+    spread evenly over instances.
+    """
+    ok = [s for s in steps if s.percentile_ms(99) <= slo_p99_ms and s.error_rate + s.throttle_rate <= max_error_rate
+          and s.requests]
+    if not ok:
+        return f"No step met p99 <= {slo_p99_ms:.0f}ms: this instance type is too slow for the SLO, even at low load"
+    best = max(ok, key=lambda s: s.throughput)
+    instances = math.ceil(target_qps / best.throughput)
+    return (f"One instance serves {best.throughput:.1f} req/s at p99 {best.percentile_ms(99):.0f}ms "
+            f"(concurrency {best.concurrency}); {target_qps:.0f} req/s needs {instances} instance(s), "
+            f"keeping {best.concurrency} requests in flight per instance")
+
+
+def report(steps: list[StepResult], slo_p99_ms: float, target_qps: float, table: bool = True) -> str:
+    """Sweep table (errors exclude throttled requests, which have their own column), saturation point and capacity plan."""
+    lines = [HEADER] + [step.row() for step in steps] if table else []
+    knee = saturation_point(steps)
+    if knee is None:
+        lines.append("Throughput did not saturate; extend the sweep to higher concurrency")
+    else:
+        lines.append(f"Throughput saturates at concurrency {knee.concurrency}: "
+                     f"{knee.throughput:.1f} req/s, p99 {knee.percentile_ms(99):.0f}ms")
+    lines.append(capacity_plan(steps, slo_p99_ms, target_qps))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from local_endpoint import serve_local_endpoint
+
+    SLO_P99_MS, TARGET_QPS = 500, 200
+
+    target = sys.argv[1] if len(sys.argv) > 1 else None
+    server = None
+    if target is None:
+        server = serve_local_endpoint(max_queue=16)
+        target = f"http://127.0.0.1:{server.server_port}/invocations"
+        print(f"Load testing the local stand-in at {target}")
+    pool_size = max(CONCURRENCY_SWEEP)
+    if target.startswith("http"):
+        invoke = http_invoker(target, pool_size=pool_size)
+    else:
+        invoke = boto_invoker(target, max_pool_connections=pool_size)
+
+    workload = Workload()
+    steps = sweep(invoke, workload, CONCURRENCY_SWEEP, duration_s=5.0 if server else STEP_DURATION_S)
+    print(report(steps, SLO_P99_MS, TARGET_QPS, table=False))
+
+    # Open-loop check at a fixed rate just under saturation
+    knee = saturation_point(steps)
+    if knee is not None:
+        qps = 0.8 * knee.throughput
+        step = run_step(invoke, workload, concurrency=2 * knee.concurrency, qps=qps, duration_s=5.0)
+        print(f"\nOpen loop at {qps:.1f} req/s:\n{HEADER}\n{step.row()}")
+    if server:
+        server.shutdown()
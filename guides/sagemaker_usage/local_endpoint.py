@@ -0,0 +1,128 @@
+"""
+Local HTTP stand-in for a zerank-1 SageMaker endpoint.
+
+It accepts the same payload as the real endpoint on `POST /invocations`:
+
+    {"query": "<string>", "documents": ["<string>", ...], "top_n": <int>}
+
+and answers `{"results": [{"index": i, "relevance_score": s}, ...]}` sorted by
+score (a word-overlap score, not a model). Latency follows a simple GPU model:
+one batch runs at a time, taking `base_latency_s + per_document_s * len(documents)`,
+so batching amortizes the fixed cost like it does on a real instance. When more
+than `max_queue` requests are waiting it answers 429, like a throttled endpoint.
+
+Usage:
+
+    server = serve_local_endpoint()
+    url = f"http://127.0.0.1:{server.server_port}/invocations"
+    ...
+    server.shutdown()
+"""
+
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_LATENCY_S = 0.02
+PER_DOCUMENT_S = 0.001
+
+
+def overlap_score(query: str, document: str) -> float:
+    query_words = set(re.findall(r"\w+", query.lower()))
+    document_words = set(re.findall(r"\w+", document.lower()))
+    if not query_words:
+        return 0.0
+    return len(query_words & document_words) / len(query_words)
+
+
+def serve_local_endpoint(
+    port: int = 0,
+    base_latency_s: float = BASE_LATENCY_S,
+    per_document_s: float = PER_DOCUMENT_S,
+    gpus: int = 1,
+    max_queue: int = 64,
+) -> ThreadingHTTPServer:
+    """
+    Start the stand-in endpoint on a background thread.
+
+    Args:
+        port: Port to listen on; 0 picks a free one (see `server.server_port`).
+        base_latency_s: Fixed cost of one invocation.
+        per_document_s: Added cost per document in the invocation.
+        gpus: Batches processed at the same time.
+        max_queue: Requests waiting for a GPU before new ones get 429.
+
+    Returns:
+        The running server; call `shutdown()` to stop it. `server.stats` counts
+        invocations, documents and throttled requests.
+    """
+    gpu = threading.Semaphore(gpus)
+    lock = threading.Lock()
+    stats = {"invocations": 0, "documents": 0, "throttled": 0, "waiting": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Headers and body are written separately; don't let Nagle delay the body
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if self.path != "/invocations":
+                return self.send_json(404, {"message": "not found"})
+            with lock:
+                if stats["waiting"] >= max_queue:
+                    stats["throttled"] += 1
+                    return self.send_json(429, {"message": "ThrottlingException: too many requests"})
+                stats["waiting"] += 1
+            documents = payload.get("documents", [])
+            with gpu:
+                with lock:
+                    stats["waiting"] -= 1
+                time.sleep(base_latency_s + per_document_s * len(documents))
+            with lock:
+                stats["invocations"] += 1
+                stats["documents"] += len(documents)
+
+            results = [
+                {"index": i, "relevance_score": overlap_score(payload.get("query", ""), document)}
+                for i, document in enumerate(documents)
+            ]
+            results.sort(key=lambda r: -r["relevance_score"])
+            if payload.get("top_n") is not None:
+                results = results[: payload["top_n"]]
+            self.send_json(200, {"results": results})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    server = serve_local_endpoint(port)
+    print(f"Local zerank-1 stand-in listening on http://127.0.0.1:{server.server_port}/invocations (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,375 @@
+"""
+Micro-batching client for a zerank-1 SageMaker endpoint.
+
+The notebook calls `runtime.invoke_endpoint` once per query, one call at a
+time, so a GPU instance such as `ml.g5.xlarge` mostly waits on the network
+and runs tiny batches. `SageMakerReranker` sits between callers and the endpoint:
+
+- requests submitted from any thread are collected for up to `window_s`,
+  and for as long as every worker is busy,
+- requests for the same query are coalesced into one invocation (the
+  endpoint scores one query against a list of documents), up to
+  `max_batch_documents`; larger requests are split and their results merged,
+- invocations run on a thread pool, over one boto client whose connection
+  pool (`max_pool_connections`) matches the pool size, so connections are reused,
+- throttled invocations (429, ThrottlingException) are retried with
+  exponential backoff and jitter,
+- `metrics()` reports throughput, batch sizes, throttles and latency.
+
+The transport is a plain callable `invoke(payload_bytes) -> response_bytes`:
+`boto_invoker` for a real endpoint, `http_invoker` for the local stand-in in
+`local_endpoint.py`.
+
+Usage:
+
+    with SageMakerReranker(boto_invoker("zerank-1-endpoint")) as reranker:
+        results = reranker.rerank("what is the first step in making apple jam", documents, top_n=3)
+        print(reranker.metrics())
+"""
+
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+MAX_BATCH_DOCUMENTS = 64
+WINDOW_S = 0.005
+MAX_WORKERS = 8
+THROTTLE_CODES = ("ThrottlingException", "TooManyRequestsException", "ServiceUnavailable", "ModelNotReadyException")
+
+
+@dataclass
+class RerankResult:
+    index: int
+    relevance_score: float
+
+
+class ThrottledError(Exception):
+    """The endpoint asked us to slow down; the invocation can be retried."""
+
+
+def boto_invoker(
+    endpoint_name: str,
+    region_name: str | None = None,
+    max_pool_connections: int = MAX_WORKERS,
+    content_type: str = "application/json",
+):
+    """
+    Invoke callable for a real SageMaker endpoint.
+
+    Args:
+        endpoint_name: The endpoint to invoke.
+        region_name: AWS region; defaults to AWS_DEFAULT_REGION.
+        max_pool_connections: Size of botocore's connection pool; match the reranker's max_workers.
+        content_type: Payload content type.
+    """
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+
+    # botocore's own retries are off: throttles are retried by the reranker, with its metrics
+    runtime = boto3.client(
+        "sagemaker-runtime",
+        region_name=region_name,
+        config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": 1, "mode": "standard"}, tcp_keepalive=True),
+    )
+
+    def invoke(payload: bytes) -> bytes:
+        try:
+            response = runtime.invoke_endpoint(EndpointName=endpoint_name, ContentType=content_type, Body=payload)
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if error.get("Code") in THROTTLE_CODES or status in (429, 503):
+                raise ThrottledError(str(e)) from e
+            raise
+        return response["Body"].read()
+
+    return invoke
+
+
+def http_invoker(url: str, pool_size: int = MAX_WORKERS, timeout: float = 60.0):
+    """Invoke callable for an HTTP endpoint speaking the same payload, e.g. `local_endpoint.py`."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def invoke(payload: bytes) -> bytes:
+        response = session.post(url, data=payload, headers={"Content-Type": "application/json"}, timeout=timeout)
+        if response.status_code in (429, 503):
+            raise ThrottledError(response.text)
+        response.raise_for_status()
+        return response.content
+
+    return invoke
+
+
+@dataclass
+class _Request:
+    query: str
+    documents: list[str]
+    top_n: int | None
+    future: Future
+    submitted: float
+    scores: list | None = None
+    pending: int = 0  # invocations still running for this request
+    failed: bool = False
+
+
+class SageMakerReranker:
+    def __init__(
+        self,
+        invoke,
+        max_batch_documents: int = MAX_BATCH_DOCUMENTS,
+        window_s: float = WINDOW_S,
+        max_workers: int = MAX_WORKERS,
+        max_retries: int = 5,
+        backoff_s: float = 0.1,
+    ):
+        """
+        Args:
+            invoke: Callable sending a JSON payload to the endpoint and returning the response body.
+            max_batch_documents: Most documents sent in one invocation.
+            window_s: How long the first request of a batch waits for others to join it.
+            max_workers: Invocations in flight.
+            max_retries: Retries of a throttled invocation before its requests fail.
+            backoff_s: First retry delay, doubled on each retry.
+        """
+        self.invoke = invoke
+        self.max_batch_documents = max_batch_documents
+        self.window_s = window_s
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.slots = threading.Semaphore(max_workers)
+        self.inbox = queue.Queue()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "invocations": 0, "documents": 0, "throttled": 0, "failed": 0}
+        self.latencies = []
+        self.started = time.perf_counter()
+        self.dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self.dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Send what is queued, wait for in-flight invocations, and stop."""
+        self.inbox.put(None)
+        self.dispatcher.join()
+        self.pool.shutdown(wait=True)
+
+    def submit(self, query: str, documents: list[str], top_n: int | None = None) -> Future:
+        """Queue a rerank request; the Future resolves to RerankResults in descending score order."""
+        future = Future()
+        if not documents:
+            future.set_result([])
+            return future
+        self.inbox.put(_Request(query, list(documents), top_n, future, time.perf_counter()))
+        return future
+
+    def rerank(self, query: str, documents: list[str], top_n: int | None = None) -> list[RerankResult]:
+        """Blocking rerank, batched with whatever other threads submit at the same time."""
+        return self.submit(query, documents, top_n).result()
+
+    def _dispatch_loop(self):
+        closing = False
+        while not closing:
+            request = self.inbox.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.perf_counter() + self.window_s
+            while (remaining := deadline - time.perf_counter()) > 0:
+                try:
+                    request = self.inbox.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+            # Wait for a free worker; requests arriving meanwhile join this batch,
+            # so batches grow on their own when the endpoint is the bottleneck
+            self.slots.acquire()
+            while not closing:
+                try:
+                    request = self.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+            for i, invocation in enumerate(self._pack(batch)):
+                if i > 0:
+                    self.slots.acquire()
+                self.pool.submit(self._run_in_slot, *invocation)
+
+    def _run_in_slot(self, *invocation):
+        try:
+            self._run_invocation(*invocation)
+        finally:
+            self.slots.release()
+
+    def _pack(self, batch: list[_Request]):
+        """
+        Group requests by query and pack their documents into invocations.
+
+        Yields (query, documents, parts), where parts are (request, offset, start, end):
+        documents[offset:offset + end - start] are the request's documents[start:end].
+        """
+        by_query = {}
+        for request in batch:
+            request.scores = [None] * len(request.documents)
+            by_query.setdefault(request.query, []).append(request)
+
+        for query, requests in by_query.items():
+            documents, parts = [], []
+            for request in requests:
+                start = 0
+                while start < len(request.documents):
+                    room = self.max_batch_documents - len(documents)
+                    end = min(len(request.documents), start + room)
+                    parts.append((request, len(documents), start, end))
+                    request.pending += 1
+                    documents.extend(request.documents[start:end])
+                    start = end
+                    if len(documents) == self.max_batch_documents:
+                        yield query, documents, parts
+                        documents, parts = [], []
+            if documents:
+                yield query, documents, parts
+
+    def _run_invocation(self, query: str, documents: list[str], parts: list):
+        payload = json.dumps({"query": query, "documents": documents}, separators=(",", ":")).encode("utf-8")
+        response, error = None, None
+        for retry in range(self.max_retries + 1):
+            try:
+                response = json.loads(self.invoke(payload))
+                break
+            except ThrottledError as e:
+                with self.lock:
+                    self.stats["throttled"] += 1
+                error = e
+                if retry < self.max_retries:
+                    time.sleep(self.backoff_s * 2 ** retry * random.uniform(0.5, 1.5))
+            except Exception as e:
+                error = e
+                break
+
+        with self.lock:
+            self.stats["invocations"] += 1
+            self.stats["documents"] += len(documents)
+        if response is None:
+            for request, *_ in parts:
+                self._fail(request, error)
+            return
+
+        try:
+            scores = [None] * len(documents)
+            for result in response["results"]:
+                if not 0 <= result["index"] < len(documents):
+                    raise ValueError(f"Result index {result['index']} out of range for {len(documents)} documents")
+                scores[result["index"]] = result["relevance_score"]
+            if None in scores:
+                raise ValueError(f"Endpoint scored {len(documents) - scores.count(None)} of {len(documents)} documents")
+        except Exception as e:
+            # A malformed reply must still resolve the futures, or callers block forever
+            error = ValueError(f"Unexpected endpoint response {str(response)[:200]}: {e!r}")
+            for request, *_ in parts:
+                self._fail(request, error)
+            return
+
+        for request, offset, start, end in parts:
+            request.scores[start:end] = scores[offset:offset + end - start]
+            # A request split across invocations is completed from several pool threads
+            with self.lock:
+                request.pending -= 1
+                done = request.pending == 0
+            if done and not request.future.done():
+                self._finish(request)
+
+    def _finish(self, request: _Request):
+        results = [RerankResult(i, score) for i, score in enumerate(request.scores)]
+        results.sort(key=lambda r: -r.relevance_score)
+        if request.top_n is not None:
+            results = results[: request.top_n]
+        with self.lock:
+            self.stats["requests"] += 1
+            self.latencies.append(time.perf_counter() - request.submitted)
+        request.future.set_result(results)
+
+    def _fail(self, request: _Request, error: Exception):
+        # Several invocations of a split request can fail; only the first one counts
+        with self.lock:
+            if request.failed:
+                return
+            request.failed = True
+            self.stats["failed"] += 1
+        request.future.set_exception(error)
+
+    def metrics(self) -> dict:
+        """Throughput, batching and latency since the reranker was created."""
+        with self.lock:
+            stats = dict(self.stats)
+            latencies = sorted(self.latencies)
+        elapsed = time.perf_counter() - self.started
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+        return {
+            **stats,
+            "elapsed_s": round(elapsed, 3),
+            "requests_per_s": round(stats["requests"] / elapsed, 1),
+            "documents_per_s": round(stats["documents"] / elapsed, 1),
+            "documents_per_invocation": round(stats["documents"] / max(stats["invocations"], 1), 1),
+            "p50_ms": round(percentile(0.5), 1),
+            "p95_ms": round(percentile(0.95), 1),
+        }
+
+
+if __name__ == "__main__":
+    from local_endpoint import serve_local_endpoint
+
+    N_REQUESTS, DOCUMENTS_PER_REQUEST, CLIENT_THREADS = 200, 6, 32
+    documents = [
+        "apple stocks were down 1%",
+        "boil apples",
+        "freeze apples",
+        "one rotten apple ruins the basket",
+        "the preserve must be let to cool",
+        "jam to some tunes",
+    ][:DOCUMENTS_PER_REQUEST]
+    # Each query's candidates come from 10 shards reranked by different callers, as in a fan-out search
+    queries = [f"what is step {i // 10} in making apple jam" for i in range(N_REQUESTS)]
+
+    server = serve_local_endpoint()
+    url = f"http://127.0.0.1:{server.server_port}/invocations"
+    invoke = http_invoker(url)
+
+    # The notebook's approach: one invocation per query, one after the other
+    start = time.perf_counter()
+    for query in queries:
+        json.loads(invoke(json.dumps({"query": query, "documents": documents, "top_n": 3}).encode("utf-8")))
+    baseline = time.perf_counter() - start
+    print(f"Sequential invoke_endpoint: {N_REQUESTS} requests in {baseline:.2f}s ({N_REQUESTS / baseline:.1f} requests/s)")
+
+    # Many callers sharing one micro-batching client
+    with SageMakerReranker(invoke, window_s=0.005) as reranker:
+        with ThreadPoolExecutor(max_workers=CLIENT_THREADS) as callers:
+            results = list(callers.map(lambda q: reranker.rerank(q, documents, top_n=3), queries))
+        metrics = reranker.metrics()
+    print(f"SageMakerReranker: {metrics}")
+    print(f"Top result for '{queries[0]}': {documents[results[0][0].index]!r} ({results[0][0].relevance_score:.2f})")
+    server.shutdown()
@@ -0,0 +1,247 @@
+"""
+Microphone capture into a preallocated NumPy ring buffer.
+
+The sounddevice callback copies each block straight into `AudioRingBuffer`
+(one memcpy, no per-frame allocation). The buffer can then be used in two ways:
+
+- Whole utterance: nobody reads while recording, the buffer doubles when it
+  fills up, and `view()` returns the recording as a zero-copy slice.
+- Streaming: a consumer pulls fixed-size chunks while the user is still talking
+  (e.g. into a `StreamedAudioInput`), so transcription starts early and memory
+  stays bounded by the ring capacity no matter how long the utterance is.
+
+There is one writer (the audio callback thread) and one reader. Positions are
+absolute frame counts that only their owner advances, so no lock is needed: the
+writer fills the buffer before publishing the new write position, and a reader
+never looks past the write position it has seen.
+
+Nothing here needs an audio device: call `buffer.callback(frames, ...)` with
+synthetic arrays, or run this file to see a small demo.
+"""
+
+import asyncio
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+CHANNELS = 1
+CHUNK_FRAMES = 2400  # 100 ms at 24 kHz
+
+
+class AudioRingBuffer:
+    """Single-producer, single-consumer ring buffer of audio frames."""
+
+    def __init__(
+        self,
+        initial_frames: int = SAMPLE_RATE * 10,
+        max_frames: int = SAMPLE_RATE * 120,
+        channels: int = CHANNELS,
+        dtype: str = "int16",
+        chunk_frames: int = CHUNK_FRAMES,
+    ):
+        """
+        Args:
+            initial_frames: Frames preallocated up front (default 10 s).
+            max_frames: Upper bound the buffer may grow to (default 2 min). Frames that
+                arrive while the buffer is full at this size are dropped and counted.
+            channels: Number of audio channels.
+            dtype: Sample dtype, matching the input stream.
+            chunk_frames: Size of the chunks handed out by `read_chunk`. Capacities are
+                kept a multiple of it, so a chunk only wraps around the ring after a
+                partial read has left the read position unaligned.
+        """
+        initial_frames = -(-initial_frames // chunk_frames) * chunk_frames
+        self.max_frames = max(-(-max_frames // chunk_frames) * chunk_frames, initial_frames)
+        self.chunk_frames = chunk_frames
+        self.dropped_frames = 0
+        self.on_write = None
+        self._buf = np.zeros((initial_frames, channels), dtype=dtype)
+        self._write_pos = 0  # advanced by the writer only
+        self._read_pos = 0  # advanced by the reader only
+        self._pending = None  # chunk handed out by read_chunk, consumed on the next call
+        self._scratch = np.zeros((chunk_frames, channels), dtype=dtype)  # for chunks that wrap
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def __len__(self) -> int:
+        """Number of frames written but not yet consumed."""
+        return self._write_pos - self._read_pos
+
+    def callback(self, indata, frames, time, status) -> None:
+        """sounddevice `InputStream` callback; also usable directly with synthetic frames."""
+        self.write(indata)
+
+    def write(self, frames: np.ndarray) -> None:
+        n = len(frames)
+        if self._write_pos + n - self._read_pos > len(self._buf):
+            self._grow(self._write_pos + n - self._read_pos)
+        free = len(self._buf) - (self._write_pos - self._read_pos)
+        if n > free:
+            self.dropped_frames += n - free
+            frames = frames[:free]
+            n = free
+        if n == 0:
+            return
+
+        _copy_into_ring(self._buf, self._write_pos, frames)
+        # Publish only after the data is in place
+        self._write_pos += n
+        if self.on_write is not None:
+            self.on_write()
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._buf)
+        if capacity >= self.max_frames:
+            return
+        while capacity < needed and capacity < self.max_frames:
+            capacity *= 2
+        capacity = min(capacity, self.max_frames)
+
+        old = self._buf
+        new = np.zeros((capacity, old.shape[1]), dtype=old.dtype)
+        # Copy the unread frames to the same absolute positions in the new ring, so the
+        # reader's position stays valid; the live region may wrap in either ring
+        read_pos = self._read_pos
+        _copy_into_ring(new, read_pos, _read_from_ring(old, read_pos, self._write_pos - read_pos))
+        self._buf = new
+
+    def view(self) -> np.ndarray | None:
+        """
+        Zero-copy view of every unread frame, or None if empty.
+
+        Only valid as long as the buffer has not wrapped, i.e. in whole-utterance
+        mode where nothing was consumed while recording.
+        """
+        if len(self) == 0:
+            return None
+        start = self._read_pos % len(self._buf)
+        if start + len(self) > len(self._buf):
+            raise ValueError("Buffer has wrapped around; read it in chunks instead")
+        return self._buf[start:start + len(self)]
+
+    def read_chunk(self, partial: bool = False) -> np.ndarray | None:
+        """
+        Consume the next `chunk_frames` frames as a zero-copy view.
+
+        The view stays valid until the next `read_chunk` call, because the writer
+        cannot reuse the slot before the reader moves past it.
+
+        Args:
+            partial: Also return a final chunk shorter than `chunk_frames`.
+
+        Returns:
+            The chunk, or None if not enough frames are available yet.
+        """
+        if self._pending is not None:
+            self._read_pos += len(self._pending)
+            self._pending = None
+        available = self._write_pos - self._read_pos
+        if available == 0 or (available < self.chunk_frames and not partial):
+            return None
+        n = min(available, self.chunk_frames)
+        buf = self._buf
+        start = self._read_pos % len(buf)
+        if start + n <= len(buf):
+            self._pending = buf[start:start + n]
+        else:
+            # Only after a partial read: the chunk wraps, so gather it into the scratch array
+            self._pending = self._scratch[:n]
+            self._pending[:] = _read_from_ring(buf, self._read_pos, n)
+        return self._pending
+
+    def clear(self) -> None:
+        """Reset for a new utterance, keeping the allocated memory."""
+        self._pending = None
+        self._read_pos = self._write_pos = 0
+        self.dropped_frames = 0
+
+
+def _copy_into_ring(buf: np.ndarray, pos: int, frames: np.ndarray) -> None:
+    """Write `frames` at absolute position `pos` of a ring, wrapping around its end."""
+    start = pos % len(buf)
+    first = min(len(frames), len(buf) - start)
+    buf[start:start + first] = frames[:first]
+    buf[:len(frames) - first] = frames[first:]
+
+
+def _read_from_ring(buf: np.ndarray, pos: int, n: int) -> np.ndarray:
+    """The `n` frames at absolute position `pos` of a ring (a copy if they wrap)."""
+    start = pos % len(buf)
+    if start + n <= len(buf):
+        return buf[start:start + n]
+    return np.concatenate((buf[start:], buf[:start + n - len(buf)]))
+
+
+async def stream_chunks(buffer: AudioRingBuffer, streamed_input, done: asyncio.Event) -> None:
+    """
+    Forward chunks from `buffer` to a `StreamedAudioInput` until `done` is set.
+
+    Args:
+        buffer: The ring buffer the audio callback writes into.
+        streamed_input: An `agents.voice.StreamedAudioInput` (or anything with `add_audio`).
+        done: Set it when recording stops; remaining frames are flushed before returning.
+    """
+    loop = asyncio.get_running_loop()
+    data_ready = asyncio.Event()
+    buffer.on_write = lambda: loop.call_soon_threadsafe(data_ready.set)
+    try:
+        while True:
+            chunk = buffer.read_chunk(partial=done.is_set())
+            if chunk is not None:
+                # add_audio queues the array, so hand over a copy of the ring slot
+                await streamed_input.add_audio(chunk.copy())
+                continue
+            if done.is_set():
+                break
+            data_ready.clear()
+            done_wait = asyncio.ensure_future(done.wait())
+            data_wait = asyncio.ensure_future(data_ready.wait())
+            await asyncio.wait([done_wait, data_wait], return_when=asyncio.FIRST_COMPLETED)
+            done_wait.cancel()
+            data_wait.cancel()
+    finally:
+        buffer.on_write = None
+
+
+if __name__ == "__main__":
+    # Feed 30 s of a synthetic 440 Hz tone in 20 ms blocks, like a sound card would
+    block = SAMPLE_RATE // 50
+    t = np.arange(SAMPLE_RATE * 30) / SAMPLE_RATE
+    tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).reshape(-1, 1)
+
+    buffer = AudioRingBuffer(initial_frames=SAMPLE_RATE * 2)
+    for i in range(0, len(tone), block):
+        buffer.callback(tone[i:i + block], block, None, None)
+    recording = buffer.view()
+    print(f"Whole utterance: {len(recording)} frames, capacity {buffer.capacity}, "
+          f"identical={np.array_equal(recording, tone)}, shares memory={np.shares_memory(recording, buffer._buf)}")
+
+    streaming = AudioRingBuffer(initial_frames=SAMPLE_RATE, max_frames=SAMPLE_RATE)
+    received = []
+    for i in range(0, len(tone), block):
+        streaming.callback(tone[i:i + block], block, None, None)
+        while (chunk := streaming.read_chunk()) is not None:
+            received.append(chunk.copy())
+    while (chunk := streaming.read_chunk(partial=True)) is not None:
+        received.append(chunk.copy())
+    print(f"Streaming: {len(received)} chunks, capacity stayed at {streaming.capacity}, "
+          f"identical={np.array_equal(np.concatenate(received), tone)}, dropped={streaming.dropped_frames}")
+
+    # Partial reads leave the read position unaligned; growing and reading must still work
+    frames = np.arange(1000 + 4800 + 2200 + 9000, dtype=np.int16).reshape(-1, 1)
+    unaligned = AudioRingBuffer(initial_frames=4800, max_frames=19200, chunk_frames=2400)
+    unaligned.write(frames[:1000])
+    received = [unaligned.read_chunk(partial=True).copy()]
+    offset = 1000
+    for size in (4800, 2200, 9000):
+        unaligned.write(frames[offset:offset + size])
+        offset += size
+    while (chunk := unaligned.read_chunk()) is not None:
+        received.append(chunk.copy())
+    while (chunk := unaligned.read_chunk(partial=True)) is not None:
+        received.append(chunk.copy())
+    sizes = {len(chunk) for chunk in received[1:-1]}
+    print(f"Partial read then grow: capacity {unaligned.capacity}, "
+          f"identical={np.array_equal(np.concatenate(received), frames)}, full chunks={sizes == {2400}}")
@@ -0,0 +1,120 @@
+"""
+Regenerate the synthetic WAV fixtures checked by `python voice_activity.py`.
+
+The fixtures are not recorded speech: they are short 16 kHz clips of a
+formant-synthesized voice (a glottal pulse train through vowel formant
+resonators, with syllable-rate loudness dips) over generated room noise, so
+they are reproducible without a microphone. `echo_barge_in.wav` is stereo: channel 0 is the microphone,
+channel 1 the assistant playback it picks up through a small room (a few
+delayed reflections, no echo cancellation), with the user talking over it.
+
+Expected results are in `expected.json`. The VAD thresholds are only checked
+against this generator; real recordings can be added to `expected.json` the
+same way and should be before relying on them for a given microphone or room.
+"""
+
+import json
+import os
+import wave
+
+import numpy as np
+
+RATE = 16000
+HERE = os.path.dirname(os.path.abspath(__file__))
+VOWELS = [(730, 1090, 2440), (270, 2290, 3010), (530, 1840, 2480), (570, 840, 2410), (300, 870, 2240)]
+
+
+def resonate(x: np.ndarray, frequency: float, bandwidth: float) -> np.ndarray:
+    r = np.exp(-np.pi * bandwidth / RATE)
+    a1, a2 = -2 * r * np.cos(2 * np.pi * frequency / RATE), r * r
+    y = np.zeros_like(x)
+    y1 = y2 = 0.0
+    for i, value in enumerate(x):
+        y[i] = value - a1 * y1 - a2 * y2
+        y1, y2 = y[i], y1
+    return y
+
+
+def voice(seconds: float, f0: float, level_db: float, rng: np.random.Generator) -> np.ndarray:
+    """Syllables of varying vowels and pitch, normalized to `level_db` dBFS RMS."""
+    syllables = []
+    remaining = int(seconds * RATE)
+    while remaining > 0:
+        n = min(remaining, int(rng.uniform(0.15, 0.25) * RATE))
+        t = np.arange(n) / RATE
+        pitch = f0 * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t + rng.uniform(0, 6)))
+        source = 2 * (np.cumsum(pitch) / RATE % 1) - 1 + 0.05 * rng.standard_normal(n)
+        syllable = sum(resonate(source, f, 80 + 0.05 * f) for f in VOWELS[rng.integers(len(VOWELS))])
+        # Loudness dips between syllables, as in connected speech
+        syllable *= 0.25 + 0.75 * np.sin(np.pi * np.arange(n) / n) ** 2
+        syllables.append(syllable)
+        remaining -= n
+    signal = np.concatenate(syllables)
+    return signal / np.sqrt(np.mean(signal ** 2)) * 32768 * 10 ** (level_db / 20)
+
+
+def room_noise(seconds: float, level_db: float, rng: np.random.Generator) -> np.ndarray:
+    """Low-passed noise with a little mains hum, at `level_db` dBFS RMS."""
+    n = int(seconds * RATE)
+    noise = np.zeros(n)
+    white = rng.standard_normal(n)
+    state = 0.0
+    for i in range(n):
+        state = 0.95 * state + white[i]
+        noise[i] = state
+    noise += 0.3 * np.std(noise) * np.sin(2 * np.pi * 50 * np.arange(n) / RATE)
+    return noise / np.sqrt(np.mean(noise ** 2)) * 32768 * 10 ** (level_db / 20)
+
+
+def place(track: np.ndarray, signal: np.ndarray, at_s: float) -> None:
+    start = int(at_s * RATE)
+    track[start:start + len(signal)] += signal[: len(track) - start]
+
+
+def echo_path(playback: np.ndarray, coupling_db: float) -> np.ndarray:
+    """Playback as heard by the microphone: a direct path and a few reflections."""
+    echo = np.zeros_like(playback)
+    for delay_ms, gain in ((15, 1.0), (32, 0.5), (55, 0.3), (90, 0.15)):
+        delay = int(delay_ms * RATE / 1000)
+        echo[delay:] += gain * playback[: len(playback) - delay]
+    return echo * 10 ** (coupling_db / 20)
+
+
+def write_wav(name: str, channels: list[np.ndarray]) -> None:
+    data = np.stack([np.clip(c, -32768, 32767).astype(np.int16) for c in channels], axis=1)
+    with wave.open(os.path.join(HERE, name), "wb") as f:
+        f.setnchannels(len(channels))
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(data.tobytes())
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(29)
+    expected = {"_about": "Synthetic clips generated by synthesize.py (formant-synthesized voice over generated room noise), not recorded speech."}
+
+    # Two utterances separated by a pause, in a quiet room
+    mic = room_noise(4.6, -55, rng)
+    place(mic, voice(1.2, 120, -24, rng), 0.8)
+    place(mic, voice(0.6, 120, -24, rng), 2.9)
+    write_wav("two_utterances.wav", [mic])
+    expected["two_utterances.wav"] = {"speech": [[0.8, 2.0], [2.9, 3.5]]}
+
+    # One quieter utterance over louder fan noise
+    mic = room_noise(3.6, -42, rng)
+    place(mic, voice(1.4, 210, -26, rng), 1.0)
+    write_wav("noisy_room.wav", [mic])
+    expected["noisy_room.wav"] = {"speech": [[1.0, 2.4]]}
+
+    # The assistant talks from 0.3 s; its voice leaks into the mic; the user cuts in at 2.2 s
+    playback = np.zeros(int(4.0 * RATE))
+    place(playback, voice(3.5, 190, -20, rng), 0.3)
+    mic = room_noise(4.0, -55, rng) + echo_path(playback, coupling_db=-18)
+    place(mic, voice(1.0, 110, -18, rng), 2.2)
+    write_wav("echo_barge_in.wav", [mic, playback])
+    expected["echo_barge_in.wav"] = {"barge_in": 2.2}
+
+    with open(os.path.join(HERE, "expected.json"), "w") as f:
+        json.dump(expected, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(expected) - 1} fixtures to {HERE}")
@@ -0,0 +1,116 @@
+"""
+Speculative retrieval for voice agents.
+
+Normally retrieval only starts after the whole utterance is transcribed and the
+LLM has decided to call the search tool. Here we start searching while the
+transcript is still streaming in:
+
+1. `SpeculativeSTTModel` streams the transcription and reports every partial
+   transcript to a `SpeculativeRetriever`.
+2. The retriever launches a search in the background as soon as the partial
+   transcript has a few new words, replacing any stale search.
+3. When the agent calls its search tool, the tool first asks the retriever for a
+   prefetched result whose query is close enough to the one the LLM wrote, and
+   only goes to the network if there is none.
+"""
+
+import asyncio
+import re
+
+from agents.voice import AudioInput, OpenAISTTModel, STTModelSettings
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+class SpeculativeRetriever:
+    """Runs searches ahead of time on partial transcripts."""
+
+    def __init__(self, search, k: int = 3, min_new_words: int = 3, min_overlap: float = 0.5):
+        """
+        Args:
+            search: Async function `search(query, k)` returning the results to reuse.
+            k: The number of results to prefetch.
+            min_new_words: How many new words the transcript needs before a new search starts.
+            min_overlap: Minimum share of the tool query's words that must appear in the
+                speculative query for its results to be reused.
+        """
+        self.search = search
+        self.k = k
+        self.min_new_words = min_new_words
+        self.min_overlap = min_overlap
+        self._query = ""
+        self._task: asyncio.Task | None = None
+
+    def observe(self, partial_transcript: str) -> None:
+        """Feed the latest partial transcript; may start a new background search."""
+        new_words = len(_words(partial_transcript) - _words(self._query))
+        if new_words < self.min_new_words:
+            return
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._query = partial_transcript
+        self._task = asyncio.create_task(self.search(partial_transcript, self.k))
+
+    async def lookup(self, query: str, k: int, timeout: float = 1.0):
+        """
+        Return prefetched results for `query`, or None if there are none to reuse.
+
+        Args:
+            query: The query the agent wants to run.
+            k: The number of results the agent wants.
+            timeout: How long to wait for an in-flight speculative search.
+        """
+        if self._task is None or k > self.k:
+            return None
+        query_words = _words(query)
+        if not query_words:
+            return None
+        overlap = len(query_words & _words(self._query)) / len(query_words)
+        if overlap < self.min_overlap:
+            return None
+        try:
+            results = await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except Exception:
+            return None
+        return results[:k]
+
+    def reset(self) -> None:
+        """Drop any speculative state before the next turn."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._query = ""
+
+
+class SpeculativeSTTModel(OpenAISTTModel):
+    """OpenAI STT model that streams the transcript and reports partial results."""
+
+    def __init__(self, model: str, openai_client, retriever: SpeculativeRetriever):
+        super().__init__(model=model, openai_client=openai_client)
+        self.retriever = retriever
+
+    async def transcribe(
+        self,
+        input: AudioInput,
+        settings: STTModelSettings,
+        trace_include_sensitive_data: bool,
+        trace_include_sensitive_audio_data: bool,
+    ) -> str:
+        stream = await self._client.audio.transcriptions.create(
+            model=self.model,
+            file=input.to_audio_file(),
+            prompt=self._non_null_or_not_given(settings.prompt),
+            language=self._non_null_or_not_given(settings.language),
+            temperature=self._non_null_or_not_given(settings.temperature),
+            stream=True,
+        )
+        transcript = ""
+        async for event in stream:
+            if event.type == "transcript.text.delta":
+                transcript += event.delta
+                self.retriever.observe(transcript)
+            elif event.type == "transcript.text.done":
+                transcript = event.text
+        return transcript
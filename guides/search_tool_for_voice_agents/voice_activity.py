@@ -0,0 +1,408 @@
+"""
+Energy-based voice activity detection (VAD) and endpointing.
+
+Replaces push-to-talk: the microphone stays open, every captured frame goes
+through `EnergyVAD`, and `VoiceActivityMonitor` records an utterance from the
+moment speech starts until it has been silent for `end_silence_ms`. While the
+assistant is talking, speech onset triggers barge-in instead, and
+`AudioPlayer` goes silent from its very next output block.
+
+There is no echo cancellation, so the assistant's voice also reaches the
+microphone; `AudioPlayer` reports how loud it just played, and the monitor
+ignores frames explained by that echo instead of barging in on itself.
+
+Everything works on plain NumPy frames, so it can be checked offline. Run
+`python voice_activity.py recording.wav` to print the speech segments found in a
+16-bit WAV file, or run it with no argument to check the synthetic WAV fixtures
+in `fixtures/` (generated by `fixtures/synthesize.py`, not recorded speech)
+against `fixtures/expected.json`.
+"""
+
+import asyncio
+import collections
+import threading
+import wave
+
+import numpy as np
+
+from audio_capture import AudioRingBuffer
+
+SAMPLE_RATE = 24000
+FRAME_MS = 20
+
+
+def frame_energy_db(frame: np.ndarray) -> float:
+    """RMS level of an int16 frame in dBFS (-100 for digital silence)."""
+    samples = frame.astype(np.float32) / 32768.0
+    rms = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+    return 20 * np.log10(rms) if rms > 1e-5 else -100.0
+
+
+class EnergyVAD:
+    """
+    Frame-by-frame speech detector with an adaptive noise floor.
+
+    A frame counts as voiced when it is `threshold_db` louder than the running
+    noise floor (and above `min_level_db`). Speech starts after `min_speech_ms` of
+    voiced frames and ends after `end_silence_ms` of unvoiced ones. The first
+    `calibration_ms` after a reset are taken as background to set the floor, since
+    the microphone opens before anyone talks.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = FRAME_MS,
+        threshold_db: float = 12.0,
+        min_level_db: float = -50.0,
+        min_speech_ms: int = 100,
+        end_silence_ms: int = 600,
+        noise_adapt: float = 0.05,
+        calibration_ms: int = 200,
+    ):
+        self.frame_frames = sample_rate * frame_ms // 1000
+        self.calibration_frames = calibration_ms // frame_ms
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.noise_adapt = noise_adapt
+        self.reset()
+
+    def reset(self) -> None:
+        self.noise_floor_db = -60.0
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._frames_seen = 0
+
+    def process(self, frame: np.ndarray, suppress: bool = False) -> str | None:
+        """
+        Feed one frame.
+
+        Args:
+            frame: int16 samples of one frame.
+            suppress: Treat the frame as unvoiced without learning it as background,
+                e.g. because it is explained by the assistant's own playback.
+
+        Returns:
+            "speech_start", "speech_end", or None when nothing changed.
+        """
+        level = frame_energy_db(frame)
+        self._frames_seen += 1
+        if self._frames_seen <= self.calibration_frames:
+            # Running mean of the first frames' levels
+            self.noise_floor_db += (level - self.noise_floor_db) / self._frames_seen
+            return None
+        voiced = not suppress and level > max(self.noise_floor_db + self.threshold_db, self.min_level_db)
+        if not voiced and not suppress:
+            # Only track the floor on background frames so speech doesn't raise it
+            self.noise_floor_db += self.noise_adapt * (level - self.noise_floor_db)
+
+        if not self.in_speech:
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.min_speech_frames:
+                self.in_speech = True
+                self._silent_run = 0
+                return "speech_start"
+        else:
+            self._silent_run = 0 if voiced else self._silent_run + 1
+            if self._silent_run >= self.end_silence_frames:
+                self.in_speech = False
+                self._voiced_run = 0
+                return "speech_end"
+        return None
+
+
+def detect_segments(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, vad: EnergyVAD | None = None) -> list[tuple[float, float]]:
+    """
+    Run the VAD over a whole recording.
+
+    Args:
+        samples: int16 samples, shape (n,) or (n, 1).
+        sample_rate: Sample rate of the recording.
+        vad: Detector to use; a default one is created for `sample_rate` otherwise.
+
+    Returns:
+        (start_seconds, end_seconds) for every detected utterance. Start times are
+        when speech was confirmed and end times when the endpoint fired.
+    """
+    vad = vad or EnergyVAD(sample_rate=sample_rate)
+    step = vad.frame_frames
+    segments = []
+    start = None
+    for i in range(0, len(samples) - step + 1, step):
+        event = vad.process(samples[i:i + step])
+        if event == "speech_start":
+            start = (i + step) / sample_rate
+        elif event == "speech_end":
+            segments.append((start, (i + step) / sample_rate))
+            start = None
+    if start is not None:
+        segments.append((start, len(samples) / sample_rate))
+    return segments
+
+
+def read_wav(path: str, channel: int = 0) -> tuple[np.ndarray, int]:
+    """Load one channel of a 16-bit WAV file as int16 samples, and its sample rate."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        return data.reshape(-1, f.getnchannels())[:, channel], f.getframerate()
+
+
+class VoiceActivityMonitor:
+    """
+    sounddevice input callback that records utterances and detects barge-in.
+
+    There is no echo cancellation, so the assistant's own voice reaches the
+    microphone. With an `echo_reference`, a frame only counts as speech while
+    something was just played if it is clearly louder than the echo expected from
+    that playback; the speaker-to-microphone coupling is learned from the frames
+    that are explained by it.
+    """
+
+    def __init__(
+        self,
+        vad: EnergyVAD | None = None,
+        pre_roll_ms: int = 200,
+        on_barge_in=None,
+        echo_reference=None,
+        echo_coupling_db: float = -12.0,
+        echo_margin_db: float = 10.0,
+    ):
+        """
+        Args:
+            vad: The detector to run on each frame.
+            pre_roll_ms: Audio kept from before speech was confirmed, so the first
+                syllable is not clipped.
+            on_barge_in: Called from the audio thread when the user starts talking
+                while `assistant_speaking` is set.
+            echo_reference: Callable returning the level of recent playback in dBFS,
+                e.g. `AudioPlayer.recent_output_db`; None disables echo gating.
+            echo_coupling_db: Initial estimate of the echo level relative to the playback.
+            echo_margin_db: How much louder than the expected echo a frame must be to
+                count as speech while the assistant is audible.
+        """
+        self.vad = vad or EnergyVAD()
+        self.on_barge_in = on_barge_in
+        self.echo_reference = echo_reference
+        self.echo_coupling_db = echo_coupling_db
+        self.echo_margin_db = echo_margin_db
+        self.assistant_speaking = False
+        self.utterance_ready = threading.Event()
+        self._buffer = AudioRingBuffer()
+        self._pre_roll = collections.deque(maxlen=max(1, pre_roll_ms // FRAME_MS))
+        self._ready = collections.deque()
+
+    def callback(self, indata, frames, time, status) -> None:
+        step = self.vad.frame_frames
+        for i in range(0, len(indata) - step + 1, step):
+            self.process_frame(indata[i:i + step])
+
+    def is_echo(self, frame: np.ndarray) -> bool:
+        """Whether the frame is explained by what was just played (learning the coupling if so)."""
+        if self.echo_reference is None or self.vad.in_speech:
+            return False
+        playback_db = self.echo_reference()
+        if playback_db <= -60.0:
+            return False
+        level = frame_energy_db(frame)
+        if level > playback_db + self.echo_coupling_db + self.echo_margin_db:
+            return False
+        self.echo_coupling_db += self.vad.noise_adapt * (level - playback_db - self.echo_coupling_db)
+        return True
+
+    def process_frame(self, frame: np.ndarray) -> None:
+        event = self.vad.process(frame, suppress=self.is_echo(frame))
+        buffer = self._buffer
+
+        if event == "speech_start":
+            buffer.clear()
+            for old_frame in self._pre_roll:
+                buffer.write(old_frame)
+            self._pre_roll.clear()
+            if self.assistant_speaking and self.on_barge_in is not None:
+                self.on_barge_in()
+
+        if self.vad.in_speech or event == "speech_end":
+            buffer.write(frame)
+        else:
+            self._pre_roll.append(frame.copy())
+
+        if event == "speech_end":
+            # The buffer is reused for the next utterance, so queue a copy
+            self._ready.append(buffer.view().copy())
+            self.utterance_ready.set()
+
+    def wait_for_utterance(self, timeout: float | None = None) -> np.ndarray | None:
+        """Block until the user finishes an utterance and return it (None on timeout)."""
+        if not self._ready and not self.utterance_ready.wait(timeout):
+            return None
+        self.utterance_ready.clear()
+        return self._ready.popleft() if self._ready else None
+
+
+class AudioPlayer:
+    """
+    Playback queue for a callback-based `sd.OutputStream`.
+
+    `interrupt()` drops everything queued, so output stops at the next block
+    boundary (one frame) instead of after the current `write()` returns. It is
+    called from the input stream's thread, so the queue is shared under a lock,
+    held only for the few copies of one output block.
+
+    `recent_output_db()` is the loudest level played over the last `echo_tail_ms`,
+    the echo reference for `VoiceActivityMonitor`.
+    """
+
+    def __init__(self, channels: int = 1, sample_rate: int = SAMPLE_RATE, echo_tail_ms: int = 300):
+        self.channels = channels
+        self.interrupted = threading.Event()
+        self._queue = collections.deque()
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._tail_frames = sample_rate * echo_tail_ms // 1000
+        self._levels = collections.deque()  # (frames, dBFS) of recent output blocks, output thread only
+        self._recent_db = -100.0
+
+    def play(self, data: np.ndarray) -> None:
+        with self._lock:
+            if self.interrupted.is_set():
+                return
+            self._idle.clear()
+            self._queue.append(np.asarray(data, dtype=np.int16).reshape(-1, self.channels))
+
+    def interrupt(self) -> None:
+        self.interrupted.set()
+        with self._lock:
+            self._queue.clear()
+            self._offset = 0
+            self._idle.set()
+
+    def recent_output_db(self) -> float:
+        return self._recent_db
+
+    def reset(self) -> None:
+        """Allow playback again after an interruption."""
+        self.interrupted.clear()
+
+    def callback(self, outdata, frames, time, status) -> None:
+        written = 0
+        with self._lock:
+            while written < frames and self._queue:
+                chunk = self._queue[0]
+                take = min(frames - written, len(chunk) - self._offset)
+                outdata[written:written + take] = chunk[self._offset:self._offset + take]
+                written += take
+                self._offset += take
+                if self._offset >= len(chunk):
+                    self._queue.popleft()
+                    self._offset = 0
+            if not self._queue:
+                self._idle.set()
+        outdata[written:] = 0
+
+        self._levels.append((frames, frame_energy_db(outdata[:written]) if written else -100.0))
+        total = sum(n for n, _ in self._levels)
+        while total - self._levels[0][0] >= self._tail_frames:
+            total -= self._levels.popleft()[0]
+        # A single assignment, so the input thread reads a consistent value
+        self._recent_db = max(level for _, level in self._levels)
+
+    async def drain(self) -> None:
+        """Wait until everything queued has been played or playback was interrupted."""
+        await asyncio.to_thread(self._idle.wait)
+
+
+def simulate_barge_in(mic: np.ndarray, playback: np.ndarray, sample_rate: int, echo_gating: bool = True) -> float | None:
+    """
+    Replay a mic recording while an `AudioPlayer` plays `playback`, frame by frame.
+
+    Returns:
+        The time in seconds at which barge-in fired, or None.
+    """
+    player = AudioPlayer(sample_rate=sample_rate)
+    monitor = VoiceActivityMonitor(
+        EnergyVAD(sample_rate=sample_rate),
+        on_barge_in=player.interrupt,
+        echo_reference=player.recent_output_db if echo_gating else None,
+    )
+    monitor.assistant_speaking = True
+    player.play(playback)
+    step = monitor.vad.frame_frames
+    out = np.zeros((step, 1), dtype=np.int16)
+    for i in range(0, len(mic) - step + 1, step):
+        player.callback(out, step, None, None)
+        monitor.process_frame(mic[i:i + step].reshape(-1, 1))
+        if player.interrupted.is_set():
+            return (i + step) / sample_rate
+    return None
+
+
+if __name__ == "__main__":
+    import json
+    import os
+    import sys
+
+    if len(sys.argv) > 1:
+        samples, rate = read_wav(sys.argv[1])
+        for start, end in detect_segments(samples, rate):
+            print(f"speech {start:6.2f}s -> {end:6.2f}s")
+        sys.exit(0)
+
+    # Synthetic fixtures in fixtures/: expected speech spans, or when barge-in should fire
+    fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+    with open(os.path.join(fixtures_dir, "expected.json")) as f:
+        expected = json.load(f)
+    tolerance_s, end_silence_s = 0.2, EnergyVAD().end_silence_frames * FRAME_MS / 1000
+    failures = 0
+    for name, expectation in expected.items():
+        if name.startswith("_"):
+            continue
+        path = os.path.join(fixtures_dir, name)
+        mic, rate = read_wav(path)
+        if "speech" in expectation:
+            segments = detect_segments(mic, rate)
+            # Speech is confirmed shortly after it starts, and the endpoint fires after the trailing silence
+            ok = len(segments) == len(expectation["speech"]) and all(
+                abs(start - exp_start) < tolerance_s and abs(end - exp_end - end_silence_s) < tolerance_s
+                for (start, end), (exp_start, exp_end) in zip(segments, expectation["speech"])
+            )
+            print(f"{name}: {[(round(a, 2), round(b, 2)) for a, b in segments]} {'OK' if ok else 'MISMATCH'}")
+        else:
+            playback, _ = read_wav(path, channel=1)
+            at = simulate_barge_in(mic, playback, rate)
+            ungated = simulate_barge_in(mic, playback, rate, echo_gating=False)
+            ok = at is not None and 0 <= at - expectation["barge_in"] < tolerance_s
+            print(f"{name}: barge-in at {at}s (user starts at {expectation['barge_in']}s) {'OK' if ok else 'MISMATCH'}; "
+                  f"without echo gating the assistant interrupts itself at {ungated}s")
+        failures += not ok
+
+    # Three utterances queued before any is read: each must keep its own audio
+    mic, rate = read_wav(os.path.join(fixtures_dir, "two_utterances.wav"))
+    monitor = VoiceActivityMonitor(EnergyVAD(sample_rate=rate))
+    step = monitor.vad.frame_frames
+    for _ in range(3):
+        for i in range(0, len(mic) - step + 1, step):
+            monitor.process_frame(mic[i:i + step].reshape(-1, 1))
+    utterances = []
+    while (utterance := monitor.wait_for_utterance(timeout=0)) is not None:
+        utterances.append(utterance)
+    distinct = len(utterances) == 6 and all(
+        np.array_equal(utterances[i], utterances[i + 2]) for i in range(4)
+    ) and not np.array_equal(utterances[0][:len(utterances[1])], utterances[1][:len(utterances[0])])
+    print(f"queued utterances kept intact: {distinct}")
+    failures += not distinct
+
+    # Barge-in cuts playback at the very next output block
+    player = AudioPlayer()
+    player.play(np.ones(SAMPLE_RATE, dtype=np.int16))
+    player.interrupt()
+    out = np.ones((480, 1), dtype=np.int16)
+    player.callback(out, 480, None, None)
+    print(f"next output block after interrupt() is silent: {not out.any()}")
+    sys.exit(1 if failures or out.any() else 0)
@@ -0,0 +1,127 @@
+"""
+Time-to-first-audio instrumentation for the voice agent loop.
+
+A voice turn goes through four stages before the user hears anything:
+
+    recording stopped -> STT -> LLM (+ retrieval tool calls) -> TTS -> first audio chunk
+
+`TurnLatency` collects timestamps for each stage so the assistant can print a
+breakdown after every turn and we can check it against conversational latency
+targets (roughly 800 ms to first audio feels natural).
+
+Retrieval that runs between the transcript and the first LLM text blocks the
+answer and is split out of the LLM time. Speculative searches started while
+the user is still being transcribed overlap STT instead; they are reported on
+their own, so stt + retrieval + llm + tts still add up to TTFA.
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TurnLatency:
+    """Timestamps (time.perf_counter) collected during a single voice turn."""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    transcribed_at: float | None = None
+    first_text_at: float | None = None
+    first_audio_at: float | None = None
+    retrieval_spans: list[tuple[float, float]] = field(default_factory=list)
+
+    def mark_transcribed(self) -> None:
+        if self.transcribed_at is None:
+            self.transcribed_at = time.perf_counter()
+
+    def mark_first_text(self) -> None:
+        if self.first_text_at is None:
+            self.first_text_at = time.perf_counter()
+
+    def mark_first_audio(self) -> None:
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+
+    def retrieval_seconds(self, after: float | None = None, before: float | None = None) -> float:
+        """
+        Wall-clock time spent in retrieval, counting overlapping calls once.
+
+        Args:
+            after: Only count retrieval from this time on (None: no lower bound).
+            before: Only count retrieval up to this time (None: no upper bound).
+        """
+        spans = []
+        for start, end in self.retrieval_spans:
+            start = start if after is None else max(start, after)
+            end = end if before is None else min(end, before)
+            if end > start:
+                spans.append((start, end))
+        total = 0.0
+        current_start, current_end = None, None
+        for start, end in sorted(spans):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
+
+    def breakdown(self) -> dict[str, float | None]:
+        """
+        Split time-to-first-audio into its stages, in milliseconds.
+
+        Returns:
+            A dict with `stt`, `retrieval`, `llm`, `tts`, `ttfa` and `speculative`
+            keys. `retrieval` is the retrieval time between the transcript and the
+            first LLM text, and is not counted in `llm`; `speculative` is retrieval
+            that overlapped STT, already inside `stt`. A stage is None when the
+            turn never reached it (e.g. it was interrupted).
+        """
+        def ms(start, end):
+            if start is None or end is None:
+                return None
+            return (end - start) * 1000
+
+        retrieval = self.retrieval_seconds(after=self.transcribed_at, before=self.first_text_at) * 1000
+        speculative = self.retrieval_seconds(before=self.transcribed_at) * 1000 if self.transcribed_at is not None else 0.0
+        llm = ms(self.transcribed_at, self.first_text_at)
+        return {
+            "stt": ms(self.started_at, self.transcribed_at),
+            "retrieval": retrieval,
+            "llm": max(llm - retrieval, 0.0) if llm is not None else None,
+            "tts": ms(self.first_text_at, self.first_audio_at),
+            "ttfa": ms(self.started_at, self.first_audio_at),
+            "speculative": speculative,
+        }
+
+    def report(self) -> str:
+        parts = []
+        for stage, value in self.breakdown().items():
+            parts.append(f"{stage}={value:.0f}ms" if value is not None else f"{stage}=n/a")
+        return "⏱️ " + "  ".join(parts)
+
+
+# The turn currently being processed. The voice loop starts a new one for every
+# utterance; tools record their retrieval time against it.
+current_turn: TurnLatency | None = None
+
+
+def start_turn() -> TurnLatency:
+    """Start timing a new turn. Call this as soon as recording stops."""
+    global current_turn
+    current_turn = TurnLatency()
+    return current_turn
+
+
+@contextmanager
+def retrieval_span():
+    """Record the wrapped block as retrieval time on the current turn, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if current_turn is not None:
+            current_turn.retrieval_spans.append((start, time.perf_counter()))
@@ -1,15 +1,11 @@
 import os
 import asyncio
-import threading
-import time
+import functools
 import io
 
 
 import dotenv
 import requests
-import sounddevice as sd
-import numpy as np
-from openai import OpenAI
 from zeroentropy import ZeroEntropy
 from agents import Agent
 from agents.mcp import MCPServerSse
@@ -20,6 +16,7 @@ from agents.voice import (
     VoicePipelineConfig,
     TTSModelSettings,
 )
+from voice_activity import AudioPlayer, VoiceActivityMonitor
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -49,9 +46,11 @@ TTS_PROMPT = (
     "Pause naturally between points."
 )
 
-# Initialize clients
-ze_client = ZeroEntropy(api_key=ZEROENTROPY_API_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# The ZeroEntropy client is created on first use; sounddevice is imported when
+# the assistant starts, so setup_yc_data() works on machines without audio
+@functools.cache
+def get_ze_client() -> ZeroEntropy:
+    return ZeroEntropy(api_key=ZEROENTROPY_API_KEY)
 
 
 def setup_yc_data():
@@ -60,7 +59,7 @@ def setup_yc_data():
     
     # Create collection
     try:
-        ze_client.collections.add(collection_name=COLLECTION_NAME)
+        get_ze_client().collections.add(collection_name=COLLECTION_NAME)
         print(f"Created collection: {COLLECTION_NAME}")
     except Exception:
         print(f"Collection {COLLECTION_NAME} already exists")
@@ -94,7 +93,7 @@ def setup_yc_data():
                 "stage": company.get("stage", ""),
             }
             
-            ze_client.documents.add(
+            get_ze_client().documents.add(
                 collection_name=COLLECTION_NAME,
                 path=slug,
                 content={"type": "text", "text": text},
@@ -109,47 +108,14 @@ def setup_yc_data():
     return success_count > 0
 
 
-def record_enter_to_talk():
-    """Record audio until Enter key is pressed."""
-    print("Press ENTER to start recording, then press ENTER again to stop...")
-    
-    # Wait for first Enter press to start recording
-    input("Press ENTER to start recording: ")
-    print("🎤 Recording... Press ENTER to stop")
-    
-    audio_data = []
-    recording = True
-    
-    def audio_callback(indata, frames, time, status):
-        if recording:
-            audio_data.append(indata.copy())
-    
-    # Start audio recording
-    stream = sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype="int16",
-        callback=audio_callback
-    )
-    
-    with stream:
-        # Wait for second Enter press to stop recording
-        input()  # This will block until Enter is pressed
-        recording = False
-        print("⏹️ Recording stopped")
-    
-    if audio_data:
-        return np.concatenate(audio_data, axis=0)
-    return None
-
-
 async def run_voice_assistant():
     """Main voice assistant loop."""
+    import sounddevice as sd
+
     print("\n🎙️ Voice Assistant")
     print("📝 Instructions:")
-    print("   • Press ENTER to start recording")
-    print("   • Press ENTER again to stop recording and send")
-    print("   • Press ENTER during AI response to interrupt")
+    print("   • Just start talking; your turn ends when you pause")
+    print("   • Talk over the assistant to interrupt it")
     print("   • Press Ctrl+C to exit")
     print("-" * 50)
     
@@ -180,80 +146,60 @@ async def run_voice_assistant():
         workflow = SingleAgentVoiceWorkflow(agent)
         pipeline = VoicePipeline(workflow=workflow, config=voice_config)
         
-        # Setup audio output
+        # Setup audio output; the player lets barge-in cut playback at the next block
+        player = AudioPlayer(channels=CHANNELS, sample_rate=SAMPLE_RATE)
         output_stream = sd.OutputStream(
             samplerate=SAMPLE_RATE,
             channels=CHANNELS,
-            dtype="int16"
+            dtype="int16",
+            callback=player.callback
+        )
+        
+        # Microphone stays open; the VAD finds turn ends and barge-ins on each frame
+        monitor = VoiceActivityMonitor(on_barge_in=player.interrupt, echo_reference=player.recent_output_db)
+        input_stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS,
+            dtype="int16",
+            blocksize=monitor.vad.frame_frames,
+            callback=monitor.callback
         )
-        output_stream.start()
         
         try:
-            while True:
-                # Record user input
-                audio_array = record_enter_to_talk()
-                if audio_array is None:
-                    continue
-                
-                # Process request
-                user_input = AudioInput(buffer=audio_array)
-                result = await pipeline.run(user_input)
-                
-                # Setup interruption detection
-                stop_playback = threading.Event()
-                interrupt_thread = None
-                
-                def monitor_interrupt():
-                    """Monitor for Enter key press to interrupt response."""
+            with input_stream, output_stream:
+                while True:
+                    # Wait for the user to finish speaking
+                    print("🎤 Listening...")
+                    audio_array = await asyncio.to_thread(monitor.wait_for_utterance)
+                    if audio_array is None:
+                        continue
+                    
+                    # Process request
+                    user_input = AudioInput(buffer=audio_array)
+                    result = await pipeline.run(user_input)
+                    
+                    # Stream response
+                    player.reset()
+                    monitor.assistant_speaking = True
+                    print("🤖 Assistant: ", end="", flush=True)
                     try:
-                        # Set a very short timeout for input() to make it non-blocking-ish
-                        # We'll use a simple approach: try to read input with a timeout
-                        import select
-                        import sys
-                        
-                        while not stop_playback.is_set():
-                            # Check if input is available (Unix/macOS only)
-                            if hasattr(select, 'select'):
-                                ready, _, _ = select.select([sys.stdin], [], [], 0.1)
-                                if ready:
-                                    # Consume the input line
-                                    sys.stdin.readline()
-                                    stop_playback.set()
-                                    return
-                            else:
-                                # Fallback for Windows - less responsive
-                                time.sleep(0.1)
-                    except:
+                        async for event in result.stream():
+                            if player.interrupted.is_set():
+                                print("\n[Interrupted]")
+                                break
+                            if event.type == "voice_stream_event_audio":
+                                player.play(event.data)
+                            elif event.type == "voice_stream_event_transcript":
+                                print(event.text, end="", flush=True)
+                        await player.drain()
+                    except Exception:
                         pass
-                
-                # Start interrupt monitoring thread
-                interrupt_thread = threading.Thread(target=monitor_interrupt, daemon=True)
-                interrupt_thread.start()
-                
-                # Stream response
-                print("🤖 Assistant: ", end="", flush=True)
-                try:
-                    async for event in result.stream():
-                        if stop_playback.is_set():
-                            print("\n[Interrupted]")
-                            break
-                        if event.type == "voice_stream_event_audio":
-                            output_stream.write(event.data)
-                        elif event.type == "voice_stream_event_transcript":
-                            print(event.text, end="", flush=True)
-                except Exception:
-                    pass
-                
-                # Signal the interrupt thread to stop
-                stop_playback.set()
-                
-                print("\n" + "-" * 30)
+                    monitor.assistant_speaking = False
+                    
+                    print("\n" + "-" * 30)
                 
         except KeyboardInterrupt:
             print("\n👋 Goodbye!")
-        finally:
-            output_stream.stop()
-            output_stream.close()
 
 
 
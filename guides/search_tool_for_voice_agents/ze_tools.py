@@ -1,9 +1,15 @@
 import os
+import asyncio
 import dotenv
+import functools
 import json
+from dataclasses import dataclass
 
 from agents import Agent, Runner, function_tool, FunctionTool
-from zeroentropy import ZeroEntropy
+from zeroentropy import AsyncZeroEntropy, ZeroEntropy
+
+from document_listing import PAGE_LIMIT, iter_document_pages
+from voice_latency import retrieval_span
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -11,13 +17,38 @@ ZEROENTROPY_API_KEY = os.getenv("ZEROENTROPY_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "yc_voice_agent_support")
 
-# Initialize SDK client
-ze_client = ZeroEntropy(api_key=ZEROENTROPY_API_KEY)
+# SDK clients, created on first use. The retrieval tools use the async client so
+# they don't block the event loop while the voice pipeline is streaming audio.
+@functools.cache
+def get_ze_client() -> ZeroEntropy:
+    return ZeroEntropy(api_key=ZEROENTROPY_API_KEY)
+
+
+@functools.cache
+def get_ze_async_client() -> AsyncZeroEntropy:
+    return AsyncZeroEntropy(api_key=ZEROENTROPY_API_KEY)
+
+
+# Optional SpeculativeRetriever (see speculative_retrieval.py) whose prefetched
+# results top_documents reuses when they match the query.
+speculative_retriever = None
+
+
+async def search_top_documents(query: str, k: int = 3):
+    """Async retrieval backend shared by the top_documents tool and speculative retrieval."""
+    with retrieval_span():
+        response = await get_ze_async_client().queries.top_documents(
+            collection_name=COLLECTION_NAME,
+            query=query,
+            k=k,
+        )
+    return response.results
+
 
 SYSTEM_PROMPT = "You are a helpful voice assistant who can answer any question about any YC company"
 
 @function_tool
-def top_documents(query: str, k: int = 3) -> list[dict]:
+async def top_documents(query: str, k: int = 3) -> list[dict]:
     """
     Retrieve top documents from the ZeroEntropy collection using a query.
 
@@ -29,20 +60,20 @@ def top_documents(query: str, k: int = 3) -> list[dict]:
         A string containing the top documents' content and paths.
     """
     try:
+        if speculative_retriever is not None:
+            prefetched = await speculative_retriever.lookup(query, k)
+            if prefetched is not None:
+                print(f"Using prefetched top documents for: {query}")
+                return prefetched
         print(f"Querying ZeroEntropy collection for top documents: {COLLECTION_NAME}")
-        response = ze_client.queries.top_documents(
-            collection_name=COLLECTION_NAME,
-            query=query,
-            k=k,
-        )
-        return response.results
+        return await search_top_documents(query, k)
     except Exception as e:
         return f"❌ Error fetching top documents: {str(e)}"
 
 
 
 @function_tool
-def rerank_documents(query: str, documents: list[str], model: str = "zerank-1", top_n: int = 3) -> str:
+async def rerank_documents(query: str, documents: list[str], model: str = "zerank-1", top_n: int = 3) -> str:
     """
     Reranks the provided documents, according to the provided query.
 
@@ -57,15 +88,183 @@ def rerank_documents(query: str, documents: list[str], model: str = "zerank-1",
     """
     try:
         print(f"Querying ZeroEntropy collection for reranking: {COLLECTION_NAME}")
-        response = ze_client.models.rerank(
-            query=query,
-            documents=documents,
-        )
+        with retrieval_span():
+            response = await get_ze_async_client().models.rerank(
+                query=query,
+                documents=documents,
+            )
         return response.results
     except Exception as e:
         return f"❌ Error reranking documents: {str(e)}"
 
 
+@dataclass(frozen=True)
+class RetrievalProfile:
+    """
+    How much retrieval work an agent is allowed to do per query.
+
+    Attributes:
+        name: Used as a suffix for the search tool name.
+        kind: Query to run: "pages" or "documents" (both accept `latency_mode`),
+            or "snippets" (which does not, but can return short passages).
+        k: The number of results handed to the agent.
+        candidates: The number of results fetched before reranking (== k when not reranking).
+        precise_snippets: For "snippets", return ~200 char snippets instead of ~2000 char
+            ones; must be None for the other kinds, which return whole pages or documents.
+        latency_mode: For "pages" and "documents", "low" or "high"; None uses the API default.
+        reranker: Rerank model to reorder the candidates with, or None to skip reranking.
+        rerank_latency: Latency mode for the rerank call ("fast" or "slow").
+        deadline: Hard time budget in seconds for the whole retrieval.
+    """
+    name: str
+    kind: str
+    k: int
+    candidates: int
+    precise_snippets: bool | None
+    latency_mode: str | None
+    reranker: str | None
+    rerank_latency: str
+    deadline: float
+
+    def __post_init__(self):
+        if self.kind != "snippets" and self.precise_snippets is not None:
+            raise ValueError(f"precise_snippets only applies to snippets, not to '{self.kind}'")
+        if self.kind == "snippets" and self.latency_mode is not None:
+            raise ValueError("top_snippets does not take a latency_mode")
+
+
+# Voice: answer from a few pages retrieved in low-latency mode, well under a second
+FAST_PROFILE = RetrievalProfile(
+    name="fast",
+    kind="pages",
+    k=3,
+    candidates=3,
+    precise_snippets=None,
+    latency_mode="low",
+    reranker=None,
+    rerank_latency="fast",
+    deadline=0.8,
+)
+
+# Batch research: wider net, reranked with zerank-1
+THOROUGH_PROFILE = RetrievalProfile(
+    name="thorough",
+    kind="snippets",
+    k=10,
+    candidates=50,
+    precise_snippets=False,
+    latency_mode=None,
+    reranker="zerank-1",
+    rerank_latency="slow",
+    deadline=8.0,
+)
+
+PROFILES = {profile.name: profile for profile in (FAST_PROFILE, THOROUGH_PROFILE)}
+
+
+def profile_query(query: str, profile: RetrievalProfile):
+    """The first-stage query coroutine for a profile."""
+    queries = get_ze_async_client().queries
+    if profile.kind == "snippets":
+        return queries.top_snippets(
+            collection_name=COLLECTION_NAME,
+            query=query,
+            k=profile.candidates,
+            precise_responses=bool(profile.precise_snippets),
+        )
+    kwargs = {"latency_mode": profile.latency_mode} if profile.latency_mode else {}
+    if profile.kind == "pages":
+        return queries.top_pages(collection_name=COLLECTION_NAME, query=query, k=profile.candidates, include_content=True, **kwargs)
+    if profile.kind == "documents":
+        return queries.top_documents(collection_name=COLLECTION_NAME, query=query, k=profile.candidates, **kwargs)
+    raise ValueError(f"Unknown retrieval kind '{profile.kind}'")
+
+
+async def retrieve_with_profile(query: str, profile: RetrievalProfile) -> list[dict]:
+    """
+    Search the collection within the profile's deadline.
+
+    If the deadline hits during reranking, the snippets are returned in retrieval
+    order instead; if it hits during retrieval, an empty list is returned.
+
+    Args:
+        query: The search string to run against the collection.
+        profile: The retrieval profile to apply.
+
+    Returns:
+        A list of dicts with path, content and score, best first.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + profile.deadline
+
+    with retrieval_span():
+        try:
+            response = await asyncio.wait_for(profile_query(query, profile), timeout=deadline - loop.time())
+        except asyncio.TimeoutError:
+            print(f"⏱️ Retrieval missed the {profile.name} deadline ({profile.deadline}s)")
+            return []
+
+        # top_documents results carry no content; the agent still gets the paths
+        snippets = [
+            {"path": result.path, "content": getattr(result, "content", None), "score": result.score}
+            for result in response.results
+        ]
+        if profile.reranker is None or len(snippets) <= 1:
+            return snippets[:profile.k]
+
+        try:
+            rerank_response = await asyncio.wait_for(
+                get_ze_async_client().models.rerank(
+                    model=profile.reranker,
+                    query=query,
+                    documents=[snippet["content"] or "" for snippet in snippets],
+                    top_n=profile.k,
+                    latency=profile.rerank_latency,
+                ),
+                timeout=deadline - loop.time(),
+            )
+        except Exception as e:
+            # Degrade to the first-stage ordering rather than returning nothing
+            print(f"⏱️ Reranking skipped for {profile.name} profile: {e!r}")
+            return snippets[:profile.k]
+
+    reranked = []
+    for result in rerank_response.results:
+        snippet = dict(snippets[result.index])
+        snippet["score"] = result.relevance_score
+        reranked.append(snippet)
+    return reranked
+
+
+def make_search_tool(profile: RetrievalProfile = FAST_PROFILE) -> FunctionTool:
+    """
+    Build a search tool bound to a retrieval profile, so each agent can pick its own.
+
+    Example:
+        Agent(..., tools=[make_search_tool(FAST_PROFILE)])      # voice
+        Agent(..., tools=[make_search_tool(THOROUGH_PROFILE)])  # research
+    """
+    async def search_collection(query: str) -> list[dict]:
+        """
+        Search the ZeroEntropy collection for passages relevant to a query.
+
+        Args:
+            query: The search string to run against the collection.
+
+        Returns:
+            A list of the most relevant passages with their paths and scores.
+        """
+        if speculative_retriever is not None:
+            prefetched = await speculative_retriever.lookup(query, profile.k)
+            if prefetched is not None:
+                print(f"Using prefetched results for: {query}")
+                return prefetched
+        print(f"Searching ZeroEntropy collection ({profile.name} profile): {COLLECTION_NAME}")
+        return await retrieve_with_profile(query, profile)
+
+    return function_tool(search_collection, name_override=f"search_collection_{profile.name}")
+
+
 @function_tool
 def add_document(content: str, path: str, collection_name: str = COLLECTION_NAME) -> str:
     """
@@ -103,7 +302,7 @@ def add_document(content: str, path: str, collection_name: str = COLLECTION_NAME
     """
     try:
         print(f"Adding document to ZeroEntropy collection: {collection_name}")
-        response = ze_client.documents.add(
+        response = get_ze_client().documents.add(
             collection_name=collection_name,
             document=content,
             path=path,
@@ -123,7 +322,7 @@ def delete_document(collection_name: str, path: str) -> dict:
         dict: A dictionary with a success key and a message key
     """
     try:
-        ze_client.documents.delete(collection_name=collection_name, path=path)
+        get_ze_client().documents.delete(collection_name=collection_name, path=path)
         return {
             "success": True,
             "message": f"Document '{path}' deleted from collection '{collection_name}'"
@@ -142,26 +341,33 @@ def get_document_info(collection_name: str, path: str, include_content: bool = F
         Returns:
             dict: A dictionary with the document information
         """
-        response = ze_client.documents.get_info(collection_name=collection_name, path=path, include_content=include_content)
+        response = get_ze_client().documents.get_info(collection_name=collection_name, path=path, include_content=include_content)
         return response.document.model_dump()
 
 @function_tool
-def get_document_info_list(collection_name: str, limit: int = 1024, path_prefix: str | None = None, path_gt: str | None = None) -> list[dict]:
+async def get_document_info_list(collection_name: str, limit: int = 1024, path_prefix: str | None = None, path_gt: str | None = None) -> list[dict]:
         """
         Get a list of documents in a collection
         Args:
             collection_name (str): The name of the collection to get the document list from.
-            limit (int): The maximum number of documents to return. Defaults to 1024.
+            limit (int): The maximum number of documents to return, across as many pages as needed. Defaults to 1024.
             path_prefix (str | None): All documents returned will have a path that starts with the provided path prefix.
             path_gt (str | None): All documents returned will have a path that is greater than the provided path.
         Returns:
             list[dict]: A list of dictionaries with the document information
         """
-        response = ze_client.documents.get_info_list(
-            collection_name=collection_name, limit=limit, path_prefix=path_prefix, path_gt=path_gt
+        documents = []
+        pages = iter_document_pages(
+            get_ze_async_client(), collection_name, path_prefix=path_prefix, path_gt=path_gt, limit=min(limit, PAGE_LIMIT)
         )
-        
-        return [doc.model_dump() for doc in response.documents]
+        try:
+            async for page in pages:
+                documents.extend(doc.model_dump() for doc in page[:limit - len(documents)])
+                if len(documents) >= limit:
+                    break
+        finally:
+            await pages.aclose()
+        return documents
 
 @function_tool
 def get_page_info(collection_name: str, path: str, page_index: int, include_content: bool = False) -> dict:
@@ -175,16 +381,17 @@ def get_page_info(collection_name: str, path: str, page_index: int, include_cont
         Returns:
             dict: A dictionary with the page information
         """
-        response = ze_client.documents.get_page_info(collection_name=collection_name, path=path, page_index=page_index, include_content=include_content)
+        response = get_ze_client().documents.get_page_info(collection_name=collection_name, path=path, page_index=page_index, include_content=include_content)
         return response.page.model_dump()
 
 
 if __name__ == "__main__":
+    profile = PROFILES[os.getenv("RETRIEVAL_PROFILE", "fast")]
     agent = Agent(
         name="ZeroEntropyVoiceAgent",
         instructions=SYSTEM_PROMPT,
         model="gpt-4.1-mini",
-        tools=[top_documents, rerank_documents, add_document, delete_document, get_document_info, get_document_info_list, get_page_info],
+        tools=[make_search_tool(profile), top_documents, rerank_documents, add_document, delete_document, get_document_info, get_document_info_list, get_page_info],
     )
     for tool in agent.tools:
         if isinstance(tool, FunctionTool):
@@ -1,23 +1,28 @@
 import os
 import asyncio
-import threading
+import functools
 import time
 from concurrent.futures import ThreadPoolExecutor
 
 import dotenv
 import requests
-import sounddevice as sd
-import numpy as np
+from openai import AsyncOpenAI
 from zeroentropy import ZeroEntropy
 from agents import Agent
 from agents.voice import (
     AudioInput,
+    StreamedAudioInput,
     SingleAgentVoiceWorkflow,
     VoicePipeline,
     VoicePipelineConfig,
     TTSModelSettings,
 )
-from ze_tools import top_documents, rerank_documents
+from audio_capture import AudioRingBuffer, stream_chunks
+from voice_activity import AudioPlayer, VoiceActivityMonitor
+import ze_tools
+import voice_latency
+from ze_tools import FAST_PROFILE, make_search_tool, retrieve_with_profile
+from speculative_retrieval import SpeculativeRetriever, SpeculativeSTTModel
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -33,6 +38,14 @@ YC_API_URL = "https://yc-oss.github.io/api/companies/all.json"
 SAMPLE_RATE = 24000
 CHANNELS = 1
 
+# Streaming STT model, so retrieval can start on the partial transcript
+STT_MODEL = "gpt-4o-mini-transcribe"
+
+# "vad" records a whole utterance per turn, ended by the local VAD; "stream" sends
+# 100 ms chunks to the pipeline as they are captured and lets the STT session
+# detect turns
+VOICE_INPUT_MODE = os.getenv("VOICE_INPUT_MODE", "vad")
+
 # Prompts
 SYSTEM_PROMPT = (
     "You receive transcribed user speech. "
@@ -47,8 +60,24 @@ TTS_PROMPT = (
     "Pause naturally between points."
 )
 
-# Initialize clients
-ze_client = ZeroEntropy(api_key=ZEROENTROPY_API_KEY)
+# The ZeroEntropy client is created on first use; sounddevice is imported when
+# the assistant starts, so setup_yc_data() works on machines without audio
+@functools.cache
+def get_ze_client() -> ZeroEntropy:
+    return ZeroEntropy(api_key=ZEROENTROPY_API_KEY)
+
+
+class TimedVoiceWorkflow(SingleAgentVoiceWorkflow):
+    """Single agent workflow that records STT and LLM timings on the current turn."""
+
+    async def run(self, transcription: str):
+        turn = voice_latency.current_turn
+        if turn is not None:
+            turn.mark_transcribed()
+        async for chunk in super().run(transcription):
+            if turn is not None:
+                turn.mark_first_text()
+            yield chunk
 
 def add_single_company(company):
     """Helper function to add a single company to the collection."""
@@ -67,7 +96,7 @@ def add_single_company(company):
             "stage": company.get("stage", ""),
         }
         
-        ze_client.documents.add(
+        get_ze_client().documents.add(
             collection_name=COLLECTION_NAME,
             path=slug,
             content={"type": "text", "text": text},
@@ -84,7 +113,7 @@ def setup_yc_data():
     
     # Create collection
     try:
-        ze_client.collections.add(collection_name=COLLECTION_NAME)
+        get_ze_client().collections.add(collection_name=COLLECTION_NAME)
         print(f"Created collection: {COLLECTION_NAME}")
     except Exception:
         print(f"Collection {COLLECTION_NAME} already exists")
@@ -115,48 +144,14 @@ def setup_yc_data():
     return True
 
 
-def record_enter_to_talk():
-    """Record audio until Enter key is pressed."""
-    print("Press ENTER to start recording, then press ENTER again to stop...")
-    
-    # Wait for first Enter press to start recording
-    input("Press ENTER to start recording: ")
-    print("🎤 Recording... Press ENTER to stop")
-    
-    audio_data = []
-    recording = True
-    
-    def audio_callback(indata, frames, time, status):
-        if recording:
-            audio_data.append(indata.copy())
-    
-    # Start audio recording
-    stream = sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype="int16",
-        callback=audio_callback
-    )
-    
-    with stream:
-        # Wait for second Enter press to stop recording
-        input()  # This will block until Enter is pressed
-        recording = False
-        print("⏹️ Recording stopped")
-    
-    if audio_data:
-        return np.concatenate(audio_data, axis=0)
-    return None
-
-
-
 async def run_voice_assistant():
     """Main voice assistant loop."""
+    import sounddevice as sd
+
     print("\n🎙️ Voice Assistant")
     print("📝 Instructions:")
-    print("   • Press ENTER to start recording")
-    print("   • Press ENTER again to stop recording and send")
-    print("   • Press ENTER during AI response to interrupt")
+    print("   • Just start talking; your turn ends when you pause")
+    print("   • Talk over the assistant to interrupt it")
     print("   • Press Ctrl+C to exit")
     print("-" * 50)
     
@@ -166,91 +161,139 @@ async def run_voice_assistant():
     agent = Agent(
         name="ZeroEntropyVoiceAgent",
         instructions=SYSTEM_PROMPT,
-        tools=[top_documents, rerank_documents],
+        tools=[make_search_tool(FAST_PROFILE)],
         model="gpt-4.1-mini",
     )
     
+    # Setup speculative retrieval: searches start while the transcript streams in
+    retriever = SpeculativeRetriever(
+        lambda query, k: retrieve_with_profile(query, FAST_PROFILE),
+        k=FAST_PROFILE.k,
+    )
+    ze_tools.speculative_retriever = retriever
+    stt_model = SpeculativeSTTModel(STT_MODEL, AsyncOpenAI(api_key=OPENAI_API_KEY), retriever)
+
     # Setup voice pipeline
     tts_settings = TTSModelSettings(instructions=TTS_PROMPT)
     voice_config = VoicePipelineConfig(tts_settings=tts_settings)
-    workflow = SingleAgentVoiceWorkflow(agent)
-    pipeline = VoicePipeline(workflow=workflow, config=voice_config)
+    workflow = TimedVoiceWorkflow(agent)
+    pipeline = VoicePipeline(workflow=workflow, stt_model=stt_model, config=voice_config)
     
-    # Setup audio output
+    # Setup audio output; the player lets barge-in cut playback at the next block
+    player = AudioPlayer(channels=CHANNELS, sample_rate=SAMPLE_RATE)
     output_stream = sd.OutputStream(
         samplerate=SAMPLE_RATE,
         channels=CHANNELS,
-        dtype="int16"
+        dtype="int16",
+        callback=player.callback
+    )
+    
+    # Microphone stays open; the VAD finds turn ends and barge-ins on each frame
+    monitor = VoiceActivityMonitor(on_barge_in=player.interrupt, echo_reference=player.recent_output_db)
+    input_stream = sd.InputStream(
+        samplerate=SAMPLE_RATE,
+        channels=CHANNELS,
+        dtype="int16",
+        blocksize=monitor.vad.frame_frames,
+        callback=monitor.callback
     )
-    output_stream.start()
     
     try:
-        while True:
-            # Record user input
-            audio_array = record_enter_to_talk()
-            if audio_array is None:
-                continue
-            
-            # Process request
-            user_input = AudioInput(buffer=audio_array)
-            result = await pipeline.run(user_input)
-            
-            # Setup interruption detection
-            stop_playback = threading.Event()
-            interrupt_thread = None
-            
-            def monitor_interrupt():
-                """Monitor for Enter key press to interrupt response."""
+        with input_stream, output_stream:
+            while True:
+                # Wait for the user to finish speaking
+                print("🎤 Listening...")
+                audio_array = await asyncio.to_thread(monitor.wait_for_utterance)
+                if audio_array is None:
+                    continue
+                
+                # Process request
+                turn = voice_latency.start_turn()
+                retriever.reset()
+                user_input = AudioInput(buffer=audio_array)
+                result = await pipeline.run(user_input)
+                
+                # Stream response
+                player.reset()
+                monitor.assistant_speaking = True
+                print("🤖 Assistant: ", end="", flush=True)
                 try:
-                    # Set a very short timeout for input() to make it non-blocking-ish
-                    # We'll use a simple approach: try to read input with a timeout
-                    import select
-                    import sys
-                    
-                    while not stop_playback.is_set():
-                        # Check if input is available (Unix/macOS only)
-                        if hasattr(select, 'select'):
-                            ready, _, _ = select.select([sys.stdin], [], [], 0.1)
-                            if ready:
-                                # Consume the input line
-                                sys.stdin.readline()
-                                stop_playback.set()
-                                return
-                        else:
-                            # Fallback for Windows - less responsive
-                            time.sleep(0.1)
-                except:
+                    async for event in result.stream():
+                        if player.interrupted.is_set():
+                            print("\n[Interrupted]")
+                            break
+                        if event.type == "voice_stream_event_audio":
+                            turn.mark_first_audio()
+                            player.play(event.data)
+                        elif event.type == "voice_stream_event_transcript":
+                            print(event.text, end="", flush=True)
+                    await player.drain()
+                except Exception:
                     pass
+                monitor.assistant_speaking = False
+                
+                print("\n" + turn.report())
+                print("-" * 30)
             
-            # Start interrupt monitoring thread
-            interrupt_thread = threading.Thread(target=monitor_interrupt, daemon=True)
-            interrupt_thread.start()
-            
-            # Stream response
-            print("🤖 Assistant: ", end="", flush=True)
-            try:
-                async for event in result.stream():
-                    if stop_playback.is_set():
-                        print("\n[Interrupted]")
-                        break
-                    if event.type == "voice_stream_event_audio":
-                        output_stream.write(event.data)
-                    elif event.type == "voice_stream_event_transcript":
-                        print(event.text, end="", flush=True)
-            except Exception:
-                pass
-            
-            # Signal the interrupt thread to stop
-            stop_playback.set()
-            
-            print("\n" + "-" * 30)
-            
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!")
+
+async def run_streaming_voice_assistant():
+    """Voice assistant that streams microphone chunks to the pipeline while the user talks."""
+    import sounddevice as sd
+
+    print("\n🎙️ Voice Assistant (streaming input)")
+    print("📝 Just talk; turns are detected automatically. Press Ctrl+C to exit")
+    print("-" * 50)
+
+    agent = Agent(
+        name="ZeroEntropyVoiceAgent",
+        instructions=SYSTEM_PROMPT,
+        tools=[make_search_tool(FAST_PROFILE)],
+        model="gpt-4.1-mini",
+    )
+    tts_settings = TTSModelSettings(instructions=TTS_PROMPT)
+    voice_config = VoicePipelineConfig(tts_settings=tts_settings)
+    pipeline = VoicePipeline(workflow=TimedVoiceWorkflow(agent), config=voice_config)
+
+    # Memory stays bounded by the ring: chunks are forwarded as soon as they fill
+    streaming_buffer = AudioRingBuffer(
+        initial_frames=SAMPLE_RATE * 5, max_frames=SAMPLE_RATE * 5, channels=CHANNELS
+    )
+    streamed_input = StreamedAudioInput()
+    recording_done = asyncio.Event()
+    forward_task = asyncio.create_task(stream_chunks(streaming_buffer, streamed_input, recording_done))
+
+    input_stream = sd.InputStream(
+        samplerate=SAMPLE_RATE,
+        channels=CHANNELS,
+        dtype="int16",
+        callback=streaming_buffer.callback
+    )
+    output_stream = sd.OutputStream(
+        samplerate=SAMPLE_RATE,
+        channels=CHANNELS,
+        dtype="int16"
+    )
+    output_stream.start()
+
+    try:
+        with input_stream:
+            result = await pipeline.run(streamed_input)
+            async for event in result.stream():
+                if event.type == "voice_stream_event_audio":
+                    await asyncio.to_thread(output_stream.write, event.data)
+                elif event.type == "voice_stream_event_lifecycle" and event.event == "turn_ended":
+                    print("-" * 30)
     except KeyboardInterrupt:
         print("\n👋 Goodbye!")
     finally:
+        recording_done.set()
+        await forward_task
         output_stream.stop()
         output_stream.close()
 
+
 async def main():
     """Main entry point."""
     if not ZEROENTROPY_API_KEY or not OPENAI_API_KEY:
@@ -263,7 +306,10 @@ async def main():
         return
     
     # Run assistant
-    await run_voice_assistant()
+    if VOICE_INPUT_MODE == "stream":
+        await run_streaming_voice_assistant()
+    else:
+        await run_voice_assistant()
 
 
 if __name__ == "__main__":
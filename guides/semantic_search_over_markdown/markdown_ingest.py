@@ -0,0 +1,376 @@
+"""
+Heading-aware markdown ingestion with incremental directory sync.
+
+`upload_md_file` in the notebook uploads each file whole as `text`, so
+`top_pages` can only point at a whole file, and re-running it fails with
+conflicts. Here:
+
+- `split_markdown` cuts a file at its headings (down to `max_level`, ignoring
+  `#` lines inside code fences) into sections. Each section becomes a page of
+  a `text-pages` document, prefixed with the headings it is nested under
+  (e.g. "Guide > Setup" above a "### Install" section), so `top_pages`
+  returns section-level hits that still make sense out of context. Short sections are
+  merged with the next one, long ones split at paragraph boundaries.
+- `sync_directory` compares each file's content hash with the `content_hash`
+  stored in its document's metadata, and only uploads new or changed files
+  (changed ones with `overwrite=True`). Documents whose file was deleted are
+  removed. Only documents this sync wrote (metadata `type` "markdown") are
+  ever overwritten or deleted, so other documents in the collection are left
+  alone. No local state is needed: the collection is the state.
+- A file whose path is already taken by a document this module did not write
+  (e.g. a whole-file `text` upload from the earlier notebook) is reported in
+  `conflicts` and left alone, unless `replace_foreign=True` overwrites it.
+  Documents the earlier notebook uploaded under "./sample_docs/<file>" paths
+  don't collide with the synced "<file>" paths and would show up twice in
+  results: delete them once (the notebook has a cell for it) or sync into a
+  fresh collection.
+- `watch_directory` polls the file tree and syncs when a file's size or
+  modification time changes. It keeps the hashes from the previous sync and
+  only lists the collection again when files are added or removed, so an edit
+  to one page of a large docs site is re-indexed in one request. Files whose
+  upload or deletion failed are retried on the next poll. It polls
+  rather than depending on a file-watching library.
+
+Usage:
+
+    report = await sync_directory(zclient, "md_docs_demo", "./sample_docs")
+    print(report)
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+
+from zeroentropy import AsyncZeroEntropy, ConflictError
+
+MAX_HEADING_LEVEL = 3
+MAX_PAGE_CHARS = 4000
+MIN_PAGE_CHARS = 200
+# Part of the content hash, so changing how files are split re-indexes them
+CHUNKER_VERSION = f"1:{MAX_HEADING_LEVEL}:{MAX_PAGE_CHARS}:{MIN_PAGE_CHARS}"
+# Metadata type of the documents written here; the only ones sync overwrites or deletes
+DOCUMENT_TYPE = "markdown"
+PAGE_LIMIT = 1024
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def split_markdown(
+    text: str,
+    max_level: int = MAX_HEADING_LEVEL,
+    max_chars: int = MAX_PAGE_CHARS,
+    min_chars: int = MIN_PAGE_CHARS,
+) -> list[str]:
+    """
+    Split markdown into one page per section.
+
+    Args:
+        text: Markdown source.
+        max_level: Deepest heading level that starts a new section (1 = "#").
+        max_chars: Sections longer than this are split at blank lines.
+        min_chars: Sections shorter than this are merged into the next one.
+
+    Returns:
+        Page texts, each starting with the path of headings it belongs to.
+    """
+    sections = []  # (heading path, body lines)
+    path, body = [], []
+    in_fence = False
+    for line in text.splitlines():
+        if FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING.match(line)
+        if match and len(match.group(1)) <= max_level:
+            if any(l.strip() for l in body):
+                sections.append((list(path), body))
+            level = len(match.group(1))
+            path = [p for p in path if p[0] < level] + [(level, match.group(2))]
+            body = [line]
+        else:
+            body.append(line)
+    if any(l.strip() for l in body):
+        sections.append((list(path), body))
+
+    pages = []
+    pending = ""
+    for section_path, lines in sections:
+        # The section starts with its own heading; prefix the headings it is nested under
+        breadcrumb = " > ".join(title for _, title in section_path[:-1])
+        section = "\n".join(lines).strip()
+        page = f"{breadcrumb}\n\n{section}" if breadcrumb else section
+        pending = f"{pending}\n\n{page}" if pending else page
+        if len(pending) >= min_chars:
+            pages.extend(split_long(pending, max_chars))
+            pending = ""
+    if pending:
+        if pages and len(pages[-1]) + len(pending) <= max_chars:
+            pages[-1] = f"{pages[-1]}\n\n{pending}"
+        else:
+            pages.append(pending)
+    return pages
+
+
+def split_long(text: str, max_chars: int) -> list[str]:
+    """Split text at blank lines into pieces of at most `max_chars` (single paragraphs may exceed it)."""
+    if len(text) <= max_chars:
+        return [text]
+    pieces, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+async def iter_documents(zclient: AsyncZeroEntropy, collection_name: str, path_prefix: str | None = None):
+    """Yield every document in the collection (under `path_prefix`), following `get_info_list` cursors."""
+    cursor = None
+    while True:
+        response = await zclient.documents.get_info_list(
+            collection_name=collection_name, limit=PAGE_LIMIT, path_prefix=path_prefix, path_gt=cursor,
+        )
+        if not response.documents:
+            return
+        for document in response.documents:
+            yield document
+        cursor = response.documents[-1].path
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(f"{CHUNKER_VERSION}\n{text}".encode("utf-8")).hexdigest()
+
+
+def markdown_files(docs_dir: str) -> list[str]:
+    """Paths of the .md files under `docs_dir`, relative to it, with "/" separators."""
+    paths = []
+    for root, _, files in os.walk(docs_dir):
+        for name in files:
+            if name.lower().endswith((".md", ".markdown")):
+                paths.append(os.path.relpath(os.path.join(root, name), docs_dir).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+@dataclass
+class SyncReport:
+    added: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    unchanged: int = 0
+    pages: int = 0
+    failed: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)  # paths held by documents this module didn't write
+    elapsed_s: float = 0.0
+    # Content hash of every markdown document indexed after the sync, for the next one
+    hashes: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.deleted)
+
+    def __str__(self) -> str:
+        return (f"{len(self.added)} added, {len(self.updated)} updated, {len(self.deleted)} deleted, "
+                f"{self.unchanged} unchanged ({self.pages} pages uploaded) in {self.elapsed_s:.2f}s"
+                + (f", {len(self.failed)} failed: {self.failed}" if self.failed else "")
+                + (f", {len(self.conflicts)} conflicting with documents not written by this sync: {self.conflicts}"
+                   if self.conflicts else ""))
+
+
+async def sync_directory(
+    zclient: AsyncZeroEntropy,
+    collection_name: str,
+    docs_dir: str,
+    path_prefix: str = "",
+    concurrency: int = 8,
+    delete_missing: bool = True,
+    only: set[str] | None = None,
+    known_hashes: dict[str, str] | None = None,
+    replace_foreign: bool = False,
+) -> SyncReport:
+    """
+    Make the collection match the markdown files under `docs_dir`, uploading only what changed.
+
+    Args:
+        zclient: An AsyncZeroEntropy client.
+        collection_name: The collection to sync into (created if missing).
+        docs_dir: Directory of markdown files.
+        path_prefix: Prefix of the document paths, e.g. "docs/"; documents
+            outside it are never touched.
+        concurrency: Uploads in flight.
+        delete_missing: Delete documents whose file no longer exists.
+        only: Relative file paths to check; None checks every file. Deletions
+            are still detected for the whole directory.
+        known_hashes: `hashes` of a previous SyncReport. When given, the
+            collection is not listed and this is taken as what is indexed.
+        replace_foreign: Overwrite documents at a synced path that were not
+            written by this module; by default they are reported in `conflicts`.
+
+    Returns:
+        A SyncReport.
+    """
+    start = time.perf_counter()
+    report = SyncReport()
+    try:
+        await zclient.collections.add(collection_name=collection_name)
+    except ConflictError:
+        pass
+
+    # Hashes of the markdown documents indexed now, from document metadata
+    if known_hashes is not None:
+        indexed = dict(known_hashes)
+    else:
+        indexed = {}
+        async for document in iter_documents(zclient, collection_name, path_prefix=path_prefix or None):
+            metadata = document.metadata or {}
+            if metadata.get("type") == DOCUMENT_TYPE:
+                indexed[document.path] = metadata.get("content_hash")
+    report.hashes = dict(indexed)
+
+    local_files = markdown_files(docs_dir)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def upload(relative_path: str):
+        document_path = path_prefix + relative_path
+        if only is not None and relative_path not in only and document_path in indexed:
+            report.unchanged += 1
+            return
+        with open(os.path.join(docs_dir, relative_path), encoding="utf-8") as f:
+            text = f.read()
+        digest = content_hash(text)
+        if indexed.get(document_path) == digest:
+            report.unchanged += 1
+            return
+        pages = split_markdown(text) or [text]
+        overwrite = document_path in indexed
+
+        async def add(overwrite: bool):
+            await zclient.documents.add(
+                collection_name=collection_name,
+                path=document_path,
+                content={"type": "text-pages", "pages": pages},
+                metadata={"content_hash": digest, "type": DOCUMENT_TYPE},
+                overwrite=overwrite,
+            )
+
+        async with sem:
+            try:
+                try:
+                    await add(overwrite)
+                except ConflictError:
+                    # The path is taken by a document this module didn't write
+                    if not replace_foreign:
+                        print(f"'{document_path}' already exists and was not written by this sync; "
+                              f"delete it or pass replace_foreign=True")
+                        report.conflicts.append(document_path)
+                        return
+                    overwrite = True
+                    await add(overwrite)
+            except Exception as e:
+                print(f"Failed to upload '{document_path}': {e}")
+                report.failed.append(document_path)
+                return
+        (report.updated if overwrite else report.added).append(document_path)
+        report.hashes[document_path] = digest
+        report.pages += len(pages)
+
+    await asyncio.gather(*[upload(path) for path in local_files])
+
+    if delete_missing:
+        existing = {path_prefix + path for path in local_files}
+        missing = sorted(path for path in indexed if path not in existing)
+        # delete takes a list of paths; send them in batches
+        for i in range(0, len(missing), 100):
+            batch = missing[i:i + 100]
+            try:
+                await zclient.documents.delete(collection_name=collection_name, path=batch)
+                report.deleted.extend(batch)
+                for path in batch:
+                    report.hashes.pop(path, None)
+            except Exception as e:
+                print(f"Failed to delete {len(batch)} documents: {e}")
+                report.failed.extend(batch)
+
+    report.elapsed_s = time.perf_counter() - start
+    return report
+
+
+def snapshot_tree(docs_dir: str) -> dict[str, tuple[int, int]]:
+    """(size, mtime_ns) of every markdown file, to detect edits without reading files."""
+    tree = {}
+    for path in markdown_files(docs_dir):
+        stat = os.stat(os.path.join(docs_dir, path))
+        tree[path] = (stat.st_size, stat.st_mtime_ns)
+    return tree
+
+
+async def watch_directory(
+    zclient: AsyncZeroEntropy,
+    collection_name: str,
+    docs_dir: str,
+    interval_s: float = 2.0,
+    **sync_kwargs,
+):
+    """
+    Sync once, then keep the collection in sync with `docs_dir` until cancelled.
+
+    The directory is polled every `interval_s`; only files whose size or
+    modification time changed are read and hashed. Edits reuse the hashes of
+    the previous sync; the collection is listed again only when files are
+    added or removed. Files that failed to sync are retried on the next poll.
+    """
+    path_prefix = sync_kwargs.get("path_prefix", "")
+
+    def synced_tree(current: dict, report: SyncReport) -> dict:
+        """The tree to compare the next poll against, with failed paths left out so they are retried."""
+        tree = dict(current)
+        for document_path in report.failed:
+            relative_path = document_path[len(path_prefix):]
+            if relative_path in tree:
+                del tree[relative_path]  # failed upload: looks new on the next poll
+            else:
+                tree[relative_path] = None  # failed deletion: looks removed on the next poll
+        return tree
+
+    current = snapshot_tree(docs_dir)
+    report = await sync_directory(zclient, collection_name, docs_dir, **sync_kwargs)
+    print(f"Initial sync: {report}")
+    tree = synced_tree(current, report)
+    while True:
+        await asyncio.sleep(interval_s)
+        current = snapshot_tree(docs_dir)
+        if current == tree:
+            continue
+        touched = {path for path, stat in current.items() if tree.get(path) != stat}
+        files_changed = current.keys() != tree.keys()
+        report = await sync_directory(zclient, collection_name, docs_dir, only=touched, delete_missing=files_changed,
+                                      known_hashes=None if files_changed else report.hashes, **sync_kwargs)
+        if report.changed or report.failed:
+            print(f"Synced: {report}")
+        tree = synced_tree(current, report)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path="../../.env")
+    collection_name = sys.argv[1] if len(sys.argv) > 1 else "md_docs_demo"
+    docs_dir = sys.argv[2] if len(sys.argv) > 2 else "./sample_docs"
+
+    for path in markdown_files(docs_dir):
+        with open(os.path.join(docs_dir, path), encoding="utf-8") as f:
+            pages = split_markdown(f.read())
+        print(f"{path}: {len(pages)} pages: {[page.splitlines()[0] for page in pages]}")
+
+    print(f"Watching '{docs_dir}' (Ctrl+C to stop)")
+    try:
+        asyncio.run(watch_directory(AsyncZeroEntropy(), collection_name, docs_dir))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,245 @@
+"""
+One command-line entry point for the guide scripts, fast to start.
+
+The guide scripts used to import their heavy dependencies (`datasets`,
+`fastmcp`, `uvicorn`, `sounddevice`, ...) and build their clients at import
+time, so even `--help` or a one-shot query paid seconds of startup. Here only
+`argparse` is imported up front: each subcommand imports what it needs when it
+runs, and clients are built on first use.
+
+    python ze_cli.py index ./data --collection default
+    python ze_cli.py query "revenue growth" --collection default --filter '{"type": {"$eq": "csv"}}' --k 10
+    python ze_cli.py rerank "what is the first step in making apple jam" "boil apples" "freeze apples"
+    python ze_cli.py serve-mcp --port 8000
+    python ze_cli.py bench --save import_times.json
+    python ze_cli.py bench --baseline import_times.json   # exits 1 on an import error or cold-start regression
+
+`bench` runs `python -X importtime` on the CLI and on each guide module in a
+fresh interpreter, keeps the best of `--runs` runs, and lists the heaviest
+imports. It exits 1 when a module fails to import, and, given a saved
+baseline, when a module's import time grows by more than `--tolerance`.
+"""
+
+import argparse
+import functools
+import os
+import sys
+
+GUIDES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (name, folder, module) pairs timed by `bench`; "ze_cli" is this entry point itself
+BENCH_TARGETS = [
+    ("ze_cli", ".", "ze_cli"),
+    ("index", "index_and_query_quickstart", "index"),
+    ("query", "index_and_query_quickstart", "query"),
+    ("query_planner", "index_and_query_quickstart", "query_planner"),
+    ("server", "openai_deepresearch", "server"),
+    ("stackoverflow_example", "reranker_quickstart", "stackoverflow_example"),
+    ("retrieval_search_example", "retrieval_quickstart", "retrieval_search_example"),
+    ("ze_tools", "search_tool_for_voice_agents", "ze_tools"),
+]
+BENCH_RUNS = 5
+# A target regresses when it is this much slower than its baseline, and by at least MIN_REGRESSION_MS
+TOLERANCE = 0.25
+MIN_REGRESSION_MS = 20.0
+
+
+def use_guide(folder: str):
+    """Make a guide folder's modules importable (they import their siblings by name)."""
+    path = os.path.join(GUIDES_DIR, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@functools.cache
+def get_zclient(asynchronous: bool = False):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if asynchronous:
+        from zeroentropy import AsyncZeroEntropy
+
+        return AsyncZeroEntropy()
+    from zeroentropy import ZeroEntropy
+
+    return ZeroEntropy()
+
+
+def cmd_index(args):
+    import asyncio
+
+    use_guide("index_and_query_quickstart")
+    import index
+
+    asyncio.run(index.main(args.data_dir, args.collection))
+
+
+def cmd_query(args):
+    import asyncio
+    import json
+
+    use_guide("index_and_query_quickstart")
+    from query_planner import QueryPlanner, partitions_for
+
+    filters = [json.loads(f) for f in args.filter] or None
+    partitions = partitions_for(args.collection or ["default"], filters)
+    planner = QueryPlanner(get_zclient(asynchronous=True), cache_size=0)
+    plan = asyncio.run(planner.search(args.query, partitions, k=args.k, kind=args.kind))
+    if args.verbose:
+        print(plan.report())
+    for score, part, result in plan.results:
+        location = f"{result.path} p.{result.page_index}" if args.kind == "pages" else result.path
+        print(f"{score:.4f}  {location}  [{part}]")
+        content = getattr(result, "content", None)
+        if content:
+            print(f"        {' '.join(content.split())[:200]}")
+
+
+def cmd_rerank(args):
+    documents = list(args.documents)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            documents += [line.rstrip("\n") for line in f if line.strip()]
+    if not documents:
+        sys.exit("No documents to rerank: pass them as arguments or with --file")
+    response = get_zclient().models.rerank(model=args.model, query=args.query, documents=documents, top_n=args.top_n)
+    for result in response.results:
+        print(f"{result.relevance_score:.4f}  [{result.index}] {documents[result.index][:200]}")
+
+
+def cmd_serve_mcp(args):
+    use_guide("openai_deepresearch")
+    import server
+
+    server.main(host=args.host, port=args.port)
+
+
+def import_time(folder: str, module: str, runs: int = BENCH_RUNS) -> tuple[float, list]:
+    """
+    Cold-start import time of a module, in a fresh interpreter per run.
+
+    Returns:
+        The best cumulative time in ms, and the (cumulative ms, package) pairs of
+        the module's direct imports in that run, heaviest first. Raises
+        RuntimeError if the import fails.
+    """
+    import subprocess
+
+    best, heaviest = None, []
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=os.path.join(GUIDES_DIR, folder),
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.strip().splitlines()[-1])
+        # Lines look like "import time: self [us] | cumulative | imported package", with
+        # the package indented two spaces per nesting level, children listed before their parent
+        total, imports = 0.0, []
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, package = line[len("import time:"):].split("|")
+            level = (len(package) - len(package.lstrip()) - 1) // 2
+            if level == 0:
+                if package.strip() == module:
+                    total = int(cumulative) / 1000
+                    break
+                imports = []  # interpreter startup, not the target's imports
+            elif level == 1:
+                imports.append((int(cumulative) / 1000, package.strip()))
+        if best is None or total < best:
+            best, heaviest = total, sorted(imports, reverse=True)
+    return best, heaviest
+
+
+def cmd_bench(args):
+    import json
+
+    targets = [t for t in BENCH_TARGETS if not args.only or t[0] in args.only]
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results, regressions, failures = {}, [], []
+    print(f"{'target':<26} {'import ms':>10} {'baseline':>10}  heaviest imports")
+    for name, folder, module in targets:
+        try:
+            total, heaviest = import_time(folder, module, args.runs)
+        except RuntimeError as e:
+            print(f"{name:<26} {'error':>10} {'':>10}  {e}")
+            failures.append(name)
+            continue
+        results[name] = round(total, 1)
+        previous = baseline.get(name)
+        flag = ""
+        if previous is not None and total > previous * (1 + args.tolerance) and total - previous >= MIN_REGRESSION_MS:
+            regressions.append(name)
+            flag = " ⚠️"
+        top = ", ".join(f"{package} {ms:.0f}" for ms, package in heaviest[: args.top])
+        print(f"{name:<26} {total:>10.1f} {previous if previous is not None else '-':>10}  {top}{flag}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved import times to {args.save}")
+    if failures:
+        print(f"❌ Failed to import: {', '.join(failures)}")
+    if regressions:
+        print(f"❌ Import time regressed by more than {args.tolerance:.0%} for: {', '.join(regressions)}")
+    if failures or regressions:
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ze_cli.py", description="ZeroEntropy cookbook command line.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    index = subcommands.add_parser("index", help="index a folder of .csv, .txt and .pdf files")
+    index.add_argument("data_dir", nargs="?", default="./data")
+    index.add_argument("--collection", default="default")
+    index.set_defaults(run=cmd_index)
+
+    query = subcommands.add_parser("query", help="query one or more collections and filters, merged into a top-k")
+    query.add_argument("query")
+    query.add_argument("--collection", action="append", help="repeat to query several collections (default: default)")
+    query.add_argument("--filter", action="append", default=[], help="JSON metadata filter; repeat to fan out")
+    query.add_argument("--k", type=int, default=10)
+    query.add_argument("--kind", choices=["documents", "snippets", "pages"], default="documents")
+    query.add_argument("-v", "--verbose", action="store_true", help="print the per-partition report")
+    query.set_defaults(run=cmd_query)
+
+    rerank = subcommands.add_parser("rerank", help="rerank documents against a query")
+    rerank.add_argument("query")
+    rerank.add_argument("documents", nargs="*")
+    rerank.add_argument("--file", help="text file with one document per line")
+    rerank.add_argument("--model", default="zerank-1")
+    rerank.add_argument("--top-n", type=int)
+    rerank.set_defaults(run=cmd_rerank)
+
+    serve = subcommands.add_parser("serve-mcp", help="run the deep research MCP server")
+    serve.add_argument("--host", default="localhost")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.set_defaults(run=cmd_serve_mcp)
+
+    bench = subcommands.add_parser("bench", help="measure cold-start import times")
+    bench.add_argument("--only", nargs="+", help=f"targets to time, among {[name for name, *_ in BENCH_TARGETS]}")
+    bench.add_argument("--runs", type=int, default=BENCH_RUNS, help="runs per target; the fastest is kept")
+    bench.add_argument("--top", type=int, default=3, help="heaviest imports listed per target")
+    bench.add_argument("--save", help="write the import times to this JSON file")
+    bench.add_argument("--baseline", help="JSON file from --save to compare against")
+    bench.add_argument("--tolerance", type=float, default=TOLERANCE)
+    bench.set_defaults(run=cmd_bench)
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Bulk embedding with zembed-1.
+
+The notebook calls `zclient.models.embed` once per example and builds arrays
+with `np.array([item.embedding for item in response.results])`, which goes
+through a Python list of floats per vector. For a whole corpus this module:
+
+- splits the texts into batches that respect per-request size limits,
+- sends the batches concurrently with `latency="slow"` (much higher rate limits),
+- asks for `encoding_format="base64"` and decodes each vector straight into a
+  preallocated float32 / float16 / int8 NumPy matrix.
+
+Usage:
+
+    from zeroentropy import AsyncZeroEntropy
+    from embed_pipeline import embed_corpus
+
+    zclient = AsyncZeroEntropy()
+    vecs = await embed_corpus(zclient, texts, dimensions=640, dtype="float16")
+"""
+
+import asyncio
+import base64
+from dataclasses import dataclass
+
+import numpy as np
+from zeroentropy import AsyncZeroEntropy, RateLimitError
+
+EMBEDDING_MODEL = "zembed-1"
+SUPPORTED_DIMENSIONS = (40, 80, 160, 320, 640, 1280, 2560)
+
+# Dimension projection to use for each kind of job. Smaller vectors are cheaper
+# to store and scan; the full 2560 is only worth it for final scoring.
+DIMENSIONS_FOR_USE = {
+    "rerank": 2560,
+    "retrieval": 1280,
+    "similarity": 640,
+    "clustering": 320,
+    "shortlist": 160,
+}
+
+# Per-request limits. The API bills and rate-limits by bytes, so batches are
+# capped both by count and by total UTF-8 size.
+MAX_BATCH_SIZE = 256
+MAX_BATCH_BYTES = 256_000
+
+
+@dataclass
+class QuantizedEmbeddings:
+    """int8 embeddings with one float32 scale per row (symmetric quantization)."""
+    values: np.ndarray
+    scales: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_float32(self) -> np.ndarray:
+        return self.values.astype(np.float32) * self.scales[:, None]
+
+
+def dimensions_for(use: str) -> int:
+    """Return the dimension projection to use for a job type (see DIMENSIONS_FOR_USE)."""
+    if use not in DIMENSIONS_FOR_USE:
+        raise ValueError(f"Unknown use '{use}', expected one of {sorted(DIMENSIONS_FOR_USE)}")
+    return DIMENSIONS_FOR_USE[use]
+
+
+def make_batches(texts: list[str], max_batch_size: int = MAX_BATCH_SIZE, max_batch_bytes: int = MAX_BATCH_BYTES) -> list[tuple[int, int]]:
+    """
+    Split texts into contiguous batches under the request limits.
+
+    A single text larger than `max_batch_bytes` still gets its own batch.
+
+    Returns:
+        A list of (start, end) index ranges into `texts`.
+    """
+    batches = []
+    start, size = 0, 0
+    for i, text in enumerate(texts):
+        n_bytes = len(text.encode("utf-8"))
+        if i > start and (i - start >= max_batch_size or size + n_bytes > max_batch_bytes):
+            batches.append((start, i))
+            start, size = i, 0
+        size += n_bytes
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def decode_embedding(embedding) -> np.ndarray:
+    """Decode a base64 fp32 little-endian embedding without going through Python floats."""
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    # The API returned a float list (encoding_format="float")
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def quantize_int8(vecs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization. Returns (values, scales)."""
+    scales = np.abs(vecs).max(axis=1).astype(np.float32) / 127.0
+    scales[scales == 0] = 1.0
+    values = np.round(vecs / scales[:, None]).astype(np.int8)
+    return values, scales
+
+
+async def embed_corpus(
+    zclient: AsyncZeroEntropy,
+    texts: list[str],
+    input_type: str = "document",
+    dimensions: int = 2560,
+    dtype: str = "float32",
+    latency: str | None = "slow",
+    concurrency: int = 8,
+    max_batch_size: int = MAX_BATCH_SIZE,
+    max_batch_bytes: int = MAX_BATCH_BYTES,
+    model: str = EMBEDDING_MODEL,
+    out: np.ndarray | None = None,
+):
+    """
+    Embed a list of texts into a preallocated matrix.
+
+    Args:
+        zclient: An AsyncZeroEntropy client.
+        texts: The texts to embed. Row i of the result is the embedding of texts[i].
+        input_type: "query" or "document".
+        dimensions: Dimension projection, one of SUPPORTED_DIMENSIONS.
+        dtype: "float32", "float16", or "int8" (returns QuantizedEmbeddings).
+        latency: "slow" for bulk jobs, "fast" for interactive ones, None to let the API pick.
+        concurrency: Maximum number of requests in flight.
+        max_batch_size: Maximum number of texts per request.
+        max_batch_bytes: Maximum total UTF-8 bytes per request.
+        model: The embedding model.
+        out: Optional preallocated (len(texts), dimensions) float matrix to fill,
+            e.g. a memory-mapped array.
+
+    Returns:
+        A (len(texts), dimensions) NumPy array, or QuantizedEmbeddings for "int8".
+    """
+    if dimensions not in SUPPORTED_DIMENSIONS:
+        raise ValueError(f"dimensions must be one of {SUPPORTED_DIMENSIONS}, got {dimensions}")
+    if dtype not in ("float32", "float16", "int8"):
+        raise ValueError(f"Unsupported dtype '{dtype}'")
+
+    n = len(texts)
+    scales = None
+    if dtype == "int8":
+        matrix = np.empty((n, dimensions), dtype=np.int8)
+        scales = np.empty(n, dtype=np.float32)
+    elif out is not None:
+        if out.shape != (n, dimensions):
+            raise ValueError(f"out has shape {out.shape}, expected {(n, dimensions)}")
+        matrix = out
+    else:
+        matrix = np.empty((n, dimensions), dtype=dtype)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def embed_batch(start: int, end: int) -> None:
+        async with sem:
+            for retry in range(5):
+                try:
+                    response = await zclient.models.embed(
+                        model=model,
+                        input=texts[start:end],
+                        input_type=input_type,
+                        dimensions=dimensions,
+                        encoding_format="base64",
+                        **({"latency": latency} if latency is not None else {}),
+                    )
+                    break
+                except RateLimitError:
+                    if retry == 4:
+                        raise
+                    await asyncio.sleep(2 ** retry)
+        batch = np.empty((end - start, dimensions), dtype=np.float32)
+        for i, item in enumerate(response.results):
+            batch[i] = decode_embedding(item.embedding)
+        if scales is not None:
+            matrix[start:end], scales[start:end] = quantize_int8(batch)
+        else:
+            matrix[start:end] = batch
+
+    await asyncio.gather(*[
+        embed_batch(start, end)
+        for start, end in make_batches(texts, max_batch_size, max_batch_bytes)
+    ])
+
+    if scales is not None:
+        return QuantizedEmbeddings(matrix, scales)
+    return matrix
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    sentences = [f"Sentence number {i} about retrieval, embeddings and search." for i in range(2000)]
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        for dtype in ("float32", "float16", "int8"):
+            start = time.perf_counter()
+            vecs = await embed_corpus(zclient, sentences, dimensions=dimensions_for("similarity"), dtype=dtype)
+            elapsed = time.perf_counter() - start
+            n_bytes = vecs.values.nbytes + vecs.scales.nbytes if dtype == "int8" else vecs.nbytes
+            print(f"{dtype:>8}: {len(vecs)} vectors in {elapsed:.1f}s, {n_bytes / 1e6:.1f} MB")
+
+    asyncio.run(main())
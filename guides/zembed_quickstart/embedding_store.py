@@ -0,0 +1,268 @@
+"""
+On-disk embedding store for zembed vectors.
+
+Embeddings are paid for once and kept on disk, so restarting a notebook does
+not re-embed the corpus. Each (model, input_type, dimensions, dtype)
+combination gets its own directory, so a text embedded as a document is never
+returned for the same text embedded as a query:
+
+    store_root/zembed-1-document-640-float16/
+        meta.json       model, input_type, dimensions, dtype
+        vectors.bin     raw row-major vectors, appended in place
+        hashes.bin      16-byte content hash per row, used to skip known texts
+        rows.jsonl      one {"path": ..., "metadata": ...} line per row
+
+`vectors` is a read-only `np.memmap`, so opening a store with millions of rows
+costs only the hash index load, not a copy of the vectors.
+
+Usage:
+
+    store = EmbeddingStore.open("embeddings", dimensions=640, dtype="float16")
+    rows = await store.embed_missing(zclient, texts, paths=paths)
+    vecs = store.vectors[rows]
+
+    queries = EmbeddingStore.open("embeddings", dimensions=640, dtype="float16", input_type="query")
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+from zeroentropy import AsyncZeroEntropy
+
+from embed_pipeline import EMBEDDING_MODEL, SUPPORTED_DIMENSIONS, embed_corpus
+
+HASH_BYTES = 16
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=HASH_BYTES).digest()
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped store of embeddings for one model, input type and dimension."""
+
+    def __init__(self, directory: str):
+        """Open an existing store directory. Use `EmbeddingStore.open` to create one."""
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.model = meta["model"]
+        self.input_type = meta["input_type"]
+        self.dimensions = meta["dimensions"]
+        self.dtype = np.dtype(meta["dtype"])
+        self._row_bytes = self.dimensions * self.dtype.itemsize
+        self._vectors_path = os.path.join(directory, "vectors.bin")
+        self._hashes_path = os.path.join(directory, "hashes.bin")
+        self._rows_path = os.path.join(directory, "rows.jsonl")
+        self._repair()
+        self._load_hash_index()
+        self._path_index = None
+        self._vectors = None
+
+    @classmethod
+    def open(
+        cls,
+        root: str,
+        model: str = EMBEDDING_MODEL,
+        dimensions: int = 2560,
+        dtype: str = "float32",
+        input_type: str = "document",
+    ) -> "EmbeddingStore":
+        """
+        Open the store for (model, input_type, dimensions, dtype) under `root`, creating it if needed.
+
+        Args:
+            root: Directory holding all stores.
+            model: The embedding model.
+            dimensions: Dimension projection, one of SUPPORTED_DIMENSIONS.
+            dtype: On-disk dtype, "float32" or "float16".
+            input_type: "document" or "query"; zembed embeds the same text differently for each.
+        """
+        if dimensions not in SUPPORTED_DIMENSIONS:
+            raise ValueError(f"dimensions must be one of {SUPPORTED_DIMENSIONS}, got {dimensions}")
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported dtype '{dtype}'")
+        if input_type not in ("document", "query"):
+            raise ValueError(f"input_type must be 'document' or 'query', got '{input_type}'")
+        directory = os.path.join(root, f"{model}-{input_type}-{dimensions}-{dtype}")
+        if not os.path.exists(os.path.join(directory, "meta.json")):
+            os.makedirs(directory, exist_ok=True)
+            for name in ("vectors.bin", "hashes.bin", "rows.jsonl"):
+                open(os.path.join(directory, name), "ab").close()
+            with open(os.path.join(directory, "meta.json"), "w") as f:
+                json.dump({"model": model, "input_type": input_type, "dimensions": dimensions, "dtype": dtype}, f)
+        return cls(directory)
+
+    def _repair(self) -> None:
+        """Truncate all files to the number of rows that were completely written."""
+        complete_lines = 0
+        with open(self._rows_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                complete_lines += block.count(b"\n")
+        count = min(
+            os.path.getsize(self._vectors_path) // self._row_bytes,
+            os.path.getsize(self._hashes_path) // HASH_BYTES,
+            complete_lines,
+        )
+        os.truncate(self._vectors_path, count * self._row_bytes)
+        os.truncate(self._hashes_path, count * HASH_BYTES)
+        with open(self._rows_path, "rb+") as f:
+            for _ in range(count):
+                f.readline()
+            f.truncate()
+        self.count = count
+
+    def _load_hash_index(self) -> None:
+        with open(self._hashes_path, "rb") as f:
+            data = f.read()
+        # Slice raw bytes: a NumPy "S16" view would strip trailing zero bytes
+        self._hash_index = {
+            data[row * HASH_BYTES:(row + 1) * HASH_BYTES]: row for row in range(self.count)
+        }
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, text: str) -> bool:
+        return content_hash(text) in self._hash_index
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All stored vectors as a read-only (count, dimensions) memmap."""
+        if self._vectors is None or len(self._vectors) != self.count:
+            if self.count == 0:
+                self._vectors = np.empty((0, self.dimensions), dtype=self.dtype)
+            else:
+                self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(self.count, self.dimensions))
+        return self._vectors
+
+    def rows_for(self, texts: list[str]) -> np.ndarray:
+        """Row index of each text in the store, or -1 when it has not been embedded."""
+        return np.array([self._hash_index.get(content_hash(text), -1) for text in texts], dtype=np.int64)
+
+    def missing(self, texts: list[str]) -> list[int]:
+        """Positions in `texts` that still need embedding (duplicates are listed once)."""
+        seen = set()
+        missing = []
+        for i, text in enumerate(texts):
+            h = content_hash(text)
+            if h not in self._hash_index and h not in seen:
+                seen.add(h)
+                missing.append(i)
+        return missing
+
+    def row_for_path(self, path: str) -> int | None:
+        """Most recent row stored under `path`, loading the sidecar on first use."""
+        if self._path_index is None:
+            self._path_index = {}
+            for row, record in enumerate(self.iter_records()):
+                if record.get("path") is not None:
+                    self._path_index[record["path"]] = row
+        return self._path_index.get(path)
+
+    def iter_records(self):
+        """Yield the {"path", "metadata"} sidecar record of every row, in row order."""
+        with open(self._rows_path) as f:
+            for line in f:
+                yield json.loads(line)
+
+    def append(self, texts: list[str], vectors: np.ndarray, paths: list[str] | None = None, metadata: list[dict] | None = None) -> np.ndarray:
+        """
+        Append embeddings for `texts`.
+
+        Returns:
+            The row index of each appended vector.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if vectors.shape != (len(texts), self.dimensions):
+            raise ValueError(f"vectors has shape {vectors.shape}, expected {(len(texts), self.dimensions)}")
+        hashes = b"".join(content_hash(text) for text in texts)
+        records = b"".join(
+            json.dumps({
+                "path": paths[i] if paths else None,
+                "metadata": metadata[i] if metadata else None,
+            }).encode("utf-8") + b"\n"
+            for i in range(len(texts))
+        )
+        # Vectors first, sidecar last: _repair() drops any half-written tail
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self._hashes_path, "ab") as f:
+            f.write(hashes)
+        with open(self._rows_path, "ab") as f:
+            f.write(records)
+
+        rows = np.arange(self.count, self.count + len(texts))
+        for i, text in enumerate(texts):
+            self._hash_index[content_hash(text)] = int(rows[i])
+            if self._path_index is not None and paths:
+                self._path_index[paths[i]] = int(rows[i])
+        self.count += len(texts)
+        return rows
+
+    async def embed_missing(
+        self,
+        zclient: AsyncZeroEntropy,
+        texts: list[str],
+        paths: list[str] | None = None,
+        metadata: list[dict] | None = None,
+        **embed_kwargs,
+    ) -> np.ndarray:
+        """
+        Embed only the texts that are not in the store yet, then append them.
+
+        Texts are embedded with the store's `input_type`: open a separate store
+        with input_type="query" for queries.
+
+        Args:
+            zclient: An AsyncZeroEntropy client.
+            texts: The texts to look up or embed.
+            paths: Optional path for each text, saved in the sidecar.
+            metadata: Optional metadata dict for each text, saved in the sidecar.
+            **embed_kwargs: Passed to `embed_corpus` (concurrency, latency, ...).
+
+        Returns:
+            The row index of every text in `texts`.
+        """
+        todo = self.missing(texts)
+        if todo:
+            print(f"Embedding {len(todo)} new texts ({len(texts) - len(todo)} already stored)")
+            new_vectors = await embed_corpus(
+                zclient,
+                [texts[i] for i in todo],
+                input_type=self.input_type,
+                dimensions=self.dimensions,
+                dtype="float32",
+                model=self.model,
+                **embed_kwargs,
+            )
+            self.append(
+                [texts[i] for i in todo],
+                new_vectors,
+                paths=[paths[i] for i in todo] if paths else None,
+                metadata=[metadata[i] for i in todo] if metadata else None,
+            )
+        return self.rows_for(texts)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import time
+
+    sentences = [f"Sentence number {i} about retrieval, embeddings and search." for i in range(1000)]
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        store = EmbeddingStore.open("embeddings", dimensions=640, dtype="float16")
+        await store.embed_missing(zclient, sentences, paths=[f"doc_{i}" for i in range(len(sentences))])
+
+        # A second open only reads the hash index; vectors stay on disk until touched
+        start = time.perf_counter()
+        reopened = EmbeddingStore.open("embeddings", dimensions=640, dtype="float16")
+        rows = await reopened.embed_missing(zclient, sentences)
+        print(f"Reopened {len(reopened)} vectors in {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"first row norm {np.linalg.norm(reopened.vectors[rows[0]]):.3f}")
+
+    asyncio.run(main())
@@ -0,0 +1,354 @@
+"""
+Hybrid lexical + dense retrieval over a local corpus.
+
+Dense zembed vectors find paraphrases but can miss exact strings such as
+error codes, identifiers or API names (`E1234`, `top_snippets`, `v2.1.0`).
+`HybridRetriever` keeps two indexes over the same documents:
+
+- `BM25Index`: an inverted index whose postings live in flat NumPy arrays
+  (term offsets, doc ids, term frequencies) instead of per-term Python lists.
+  Adds go to a small buffer that is flushed into a new array segment before
+  the next search; segments are merged once there are too many of them.
+- A dense matrix of zembed vectors, searched with `exact_search`.
+
+Results are fused by Reciprocal Rank Fusion (RRF) or by a weighted sum of
+min-max normalized scores.
+
+Run `python hybrid_search.py [sample_docs|scifact|path]` to compare BM25,
+dense and hybrid retrieval on quality (nDCG@10, recall@10) and latency.
+"""
+
+import math
+import re
+from array import array
+
+import numpy as np
+from zeroentropy import AsyncZeroEntropy
+
+from embed_pipeline import DIMENSIONS_FOR_USE, embed_corpus
+from vector_index import _top_k, exact_search
+
+RRF_K = 60
+MAX_SEGMENTS = 8
+
+# Words, plus identifiers that keep their inner dots, dashes and slashes
+# ("api.v2", "ERR-404", "text/plain"); their parts are indexed as well.
+TOKEN_PATTERN = re.compile(r"\w+(?:[./:-]\w+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for match in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(match)
+        if not match.isalnum():
+            tokens.extend(part for part in re.split(r"[./:_-]", match) if part)
+    return tokens
+
+
+class BM25Index:
+    """BM25 inverted index with array-backed postings and incremental adds."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.df = array("q")
+        self.n_docs = 0
+        self.lengths = np.empty(0, dtype=np.float32)
+        # Each segment is (offsets, doc_ids, tfs); term t's postings are
+        # doc_ids[offsets[t]:offsets[t + 1]], in increasing doc id order.
+        self.segments = []
+        self._buffer_terms = array("i")
+        self._buffer_docs = array("i")
+        self._buffer_tfs = array("H")
+        self._buffer_lengths = array("f")
+
+    def add(self, texts: list[str]) -> np.ndarray:
+        """Index `texts`. Returns their document ids."""
+        start = self.n_docs + len(self._buffer_lengths)
+        for i, text in enumerate(texts):
+            counts = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_id = self.vocab.get(token)
+                if term_id is None:
+                    term_id = self.vocab[token] = len(self.vocab)
+                    self.df.append(0)
+                self.df[term_id] += 1
+                self._buffer_terms.append(term_id)
+                self._buffer_docs.append(start + i)
+                self._buffer_tfs.append(min(tf, 65535))
+            self._buffer_lengths.append(len(tokens))
+        return np.arange(start, start + len(texts))
+
+    @staticmethod
+    def _build_segment(terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray, vocab_size: int):
+        # Postings arrive in doc order, so a stable sort by term keeps each list sorted
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=vocab_size), out=offsets[1:])
+        return offsets, docs[order], tfs[order]
+
+    def flush(self) -> None:
+        """Turn buffered adds into a segment, merging segments when there are too many."""
+        if not self._buffer_lengths:
+            return
+        vocab_size = len(self.vocab)
+        self.segments.append(self._build_segment(
+            np.frombuffer(self._buffer_terms, dtype=np.int32),
+            np.frombuffer(self._buffer_docs, dtype=np.int32).copy(),
+            np.frombuffer(self._buffer_tfs, dtype=np.uint16).copy(),
+            vocab_size,
+        ))
+        self.lengths = np.concatenate([self.lengths, np.frombuffer(self._buffer_lengths, dtype=np.float32)])
+        self.n_docs = len(self.lengths)
+        self._buffer_terms, self._buffer_docs = array("i"), array("i")
+        self._buffer_tfs, self._buffer_lengths = array("H"), array("f")
+
+        if len(self.segments) > MAX_SEGMENTS:
+            terms = np.concatenate([
+                np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+                for offsets, _, _ in self.segments
+            ])
+            docs = np.concatenate([seg[1] for seg in self.segments])
+            tfs = np.concatenate([seg[2] for seg in self.segments])
+            self.segments = [self._build_segment(terms, docs, tfs, vocab_size)]
+
+    def __len__(self) -> int:
+        return self.n_docs + len(self._buffer_lengths)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for `query`."""
+        self.flush()
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if self.n_docs == 0:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / self.lengths.mean())
+        for token in set(tokenize(query)):
+            term_id = self.vocab.get(token)
+            if term_id is None:
+                continue
+            df = self.df[term_id]
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            for offsets, doc_ids, tfs in self.segments:
+                if term_id + 1 >= len(offsets):
+                    continue  # term is newer than this segment
+                docs = doc_ids[offsets[term_id]:offsets[term_id + 1]]
+                tf = tfs[offsets[term_id]:offsets[term_id + 1]].astype(np.float32)
+                scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        return scores
+
+    def search(self, query: str, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, doc ids), best first; documents without any query term are left out."""
+        scores = self.scores(query)
+        top_scores, top = _top_k(scores[None, :], k)
+        keep = top_scores[0] > 0
+        return top_scores[0][keep], top[0][keep]
+
+
+def rrf_fuse(rankings: list[np.ndarray], k: int = 10, rrf_k: int = RRF_K, weights: list[float] | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reciprocal Rank Fusion: each list adds weight / (rrf_k + rank) to a document.
+
+    Args:
+        rankings: Doc id arrays, each sorted best first.
+        k: Number of fused results.
+        rrf_k: Damping constant; 60 is the usual choice.
+        weights: Optional weight per ranking.
+
+    Returns:
+        (scores, doc ids), best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    ids = np.concatenate([np.asarray(r, dtype=np.int64) for r in rankings])
+    contributions = np.concatenate([
+        w / (rrf_k + np.arange(1, len(r) + 1)) for w, r in zip(weights, rankings)
+    ])
+    return _fuse(ids, contributions, k)
+
+
+def weighted_fuse(results: list[tuple[np.ndarray, np.ndarray]], weights: list[float], k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted sum of min-max normalized scores; a document missing from a list gets 0 there.
+
+    Args:
+        results: (scores, doc ids) per retriever.
+        weights: Weight per retriever, e.g. [alpha, 1 - alpha].
+        k: Number of fused results.
+    """
+    ids, contributions = [], []
+    for (scores, doc_ids), w in zip(results, weights):
+        if len(scores) == 0:
+            continue
+        spread = scores.max() - scores.min()
+        normalized = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+        ids.append(np.asarray(doc_ids, dtype=np.int64))
+        contributions.append(w * normalized)
+    if not ids:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    return _fuse(np.concatenate(ids), np.concatenate(contributions), k)
+
+
+def _fuse(ids: np.ndarray, contributions: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    unique, inverse = np.unique(ids, return_inverse=True)
+    fused = np.bincount(inverse, weights=contributions).astype(np.float32)
+    top_scores, top = _top_k(fused[None, :], k)
+    return top_scores[0], unique[top[0]]
+
+
+class HybridRetriever:
+    """BM25 and zembed dense retrieval over the same documents, with score fusion."""
+
+    def __init__(self, dimensions: int = DIMENSIONS_FOR_USE["retrieval"], k1: float = 1.2, b: float = 0.75):
+        self.dimensions = dimensions
+        self.bm25 = BM25Index(k1, b)
+        self._vectors = np.empty((1024, dimensions), dtype=np.float32)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.count]
+
+    def add(self, texts: list[str], vectors: np.ndarray) -> np.ndarray:
+        """
+        Add documents with their precomputed zembed vectors.
+
+        Returns:
+            The document ids, shared by both indexes.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(texts), self.dimensions):
+            raise ValueError(f"vectors has shape {vectors.shape}, expected {(len(texts), self.dimensions)}")
+        if self.count + len(texts) > len(self._vectors):
+            grown = np.empty((max(2 * len(self._vectors), self.count + len(texts)), self.dimensions), dtype=np.float32)
+            grown[:self.count] = self._vectors[:self.count]
+            self._vectors = grown
+        self._vectors[self.count:self.count + len(texts)] = vectors
+        self.count += len(texts)
+        return self.bm25.add(texts)
+
+    async def embed_and_add(self, zclient: AsyncZeroEntropy, texts: list[str], **embed_kwargs) -> np.ndarray:
+        """Embed `texts` as documents and add them."""
+        vectors = await embed_corpus(zclient, texts, input_type="document", dimensions=self.dimensions, **embed_kwargs)
+        return self.add(texts, vectors)
+
+    def search(
+        self,
+        query: str,
+        query_vector: np.ndarray,
+        k: int = 10,
+        mode: str = "rrf",
+        alpha: float = 0.5,
+        candidates: int = 100,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            query: The query text, for BM25.
+            query_vector: The zembed query embedding (input_type="query").
+            k: Number of results.
+            mode: "rrf", "weighted", "bm25" or "dense".
+            alpha: Dense weight for "weighted" (BM25 gets 1 - alpha).
+            candidates: Results taken from each index before fusion.
+
+        Returns:
+            (scores, doc ids), best first.
+        """
+        if mode not in ("rrf", "weighted", "bm25", "dense"):
+            raise ValueError(f"Unknown mode '{mode}'")
+        if mode == "bm25":
+            return self.bm25.search(query, k)
+        dense_scores, dense_ids = exact_search(self.vectors, query_vector, max(k, candidates))
+        dense = (dense_scores[0], dense_ids[0])
+        if mode == "dense":
+            return dense[0][:k], dense[1][:k]
+        lexical = self.bm25.search(query, max(k, candidates))
+        if mode == "rrf":
+            return rrf_fuse([lexical[1], dense[1]], k)
+        return weighted_fuse([lexical, dense], [1 - alpha, alpha], k)
+
+    async def search_text(self, zclient: AsyncZeroEntropy, query: str, **search_kwargs) -> tuple[np.ndarray, np.ndarray]:
+        """Embed `query` and search."""
+        query_vector = await embed_corpus(zclient, [query], input_type="query", dimensions=self.dimensions, latency="fast")
+        return self.search(query, query_vector[0], **search_kwargs)
+
+
+def evaluate(ids: list[np.ndarray], relevant: list[set], k: int = 10) -> dict:
+    """Mean nDCG@k and recall@k with binary relevance."""
+    ndcg, recall = [], []
+    for ranked, rel in zip(ids, relevant):
+        gains = [1.0 / math.log2(rank + 2) for rank, doc in enumerate(ranked[:k]) if doc in rel]
+        ideal = sum(1.0 / math.log2(rank + 2) for rank in range(min(len(rel), k)))
+        ndcg.append(sum(gains) / ideal)
+        recall.append(len(gains) / len(rel))
+    return {"ndcg": float(np.mean(ndcg)), "recall": float(np.mean(recall))}
+
+
+def load_scifact() -> tuple[list[str], list[str], list[set]]:
+    """SciFact test set from Hugging Face: (documents, queries, relevant doc ids per query)."""
+    from datasets import load_dataset
+
+    corpus = load_dataset("mteb/scifact", "corpus", split="corpus")
+    queries = load_dataset("mteb/scifact", "queries", split="queries")
+    qrels = load_dataset("mteb/scifact", "default", split="test")
+
+    doc_index = {str(doc["_id"]): i for i, doc in enumerate(corpus)}
+    docs = [f"{doc['title']}\n\n{doc['text']}" for doc in corpus]
+    relevant = {}
+    for row in qrels:
+        if row["score"] > 0:
+            relevant.setdefault(str(row["query-id"]), set()).add(doc_index[str(row["corpus-id"])])
+    query_text = {str(q["_id"]): q["text"] for q in queries}
+    query_ids = sorted(relevant)
+    return docs, [query_text[q] for q in query_ids], [relevant[q] for q in query_ids]
+
+
+if __name__ == "__main__":
+    import asyncio
+    import os
+    import sys
+    import time
+
+    from embedding_store import EmbeddingStore
+    from matryoshka_search import load_local_corpus
+
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "sample_docs"
+
+    async def main():
+        if corpus == "scifact":
+            docs, queries, relevant = load_scifact()
+        else:
+            docs = load_local_corpus("../retrieval_quickstart/sample_docs" if corpus == "sample_docs" else corpus)
+            # Known-item queries: each sampled paragraph should come back for its own first sentence
+            sampled = list(range(0, len(docs), max(1, len(docs) // 100)))
+            queries = [docs[i].split(". ")[0] for i in sampled]
+            relevant = [{i} for i in sampled]
+        print(f"Corpus: {len(docs)} documents, {len(queries)} queries")
+
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        dimensions = DIMENSIONS_FOR_USE["retrieval"]
+        doc_store = EmbeddingStore.open("embeddings", dimensions=dimensions)
+        doc_rows = await doc_store.embed_missing(zclient, docs)
+        query_store = EmbeddingStore.open("embeddings", dimensions=dimensions, input_type="query")
+        query_rows = await query_store.embed_missing(zclient, queries)
+        query_vectors = np.asarray(query_store.vectors[query_rows])
+
+        retriever = HybridRetriever(dimensions)
+        start = time.perf_counter()
+        retriever.add(docs, doc_store.vectors[doc_rows])
+        retriever.bm25.flush()
+        print(f"Indexed in {time.perf_counter() - start:.2f}s ({len(retriever.bm25.vocab)} terms)\n")
+
+        print(f"{'mode':<10} {'nDCG@10':>8} {'recall@10':>10} {'ms/query':>9}")
+        for mode in ("bm25", "dense", "rrf", "weighted"):
+            start = time.perf_counter()
+            ids = [retriever.search(q, qv, k=10, mode=mode)[1] for q, qv in zip(queries, query_vectors)]
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            metrics = evaluate(ids, relevant)
+            print(f"{mode:<10} {metrics['ndcg']:>8.3f} {metrics['recall']:>10.3f} {ms:>9.2f}")
+
+    asyncio.run(main())
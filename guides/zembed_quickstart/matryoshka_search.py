@@ -0,0 +1,162 @@
+"""
+Coarse-to-fine ("Matryoshka") search with zembed dimension projections.
+
+zembed-1 vectors can be used at 40 to 2560 dimensions. Small vectors are cheap
+to keep in memory and fast to scan but less precise, so search runs in two
+stages:
+
+1. Shortlist `shortlist` candidates by scanning low-dimensional vectors
+   (e.g. 160-d: 16x less memory and scan time than 2560-d).
+2. Re-score only the shortlist with the full-dimension vectors, which can stay
+   on disk in an `EmbeddingStore` memmap.
+
+Coarse vectors come from the full ones: the first `dims` components,
+renormalized to unit length. That needs no extra embedding call. If you would
+rather use the API's own projection (`dimensions=160`), pass those vectors as
+`coarse_vectors` instead; the benchmark below reports recall either way.
+
+Run `python matryoshka_search.py [corpus]` to benchmark recall, latency and
+memory per coarse dimension on a local corpus (a directory of .md/.txt files,
+split into paragraphs, or a text file with one document per line).
+"""
+
+import time
+
+import numpy as np
+
+from vector_index import _top_k, exact_search
+
+COARSE_DIMENSIONS = (40, 80, 160, 320, 640, 1280)
+
+
+def truncate(vectors: np.ndarray, dims: int, dtype: str = "float16", block_rows: int = 65536) -> np.ndarray:
+    """
+    First `dims` components of each vector, renormalized to unit length.
+
+    Reads `vectors` in blocks, so it works on a full-dimension memmap.
+    """
+    out = np.empty((len(vectors), dims), dtype=dtype)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows, :dims], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        out[start:start + block_rows] = block / np.maximum(norms, 1e-12)
+    return out
+
+
+class TwoStageSearcher:
+    """Shortlist with coarse vectors, re-score with full vectors."""
+
+    def __init__(self, full_vectors: np.ndarray, coarse_dims: int = 160, coarse_vectors: np.ndarray | None = None):
+        """
+        Args:
+            full_vectors: (n, full_dims) vectors, e.g. `EmbeddingStore.vectors`.
+            coarse_dims: Dimensions of the shortlist stage.
+            coarse_vectors: Precomputed (n, coarse_dims) vectors. Built by `truncate`
+                when omitted.
+        """
+        self.full_vectors = full_vectors
+        self.coarse_dims = coarse_dims
+        self.coarse_vectors = coarse_vectors if coarse_vectors is not None else truncate(full_vectors, coarse_dims)
+
+    def search(self, queries: np.ndarray, k: int = 10, shortlist: int = 100) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            queries: (n_queries, full_dims) query vectors, or a single query.
+            k: Number of results per query.
+            shortlist: Candidates kept from the coarse stage.
+
+        Returns:
+            (scores, indices), each (n_queries, k), scored with the full vectors.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        _, candidates = exact_search(self.coarse_vectors, truncate(queries, self.coarse_dims, dtype="float32"), shortlist)
+
+        scores = np.empty((len(queries), min(k, candidates.shape[1])), dtype=np.float32)
+        ids = np.empty(scores.shape, dtype=np.int64)
+        for qi, query in enumerate(queries):
+            rows = np.sort(candidates[qi])
+            full_scores = np.asarray(self.full_vectors[rows], dtype=np.float32) @ query
+            top_scores, top = _top_k(full_scores[None, :], k)
+            scores[qi], ids[qi] = top_scores[0], rows[top[0]]
+        return scores, ids
+
+
+def benchmark(full_vectors: np.ndarray, queries: np.ndarray, k: int = 10, shortlist: int = 100, dims_list=COARSE_DIMENSIONS) -> list[dict]:
+    """
+    Compare two-stage search at each coarse dimension against full-dimension exact search.
+
+    Returns:
+        One dict per configuration with dims, recall@k, ms/query and coarse memory in MB.
+    """
+    rows = []
+    start = time.perf_counter()
+    _, exact_ids = exact_search(full_vectors, queries, k)
+    rows.append({
+        "dims": full_vectors.shape[1],
+        "recall": 1.0,
+        "ms_per_query": (time.perf_counter() - start) * 1000 / len(queries),
+        "memory_mb": full_vectors.shape[0] * full_vectors.shape[1] * 4 / 1e6,
+    })
+    for dims in dims_list:
+        if dims >= full_vectors.shape[1]:
+            continue
+        searcher = TwoStageSearcher(full_vectors, dims)
+        start = time.perf_counter()
+        _, ids = searcher.search(queries, k, shortlist)
+        elapsed = time.perf_counter() - start
+        hits = sum(len(np.intersect1d(a, e)) for a, e in zip(ids, exact_ids))
+        rows.append({
+            "dims": dims,
+            "recall": hits / exact_ids.size,
+            "ms_per_query": elapsed * 1000 / len(queries),
+            "memory_mb": searcher.coarse_vectors.nbytes / 1e6,
+        })
+    return rows
+
+
+def load_local_corpus(path: str) -> list[str]:
+    """Paragraphs of every .md/.txt file in a directory, or the lines of a text file."""
+    import glob
+    import os
+
+    if os.path.isfile(path):
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    paragraphs = []
+    for filepath in sorted(glob.glob(os.path.join(path, "**", "*.md"), recursive=True) + glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)):
+        with open(filepath, encoding="utf-8") as f:
+            paragraphs.extend(p.strip() for p in f.read().split("\n\n") if len(p.strip()) > 40)
+    return paragraphs
+
+
+if __name__ == "__main__":
+    import asyncio
+    import os
+    import sys
+
+    from zeroentropy import AsyncZeroEntropy
+
+    from embedding_store import EmbeddingStore
+
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else "../retrieval_quickstart/sample_docs"
+
+    async def main():
+        zclient = AsyncZeroEntropy(api_key=os.environ["ZEROENTROPY_API_KEY"])
+        docs = load_local_corpus(corpus_path)
+        # Use the first sentence of a sample of paragraphs as queries
+        query_texts = [doc.split(". ")[0] for doc in docs[:: max(1, len(docs) // 100)]]
+        print(f"Corpus: {len(docs)} documents, {len(query_texts)} queries")
+
+        doc_store = EmbeddingStore.open("embeddings", dimensions=2560)
+        rows = await doc_store.embed_missing(zclient, docs)
+        query_store = EmbeddingStore.open("embeddings", dimensions=2560, input_type="query")
+        query_rows = await query_store.embed_missing(zclient, query_texts)
+
+        full_vectors = np.asarray(doc_store.vectors[rows])
+        queries = np.asarray(query_store.vectors[query_rows])
+        k = min(10, len(docs))
+        print(f"\n{'dims':>6} {'recall@' + str(k):>10} {'ms/query':>10} {'memory MB':>10}")
+        for row in benchmark(full_vectors, queries, k=k, shortlist=min(100, len(docs))):
+            print(f"{row['dims']:>6} {row['recall']:>10.3f} {row['ms_per_query']:>10.3f} {row['memory_mb']:>10.2f}")
+
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+"""
+Memory-bounded k-means over stored zembed embeddings.
+
+The notebook runs scikit-learn `KMeans` on a fully materialized `vecs` array,
+which does not fit in memory for millions of documents. `StreamingKMeans`
+reads the vectors chunk by chunk (e.g. from `EmbeddingStore.vectors`, a memmap)
+and applies mini-batch k-means updates (Sculley, 2010): each centroid moves
+towards its assigned points with a step size of 1 / (points seen so far).
+
+Peak memory is one chunk plus the centroids, whatever the corpus size.
+
+Usage:
+
+    store = EmbeddingStore.open("embeddings", dimensions=320)
+    kmeans = StreamingKMeans(n_clusters=50)
+    for centroids in kmeans.fit_chunks(store.vectors):
+        ...  # centroids after each chunk, e.g. to plot progress
+    for start, labels in kmeans.predict_chunks(store.vectors):
+        ...  # assignments for rows start:start + len(labels)
+"""
+
+import numpy as np
+
+CHUNK_ROWS = 16384
+BATCH_SIZE = 1024
+
+
+def iter_chunks(vectors: np.ndarray, chunk_rows: int = CHUNK_ROWS):
+    """Yield (start, float32 block) over the rows of an array or memmap."""
+    for start in range(0, len(vectors), chunk_rows):
+        yield start, np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+
+
+class StreamingKMeans:
+    """Mini-batch k-means that only ever holds one chunk of vectors in memory."""
+
+    def __init__(self, n_clusters: int, batch_size: int = BATCH_SIZE, seed: int = 0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.counts = np.zeros(n_clusters, dtype=np.int64)
+
+    def _assign(self, batch: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Nearest centroid (Euclidean) and squared distance for each row."""
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, without building an (n, k, d) array
+        dists = (self.centroids ** 2).sum(axis=1)[None, :] - 2 * batch @ self.centroids.T
+        labels = np.argmin(dists, axis=1)
+        sq = np.take_along_axis(dists, labels[:, None], axis=1)[:, 0] + (batch ** 2).sum(axis=1)
+        return labels, np.maximum(sq, 0)
+
+    def _init_centroids(self, chunk: np.ndarray) -> None:
+        """k-means++ seeding on `chunk` (the first chunk in `fit_chunks`)."""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if len(chunk) < self.n_clusters:
+            raise ValueError(f"Seeding chunk has {len(chunk)} rows, need at least n_clusters={self.n_clusters}")
+        centroids = [chunk[self.rng.integers(len(chunk))]]
+        closest = ((chunk - centroids[0]) ** 2).sum(axis=1)
+        for _ in range(1, self.n_clusters):
+            probs = closest / closest.sum() if closest.sum() > 0 else None
+            centroids.append(chunk[self.rng.choice(len(chunk), p=probs)])
+            closest = np.minimum(closest, ((chunk - centroids[-1]) ** 2).sum(axis=1))
+        self.centroids = np.array(centroids, dtype=np.float32)
+
+    def partial_fit(self, batch: np.ndarray) -> "StreamingKMeans":
+        """Update the centroids with one mini-batch, seeding the centroids from it on first use."""
+        batch = np.asarray(batch, dtype=np.float32)
+        if self.centroids is None:
+            self._init_centroids(batch)
+        labels, _ = self._assign(batch)
+        batch_counts = np.bincount(labels, minlength=self.n_clusters)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, batch)
+        self.counts += batch_counts
+        updated = batch_counts > 0
+        # Per-centroid learning rate 1 / count: c += (sum - n * c) / count
+        eta = batch_counts[updated] / self.counts[updated]
+        batch_means = sums[updated] / batch_counts[updated, None]
+        self.centroids[updated] += eta[:, None] * (batch_means - self.centroids[updated])
+        return self
+
+    def fit_chunks(self, vectors: np.ndarray, epochs: int = 1, chunk_rows: int = CHUNK_ROWS):
+        """
+        Fit over `vectors` one chunk at a time.
+
+        The centroids are seeded with k-means++ on the first chunk (up to
+        `chunk_rows` rows, not one `batch_size` mini-batch), so `n_clusters`
+        can exceed `batch_size`.
+
+        Yields:
+            A copy of the centroids after each chunk, so callers can watch them converge.
+        """
+        for _ in range(epochs):
+            for _, chunk in iter_chunks(vectors, chunk_rows):
+                if self.centroids is None:
+                    self._init_centroids(chunk)
+                order = self.rng.permutation(len(chunk))
+                for i in range(0, len(chunk), self.batch_size):
+                    self.partial_fit(chunk[order[i:i + self.batch_size]])
+                yield self.centroids.copy()
+
+    def fit(self, vectors: np.ndarray, epochs: int = 1, chunk_rows: int = CHUNK_ROWS) -> "StreamingKMeans":
+        for _ in self.fit_chunks(vectors, epochs, chunk_rows):
+            pass
+        return self
+
+    def predict_chunks(self, vectors: np.ndarray, chunk_rows: int = CHUNK_ROWS):
+        """Yield (start, labels) for each chunk of `vectors`."""
+        for start, chunk in iter_chunks(vectors, chunk_rows):
+            yield start, self._assign(chunk)[0]
+
+    def predict(self, vectors: np.ndarray, out: np.ndarray | None = None, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+        """Cluster id of every row, written into `out` (e.g. an int32 memmap) if given."""
+        if out is None:
+            out = np.empty(len(vectors), dtype=np.int32)
+        for start, labels in self.predict_chunks(vectors, chunk_rows):
+            out[start:start + len(labels)] = labels
+        return out
+
+    def inertia(self, vectors: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> float:
+        """Sum of squared distances to the nearest centroid, computed chunk by chunk."""
+        return float(sum(self._assign(chunk)[1].sum() for _, chunk in iter_chunks(vectors, chunk_rows)))
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    # Write a synthetic corpus to disk and cluster it through a memmap
+    rng = np.random.default_rng(0)
+    n, dims, n_topics = 500_000, 320, 20
+    centers = rng.normal(size=(n_topics, dims)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vectors.bin")
+        vectors = np.memmap(path, dtype=np.float16, mode="w+", shape=(n, dims))
+        topics = rng.integers(0, n_topics, n)
+        for start in range(0, n, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, n)
+            block = centers[topics[start:end]] + rng.normal(size=(end - start, dims)).astype(np.float32)
+            vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+        vectors.flush()
+
+        vectors = np.memmap(path, dtype=np.float16, mode="r", shape=(n, dims))
+        start = time.perf_counter()
+        kmeans = StreamingKMeans(n_clusters=n_topics)
+        for i, _ in enumerate(kmeans.fit_chunks(vectors)):
+            pass
+        labels = kmeans.predict(vectors)
+        elapsed = time.perf_counter() - start
+
+        # Each true topic should land in a single cluster
+        purity = sum(np.bincount(labels[topics == t]).max() for t in range(n_topics)) / n
+        print(f"{n} vectors ({vectors.nbytes / 1e6:.0f} MB on disk) clustered in {elapsed:.1f}s "
+              f"over {i + 1} chunks of {CHUNK_ROWS} rows, purity {purity:.3f}")
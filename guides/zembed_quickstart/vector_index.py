@@ -0,0 +1,196 @@
+"""
+In-process nearest-neighbour search over zembed vectors.
+
+The notebook scores everything with `vecs @ vecs.T`, which builds an N x N
+matrix. This module offers two ways to get the top-k instead:
+
+- `exact_search`: brute force, but in row blocks with `np.argpartition`, so
+  memory stays at (queries x block) no matter how large the corpus is. Works on
+  the memmap from `EmbeddingStore.vectors`.
+- `IVFIndex`: an inverted-file index. Vectors are grouped around k-means
+  centroids and a query only scores the `n_probe` closest groups. Raising
+  `n_probe` trades speed for recall; `n_probe == n_lists` is exact.
+
+Scores are dot products, which equal cosine similarity for zembed's unit-length
+vectors. Both functions take a batch of queries, shape (n_queries, dimensions).
+"""
+
+import json
+
+import numpy as np
+
+BLOCK_ROWS = 65536
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a (n_queries, n) score matrix, sorted best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.float32), np.empty((len(scores), 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part_scores, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int = 10, block_rows: int = BLOCK_ROWS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k by blocked matrix multiplication.
+
+    Args:
+        vectors: (n, dimensions) corpus, float32/float16 array or memmap.
+        queries: (n_queries, dimensions) or a single (dimensions,) query.
+        k: Number of neighbours per query.
+        block_rows: Corpus rows scored per matmul.
+
+    Returns:
+        (scores, indices), each (n_queries, k), best first.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        block_scores, block_ids = _top_k(queries @ block.T, k)
+        # Merge this block's candidates with the running top-k
+        merged_scores = np.concatenate([best_scores, block_scores], axis=1)
+        merged_ids = np.concatenate([best_ids, block_ids + start], axis=1)
+        best_scores, order = _top_k(merged_scores, k)
+        best_ids = np.take_along_axis(merged_ids, order, axis=1)
+    return best_scores, best_ids
+
+
+def train_centroids(vectors: np.ndarray, n_centroids: int, iterations: int = 10, sample_size: int = 100_000, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a random sample of the vectors. Returns (n_centroids, dimensions)."""
+    rng = np.random.default_rng(seed)
+    sample_ids = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+    sample = np.asarray(vectors[sample_ids], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_centroids, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Keep the old centroid for empty clusters
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index."""
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray):
+        """Use `IVFIndex.build` or `IVFIndex.load` rather than calling this directly."""
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets  # list i holds list_ids[list_offsets[i]:list_offsets[i + 1]]
+        self.list_ids = list_ids
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int | None = None, iterations: int = 10, block_rows: int = BLOCK_ROWS) -> "IVFIndex":
+        """
+        Cluster the vectors and build the inverted lists.
+
+        Args:
+            vectors: (n, dimensions) corpus; may be a memmap, it is read in blocks.
+            n_lists: Number of clusters; defaults to about sqrt(n).
+            iterations: k-means iterations.
+            block_rows: Rows assigned per block.
+        """
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        centroids = train_centroids(vectors, n_lists, iterations=iterations)
+        assignment = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            assignment[start:start + block_rows] = np.argmax(block @ centroids.T, axis=1)
+        list_ids = np.argsort(assignment, kind="stable").astype(np.int64)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=list_offsets[1:])
+        return cls(vectors, centroids, list_offsets, list_ids)
+
+    def search(self, queries: np.ndarray, k: int = 10, n_probe: int = 8) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k.
+
+        Args:
+            queries: (n_queries, dimensions) or a single (dimensions,) query.
+            k: Number of neighbours per query.
+            n_probe: Number of closest lists scanned per query (the recall/speed knob).
+
+        Returns:
+            (scores, indices), each (n_queries, k), best first. Rows are padded with
+            -inf / -1 when the probed lists hold fewer than k vectors.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe, self.n_lists)
+        _, probes = _top_k(queries @ self.centroids.T, n_probe)
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for qi, query in enumerate(queries):
+            candidates = np.concatenate([
+                self.list_ids[self.list_offsets[lst]:self.list_offsets[lst + 1]] for lst in probes[qi]
+            ])
+            if len(candidates) == 0:
+                continue
+            candidates.sort()  # sequential reads when vectors is a memmap
+            cand_scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            top_scores, top = _top_k(cand_scores[None, :], k)
+            scores[qi, :top.shape[1]] = top_scores[0]
+            ids[qi, :top.shape[1]] = candidates[top[0]]
+        return scores, ids
+
+    def save(self, path: str) -> None:
+        """Save the index structure (not the vectors) to a .npz file."""
+        np.savez(
+            path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_ids=self.list_ids,
+            meta=np.array(json.dumps({"n_vectors": int(len(self.list_ids))})),
+        )
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray) -> "IVFIndex":
+        """Load an index saved with `save`, attaching it to the same vectors (e.g. an EmbeddingStore memmap)."""
+        data = np.load(path)
+        meta = json.loads(str(data["meta"]))
+        if meta["n_vectors"] != len(vectors):
+            raise ValueError(f"Index was built over {meta['n_vectors']} vectors, got {len(vectors)}")
+        return cls(vectors, data["centroids"], data["list_offsets"], data["list_ids"])
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Share of the exact top-k that the approximate search found."""
+    hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approx_ids, exact_ids))
+    return hits / exact_ids.size
+
+
+if __name__ == "__main__":
+    import time
+
+    # Synthetic clustered unit vectors stand in for a stored zembed corpus
+    rng = np.random.default_rng(0)
+    n, dims, k = 200_000, 320, 10
+    centers = rng.normal(size=(500, dims)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(n, 100, replace=False)] + 0.05 * rng.normal(size=(100, dims)).astype(np.float32)
+
+    start = time.perf_counter()
+    _, exact_ids = exact_search(vectors, queries, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"exact       {exact_ms:7.2f} ms/query  recall 1.000")
+
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors)
+    print(f"IVF build ({index.n_lists} lists): {time.perf_counter() - start:.1f}s")
+    for n_probe in (1, 4, 16, 64):
+        start = time.perf_counter()
+        _, ids = index.search(queries, k, n_probe=n_probe)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"n_probe={n_probe:<3} {ms:7.2f} ms/query  recall {recall_at_k(ids, exact_ids):.3f}")